@@ -10,6 +10,12 @@ from app.core.db import Base
 # Import all models here to ensure they are registered with Base metadata
 from app.models import user
 from app.models import form
+from app.models import outbox
+from app.models import pdf_object
+from app.models import webhook
+from app.models import submission_count
+from app.models import field_stats
+from app.models import submission_sketch
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""Add submission_sketches
+
+Revision ID: 1e7b3d9a5c60
+Revises: f3a9c5e1b7d4
+Create Date: 2026-10-18 18:47:12.604388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e7b3d9a5c60'
+down_revision: Union[str, None] = 'f3a9c5e1b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing history is loaded with python -m app.rebuild_field_stats
+    op.create_table('submission_sketches',
+    sa.Column('form_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['form_id'], ['forms.id'], ),
+    sa.PrimaryKeyConstraint('form_id', 'day', 'kind', 'name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('submission_sketches')
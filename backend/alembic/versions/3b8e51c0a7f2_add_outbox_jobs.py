@@ -0,0 +1,47 @@
+"""Add outbox jobs
+
+Revision ID: 3b8e51c0a7f2
+Revises: e9653d1d9283
+Create Date: 2026-10-18 08:20:11.412907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e51c0a7f2'
+down_revision: Union[str, None] = 'e9653d1d9283'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('submission_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_jobs_id'), 'outbox_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_outbox_jobs_submission_id'), 'outbox_jobs', ['submission_id'], unique=False)
+    op.create_index('ix_outbox_jobs_status_available_at', 'outbox_jobs', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_jobs_status_available_at', table_name='outbox_jobs')
+    op.drop_index(op.f('ix_outbox_jobs_submission_id'), table_name='outbox_jobs')
+    op.drop_index(op.f('ix_outbox_jobs_id'), table_name='outbox_jobs')
+    op.drop_table('outbox_jobs')
@@ -0,0 +1,26 @@
+"""Add form version pdf mode
+
+Revision ID: 5f0a83c2d6b1
+Revises: c27e5b1d4f90
+Create Date: 2026-10-18 11:30:52.409716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0a83c2d6b1'
+down_revision: Union[str, None] = 'c27e5b1d4f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('form_versions', sa.Column('pdf_mode', sa.String(), server_default='eager', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('form_versions', 'pdf_mode')
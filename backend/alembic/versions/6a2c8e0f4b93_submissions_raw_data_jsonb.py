@@ -0,0 +1,42 @@
+"""Convert submissions.raw_data to JSONB with a GIN index
+
+Revision ID: 6a2c8e0f4b93
+Revises: 1e7b3d9a5c60
+Create Date: 2026-10-18 19:31:56.148207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2c8e0f4b93'
+down_revision: Union[str, None] = '1e7b3d9a5c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rewrites the table (ACCESS EXCLUSIVE for its duration)
+    op.alter_column('submissions', 'raw_data',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='raw_data::jsonb')
+    # Built without locking writes on large tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_submissions_raw_data_path_ops', 'submissions', ['raw_data'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'raw_data': 'jsonb_path_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_submissions_raw_data_path_ops', table_name='submissions', postgresql_concurrently=True)
+    op.alter_column('submissions', 'raw_data',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.JSON(),
+               existing_nullable=True,
+               postgresql_using='raw_data::json')
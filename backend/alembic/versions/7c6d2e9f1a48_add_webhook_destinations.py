@@ -0,0 +1,26 @@
+"""Add webhook destinations to form versions
+
+Revision ID: 7c6d2e9f1a48
+Revises: e4b9c1a7d305
+Create Date: 2026-10-18 15:41:03.294671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c6d2e9f1a48'
+down_revision: Union[str, None] = 'e4b9c1a7d305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('form_versions', sa.Column('webhook_destinations', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('form_versions', 'webhook_destinations')
@@ -0,0 +1,37 @@
+"""Add content-addressed pdf objects
+
+Revision ID: 9d41f6a2c8e3
+Revises: 3b8e51c0a7f2
+Create Date: 2026-10-18 09:02:45.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41f6a2c8e3'
+down_revision: Union[str, None] = '3b8e51c0a7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('pdf_objects',
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('object_key', sa.String(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.add_column('submissions', sa.Column('pdf_hash', sa.String(), nullable=True))
+    op.create_index(op.f('ix_submissions_pdf_hash'), 'submissions', ['pdf_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_submissions_pdf_hash'), table_name='submissions')
+    op.drop_column('submissions', 'pdf_hash')
+    op.drop_table('pdf_objects')
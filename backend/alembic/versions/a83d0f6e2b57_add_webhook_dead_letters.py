@@ -0,0 +1,44 @@
+"""Add webhook dead letters
+
+Revision ID: a83d0f6e2b57
+Revises: 5f0a83c2d6b1
+Create Date: 2026-10-18 13:05:39.861254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d0f6e2b57'
+down_revision: Union[str, None] = '5f0a83c2d6b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_dead_letters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('outbox_job_id', sa.Integer(), nullable=True),
+    sa.Column('submission_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['outbox_job_id'], ['outbox_jobs.id'], ),
+    sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_webhook_dead_letters_id'), 'webhook_dead_letters', ['id'], unique=False)
+    op.create_index(op.f('ix_webhook_dead_letters_outbox_job_id'), 'webhook_dead_letters', ['outbox_job_id'], unique=False)
+    op.create_index(op.f('ix_webhook_dead_letters_submission_id'), 'webhook_dead_letters', ['submission_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_webhook_dead_letters_submission_id'), table_name='webhook_dead_letters')
+    op.drop_index(op.f('ix_webhook_dead_letters_outbox_job_id'), table_name='webhook_dead_letters')
+    op.drop_index(op.f('ix_webhook_dead_letters_id'), table_name='webhook_dead_letters')
+    op.drop_table('webhook_dead_letters')
@@ -0,0 +1,29 @@
+"""Add submissions keyset index
+
+Revision ID: b5e17a3c9d62
+Revises: 7c6d2e9f1a48
+Create Date: 2026-10-18 16:48:30.517294
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e17a3c9d62'
+down_revision: Union[str, None] = '7c6d2e9f1a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built without locking writes on large tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_submissions_form_id_created_at_id', 'submissions', ['form_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_submissions_form_id_created_at_id', table_name='submissions', postgresql_concurrently=True)
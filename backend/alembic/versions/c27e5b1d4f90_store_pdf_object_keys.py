@@ -0,0 +1,37 @@
+"""Store pdf object keys instead of presigned urls
+
+Revision ID: c27e5b1d4f90
+Revises: 9d41f6a2c8e3
+Create Date: 2026-10-18 10:14:07.552901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27e5b1d4f90'
+down_revision: Union[str, None] = '9d41f6a2c8e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('submissions', sa.Column('pdf_key', sa.String(), nullable=True))
+    # Recover the key from stored links, path-style (host/submissions/<key>?...)
+    # or virtual-host style (submissions.host/<key>?...)
+    op.execute(
+        """
+        UPDATE submissions
+        SET pdf_key = substring(pdf_url from '^[a-z]+://[^/]+/(?:submissions/)?([^?]+)')
+        WHERE pdf_url IS NOT NULL
+        """
+    )
+    op.drop_column('submissions', 'pdf_url')
+
+
+def downgrade() -> None:
+    op.add_column('submissions', sa.Column('pdf_url', sa.String(), nullable=True))
+    op.drop_column('submissions', 'pdf_key')
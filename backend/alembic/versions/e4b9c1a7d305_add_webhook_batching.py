@@ -0,0 +1,28 @@
+"""Add webhook batching to form versions
+
+Revision ID: e4b9c1a7d305
+Revises: a83d0f6e2b57
+Create Date: 2026-10-18 14:22:16.730482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c1a7d305'
+down_revision: Union[str, None] = 'a83d0f6e2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('form_versions', sa.Column('webhook_batch_size', sa.Integer(), nullable=True))
+    op.add_column('form_versions', sa.Column('webhook_batch_window_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('form_versions', 'webhook_batch_window_seconds')
+    op.drop_column('form_versions', 'webhook_batch_size')
@@ -0,0 +1,41 @@
+"""Add field_stats
+
+Revision ID: f3a9c5e1b7d4
+Revises: d08f4a6c2e19
+Create Date: 2026-10-18 18:05:41.271903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c5e1b7d4'
+down_revision: Union[str, None] = 'd08f4a6c2e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing history is loaded with python -m app.rebuild_field_stats
+    op.create_table('field_stats',
+    sa.Column('form_version_id', sa.Integer(), nullable=False),
+    sa.Column('field_id', sa.String(), nullable=False),
+    sa.Column('seen', sa.Integer(), nullable=False),
+    sa.Column('filled', sa.Integer(), nullable=False),
+    sa.Column('num_count', sa.Integer(), nullable=False),
+    sa.Column('num_mean', sa.Float(), nullable=False),
+    sa.Column('num_m2', sa.Float(), nullable=False),
+    sa.Column('num_min', sa.Float(), nullable=True),
+    sa.Column('num_max', sa.Float(), nullable=True),
+    sa.Column('option_counts', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['form_version_id'], ['form_versions.id'], ),
+    sa.PrimaryKeyConstraint('form_version_id', 'field_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('field_stats')
@@ -6,6 +6,10 @@ from app.models.form import Form, FormVersion
 from app.models.user import User
 from app.schemas import form as form_schemas
 from app.core.db import get_db
+from app.core.form_runtime import form_runtime_cache
+from app.core.logic.validation import compile_schema, SchemaError
+from app.core.logic.formulas import compile_formulas, FormulaError
+from app.core.logic.rules import compile_rules, RuleError
 
 router = APIRouter()
 
@@ -85,6 +89,20 @@ def create_form_version(
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
         
+    # Reject schemas, formulas and rules that cannot be compiled for the submit path
+    try:
+        compile_schema(version_in.schema_json)
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail=f"Schema Error: {str(e)}")
+    try:
+        compile_formulas(version_in.formulas_json)
+    except FormulaError as e:
+        raise HTTPException(status_code=422, detail=f"Formula Error: {str(e)}")
+    try:
+        compile_rules(version_in.rules_json, strict=True)
+    except RuleError as e:
+        raise HTTPException(status_code=422, detail=f"Rule Error: {str(e)}")
+
     # Get last version number
     last_version = db.query(FormVersion).filter(FormVersion.form_id == form_id).order_by(FormVersion.version_number.desc()).first()
     new_version_number = (last_version.version_number + 1) if last_version else 1
@@ -96,10 +114,17 @@ def create_form_version(
         rules_json=version_in.rules_json,
         formulas_json=version_in.formulas_json,
         pdf_template=version_in.pdf_template,
+        pdf_mode=version_in.pdf_mode,
         webhook_url=version_in.webhook_url,
+        webhook_destinations=[destination.model_dump() for destination in version_in.webhook_destinations or []],
+        webhook_batch_size=version_in.webhook_batch_size,
+        webhook_batch_window_seconds=version_in.webhook_batch_window_seconds,
         is_published=version_in.is_published
     )
     db.add(version)
     db.commit()
     db.refresh(version)
+
+    # Public submit path must pick up the new version
+    form_runtime_cache.invalidate(form.slug)
     return version
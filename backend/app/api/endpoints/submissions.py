@@ -1,17 +1,29 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Body, BackgroundTasks
+from typing import List, Optional, Literal
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy import insert, tuple_
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models.form import Form, FormVersion, Submission
 from app.models.user import User
 from app.schemas import submission as sub_schemas
 from app.core.db import get_db
-from app.core.logic.validation import validate_submission, ValidationError
-from app.core.logic.rules import evaluate_rules
-from app.core.logic.formulas import process_formulas
-from app.core.pdf_service import pdf_service
-from app.core.webhook_service import webhook_service
-from app.core.email_service import email_service
+from app.core.logic.validation import ValidationError, ValidationErrors
+from app.core.form_runtime import form_runtime_cache
+from app.core.config import settings
+from app.core.outbox import submission_status, enqueue_many
+from app.core.submission_jobs import enqueue_submission_jobs, plan_submission_jobs
+from app.core.presigned_urls import presigned_urls
+from app.core.pdf_on_demand import ensure_pdf
+from app.core.pdf_export import stream_pdf_zip
+from app.core.submission_delete import delete_submission
+from app.core.pagination import encode_cursor, decode_cursor, InvalidCursor
+from app.core.submission_filters import parse_filters, InvalidFilter
+from app.core.submission_counts import record_submissions, total_count, daily_counts, hourly_counts
+from app.core.field_stats import analytics_job, read_field_stats
+from app.core.submission_sketches import read_sketches
+from app.core.submission_export import export_fields, stream_csv, stream_ndjson, stream_parquet, export_parquet_to_s3
 
 router = APIRouter()
 
@@ -23,163 +35,420 @@ def get_public_form_schema(
     """
     Public Endpoint: Get form schema (latest version)
     """
-    form = db.query(Form).filter(Form.slug == slug).first()
-    if not form:
+    compiled = form_runtime_cache.get_latest(db, slug)
+    if not compiled:
         raise HTTPException(status_code=404, detail="Form not found")
-    
-    # Get latest version
-    version = db.query(FormVersion).filter(FormVersion.form_id == form.id).order_by(FormVersion.version_number.desc()).first()
-    
-    if not version:
-         raise HTTPException(status_code=404, detail="Form has no versions")
          
     return {
-        "title": form.title,
-        "slug": form.slug,
-        "schema": version.schema_json,
-        "rules": version.rules_json,
-        "version": version.version_number
+        "title": compiled.form_title,
+        "slug": compiled.slug,
+        "schema": compiled.schema,
+        "rules": compiled.rules,
+        "version": compiled.version_number
+    }
+
+@router.post("/public/forms/{slug}/visibility", response_model=sub_schemas.VisibilityDelta)
+def get_public_visibility_delta(
+    slug: str,
+    request_in: sub_schemas.VisibilityRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Public Endpoint: Live field visibility while filling the form.
+    Only rules triggered (directly or through chains) by the changed fields are
+    evaluated, and only the visibility of their target fields is returned.
+    """
+    compiled = form_runtime_cache.get_latest(db, slug)
+    if not compiled:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    return {
+        "version": compiled.version_number,
+        "visibility": compiled.visibility_delta(request_in.changed, request_in.answers)
     }
 
+def _latest_for_submit(db: Session, slug: str):
+    # 404 for an unknown slug, 400 for a form without versions (as before the runtime cache)
+    compiled = form_runtime_cache.get_latest(db, slug)
+    if compiled:
+        return compiled
+    if not db.query(Form.id).filter(Form.slug == slug).first():
+        raise HTTPException(status_code=404, detail="Form not found")
+    raise HTTPException(status_code=400, detail="Form has no versions configured")
+
 @router.post("/public/{slug}/submit", response_model=dict)
 def create_public_submission(
     slug: str,
     submission_in: sub_schemas.PublicSubmissionCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    all_errors: bool = False
 ):
     """
     Public Endpoint: Submit data for a form.
+    With all_errors=true, a 422 lists every invalid field instead of the first one.
     """
-    # 1. Find Form
-    form = db.query(Form).filter(Form.slug == slug).first()
-    if not form:
-        raise HTTPException(status_code=404, detail="Form not found")
-        
-    # 2. Find Latest Published Version (or just latest for MVP debugging?)
-    # MVP: Find latest published. If none, fail.
-    # version = db.query(FormVersion).filter(
-    #     FormVersion.form_id == form.id, 
-    #     FormVersion.is_published == True
-    # ).order_by(FormVersion.version_number.desc()).first()
-    
+    # 1-2. Find Form and its latest version (compiled once, cached per slug)
     # FOR MVP DEV: Allow using latest implementation even if not published, 
     # OR we force user to publish. Let's force publish workflow logic later,
     # for now take the absolute latest version.
-    version = db.query(FormVersion).filter(FormVersion.form_id == form.id).order_by(FormVersion.version_number.desc()).first()
-    
-    if not version:
-         raise HTTPException(status_code=400, detail="Form has no versions configured")
+    compiled = _latest_for_submit(db, slug)
 
-    input_data = submission_in.answers
+    # 3. Rules (Visibility): hidden answers are dropped, so validation, formulas,
+    # storage, webhooks and PDFs only see what the respondent could see.
+    input_data, hidden = compiled.strip_hidden(submission_in.answers)
     
-    # 3. Validate
+    # 4. Validate (required checks skip hidden fields)
     try:
-        validate_submission(version.schema_json, input_data)
+        compiled.validate(input_data, collect_all=all_errors, hidden=hidden)
+    except ValidationErrors as e:
+        raise HTTPException(status_code=422, detail={"errors": [{"field": err.field_id, "message": err.message} for err in e.errors]})
     except ValidationError as e:
         raise HTTPException(status_code=422, detail={"field": e.field_id, "message": e.message})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Validation Error: {str(e)}")
         
-    # 4. Rules (Visibility) - For MVP we assume all data sent is intentional.
-    # We could run this and strip hidden fields.
-    # visibility = evaluate_rules(version.rules_json, input_data)
-    
     # 5. Formulas
     try:
-        computed = process_formulas(version.formulas_json, input_data)
+        computed = compiled.compute(input_data)
     except Exception as e:
          raise HTTPException(status_code=422, detail=f"Formula Error: {str(e)}")
     
-    # 6. Save
+    # 6. Save, queueing PDF / webhook / email in the same transaction.
+    # The worker (app.worker) performs them; clients poll the status endpoint.
     submission = Submission(
-        form_id=form.id,
-        form_version_id=version.id,
+        form_id=compiled.form_id,
+        form_version_id=compiled.version_id,
         raw_data=input_data,
         computed_data=computed
     )
     db.add(submission)
+    db.flush()
+    record_submissions(db, compiled.form_id, [(compiled.version_id, submission.id, submission.created_at)])
+    queued = enqueue_submission_jobs(db, submission, compiled)
+    enqueue_many(db, [analytics_job(compiled.form_id, [submission.id])])
     db.commit()
-    db.refresh(submission)
     
-    # 7. PDF Generation
-    pdf_url = None
-    if version.pdf_template:
+    return {
+        "id": submission.id,
+        "message": "Submission received",
+        "status": "processing" if queued else "completed",
+        "pdf_url": None
+    }
+
+@router.post("/public/{slug}/submit:batch", response_model=sub_schemas.PublicSubmissionBatchResult)
+def create_public_submissions_batch(
+    slug: str,
+    batch_in: sub_schemas.PublicSubmissionBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Public Endpoint: Submit many answer sets at once (kiosk / offline sync).
+    All items are stripped of hidden fields, checked against one resolved version and stored with a single
+    multi-row INSERT; invalid items are reported per index without failing the batch.
+    """
+    if len(batch_in.submissions) > settings.SUBMISSION_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.SUBMISSION_BATCH_MAX_SIZE} submissions")
+
+    compiled = _latest_for_submit(db, slug)
+
+    results: List[dict] = [None] * len(batch_in.submissions)
+    accepted_indexes = []
+    rows = []
+    now = datetime.utcnow()
+
+    for index, item in enumerate(batch_in.submissions):
         try:
-            # Prepare data for template: raw + computed
-            tpl_data = {**input_data, **computed}
-            html = pdf_service.render_html(version.pdf_template, tpl_data)
-            pdf_bytes = pdf_service.generate_pdf_bytes(html)
-            pdf_url = pdf_service.upload_pdf(pdf_bytes)
-            
-            # Update submission
-            submission.pdf_url = pdf_url # Need to add this column too!
-            db.add(submission)
-            db.commit()
+            input_data, hidden = compiled.strip_hidden(item.answers)
+            compiled.validate(input_data, hidden=hidden)
+            computed = compiled.compute(input_data)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "rejected", "error": {"field": e.field_id, "message": e.message}}
+            continue
         except Exception as e:
-            print(f"PDF Gen failed: {e}")
-            # Non-blocking failure for MVP
-            
-    # 8. Trigger Logic (n8n)
-    if version.webhook_url:
-        payload = {
-            "event": "submission.created",
-            "form_id": form.id,
-            "submission_id": submission.id,
-            "data": submission.raw_data,
-            "computed": submission.computed_data,
-            "pdf_url": pdf_url
-        }
-        webhook_service.trigger_webhook(version.webhook_url, payload)
-    
-    # 9. Email Notification (Sprint 1)
-    # Find field of type 'email'
-    email_field_id = None
-    if version.schema_json and "fields" in version.schema_json:
-        for field in version.schema_json["fields"]:
-            if field.get("type") == "email":
-                email_field_id = field.get("id")
-                break
-    
-    if email_field_id and pdf_url:
-        recipient_email = input_data.get(email_field_id)
-        if recipient_email:
-             background_tasks.add_task(
-                 email_service.send_submission_email,
-                 to_email=recipient_email,
-                 pdf_url=pdf_url,
-                 form_title=form.title
-             )
-    
-    return {"id": submission.id, "message": "Submission received", "pdf_url": pdf_url}
+            results[index] = {"index": index, "status": "rejected", "error": {"field": None, "message": str(e)}}
+            continue
+
+        accepted_indexes.append(index)
+        rows.append({
+            "form_id": compiled.form_id,
+            "form_version_id": compiled.version_id,
+            "raw_data": input_data,
+            "computed_data": computed,
+            "created_at": now
+        })
+
+    if rows:
+        # One INSERT ... RETURNING for the whole batch; ids come back in parameter order
+        ids = db.execute(
+            insert(Submission).returning(Submission.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+
+        job_rows = []
+        for index, submission_id, row in zip(accepted_indexes, ids, rows):
+            planned = plan_submission_jobs(compiled, submission_id, row["raw_data"])
+            job_rows.extend(planned)
+            results[index] = {"index": index, "id": submission_id, "status": "processing" if planned else "completed"}
+
+        job_rows.append(analytics_job(compiled.form_id, ids))
+        enqueue_many(db, job_rows)
+        record_submissions(db, compiled.form_id, [(compiled.version_id, submission_id, now) for submission_id in ids])
+        db.commit()
+
+    return {
+        "accepted": len(rows),
+        "rejected": len(batch_in.submissions) - len(rows),
+        "results": results
+    }
+
+@router.get("/public/{slug}/submissions/{submission_id}", response_model=dict)
+def get_public_submission_status(
+    slug: str,
+    submission_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Public Endpoint: Poll the post-submit processing status (PDF, webhook, email).
+    """
+    compiled = form_runtime_cache.get_latest(db, slug)
+    if not compiled:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    submission = db.query(Submission).filter(Submission.id == submission_id, Submission.form_id == compiled.form_id).first()
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    return {
+        "id": submission.id,
+        "status": submission_status(db, submission.id),
+        "pdf_url": presigned_urls.url_for(submission.pdf_key)
+    }
 
-@router.get("/forms/{form_id}/submissions", response_model=List[sub_schemas.Submission])
+@router.get("/forms/{form_id}/submissions", response_model=sub_schemas.SubmissionPage)
 def read_submissions(
     form_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    filters: List[str] = Query([], alias="filter")
 ):
     """
-    Admin Endpoint: List submissions for a form.
+    Admin Endpoint: List submissions for a form, oldest first.
+    Pages are keyset-based: pass the returned next_cursor to get the next page.
+    Repeatable filter=... parameters narrow the list by answer: field=value,
+    field>=n / field<=n / field>n / field<n (number fields) and field~option
+    (option fields answered with a list that includes the option).
     """
     # Verify ownership
     form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
         
-    submissions = db.query(Submission).filter(Submission.form_id == form_id).offset(skip).limit(limit).all()
-    return submissions
+    query = db.query(Submission).filter(Submission.form_id == form_id)
+    if filters:
+        fields, _ = export_fields(db, form_id)
+        try:
+            query = query.filter(*parse_filters(filters, fields))
+        except InvalidFilter as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(tuple_(Submission.created_at, Submission.id) > after)
+
+    # One extra row tells whether another page exists
+    rows = query.order_by(Submission.created_at, Submission.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    submissions = rows[:limit]
+
+    urls = presigned_urls.sign_many(s.pdf_key for s in submissions)
+    return {
+        "items": [
+            sub_schemas.Submission.model_validate(s).model_copy(update={"pdf_url": urls.get(s.pdf_key)})
+            for s in submissions
+        ],
+        "next_cursor": encode_cursor(submissions[-1].created_at, submissions[-1].id) if has_more else None,
+        "has_more": has_more
+    }
+
+@router.get("/forms/{form_id}/submissions/export")
+def export_submissions(
+    form_id: int,
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    destination: Literal["download", "s3"] = "download",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Admin Endpoint: Export every submission of a form as CSV (one column per
+    schema field plus computed fields), NDJSON or Parquet (typed columns,
+    answers as data.<field id>), streamed from a server-side cursor.
+
+    With destination=s3 a Parquet export is written to the storage bucket
+    instead and a presigned link to it is returned.
+    """
+    # Verify ownership
+    form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    if destination == "s3":
+        if format != "parquet":
+            raise HTTPException(status_code=400, detail="Only parquet exports can be written to storage")
+        fields, computed = export_fields(db, form.id)
+        key, rows = export_parquet_to_s3(form.id, fields, computed)
+        return {"key": key, "rows": rows, "url": presigned_urls.url_for(key)}
+
+    # The generators open their own session: get_db's closes before the body streams
+    if format == "ndjson":
+        body, media_type = stream_ndjson(form.id), "application/x-ndjson"
+    elif format == "parquet":
+        fields, computed = export_fields(db, form.id)
+        body, media_type = stream_parquet(form.id, fields, computed), "application/vnd.apache.parquet"
+    else:
+        fields, computed = export_fields(db, form.id)
+        body, media_type = stream_csv(form.id, fields, computed), "text/csv"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{form.slug}-submissions.{format}"'}
+    )
+
+@router.get("/forms/{form_id}/submissions/pdfs.zip")
+def export_submission_pdfs(
+    form_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Admin Endpoint: Download every submission PDF of a form as one ZIP,
+    streamed as it is built (missing PDFs are rendered on the way).
+    """
+    # Verify ownership
+    form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    # The generator opens its own session: get_db's closes before the body streams
+    return StreamingResponse(
+        stream_pdf_zip(form.id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{form.slug}-pdfs.zip"'}
+    )
+
+@router.get("/submissions/{submission_id}/pdf")
+def get_submission_pdf(
+    submission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Admin Endpoint: Download a submission's PDF. Lazy-mode PDFs are rendered
+    on first access (once, even under concurrent requests); afterwards the
+    stored object is served.
+    """
+    submission = db.query(Submission).join(Form).filter(
+        Submission.id == submission_id,
+        Form.org_id == current_user.org_id
+    ).first()
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    key = submission.pdf_key or ensure_pdf(db, submission.id)
+    if not key:
+        raise HTTPException(status_code=404, detail="This form has no PDF template")
+    return RedirectResponse(presigned_urls.url_for(key))
+
+@router.delete("/submissions/{submission_id}")
+def remove_submission(
+    submission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Admin Endpoint: Delete a submission with its pending jobs. Its PDF object
+    is deleted when no other submission shares it.
+    """
+    submission = db.query(Submission.id).join(Form).filter(
+        Submission.id == submission_id,
+        Form.org_id == current_user.org_id
+    ).first()
+    if not submission or not delete_submission(db, submission_id):
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return {"message": "Submission deleted"}
+
+@router.get("/forms/{form_id}/field-stats", response_model=dict)
+def get_field_stats(
+    form_id: int,
+    version_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Analytics Endpoint: Per-field answer summary of a version (default: latest):
+    fill rate for every field, count/min/max/mean/variance for number fields and
+    option frequencies for select/radio fields. Maintained incrementally by the
+    worker, so recent submissions may take a moment to appear.
+    """
+    # Verify ownership
+    form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    query = db.query(FormVersion).filter(FormVersion.form_id == form_id)
+    if version_id is not None:
+        version = query.filter(FormVersion.id == version_id).first()
+    else:
+        version = query.order_by(FormVersion.version_number.desc()).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Form version not found")
+
+    return read_field_stats(db, form_runtime_cache.get_version(db, version.id))
+
+@router.get("/forms/{form_id}/approx-stats", response_model=dict)
+def get_approximate_stats(
+    form_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    quantiles: List[float] = Query([0.5, 0.9, 0.99]),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Analytics Endpoint: Approximate distinct respondents per email field
+    (HyperLogLog) and quantiles of number fields and computed values
+    (t-digest) between two UTC days (default: the last 30), merged from the
+    per-day sketches instead of scanning submissions.
+    """
+    # Verify ownership
+    form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if any(not 0 <= q <= 1 for q in quantiles):
+        raise HTTPException(status_code=400, detail="quantiles must be between 0 and 1")
+
+    return read_sketches(db, form_id, start, end, quantiles)
 
 @router.get("/forms/{form_id}/stats", response_model=dict)
 def get_form_stats(
     form_id: int,
+    days: int = Query(7, ge=1, le=366),
+    granularity: Literal["day", "hour"] = "day",
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     Analytics Endpoint: Get submission counts and stats.
+    Counts come from the submission_daily_counts rollup (O(days), not O(submissions));
+    granularity=hour adds hourly buckets for the same range.
     """
     # Verify ownership
     form = db.query(Form).filter(Form.id == form_id, Form.org_id == current_user.org_id).first()
@@ -187,43 +456,28 @@ def get_form_stats(
         raise HTTPException(status_code=404, detail="Form not found")
         
     # Total Submissions
-    total_count = db.query(Submission).filter(Submission.form_id == form_id).count()
+    total = total_count(db, form_id)
     
     # Recent Submissions (Last 5)
     recent = db.query(Submission).filter(Submission.form_id == form_id).order_by(Submission.created_at.desc()).limit(5).all()
     
-    # Daily Counts (Last 7 Days)
-    # Using SQL for aggregation might be cleaner, but simple Python loop is fine for MVP small scale.
-    # Group by date strings.
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
-    
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    # Daily Counts (Last `days` days, UTC)
+    start = (datetime.utcnow() - timedelta(days=days)).date()
     
-    daily_stats = db.query(
-        func.date(Submission.created_at).label('date'),
-        func.count(Submission.id).label('count')
-    ).filter(
-        Submission.form_id == form_id,
-        Submission.created_at >= seven_days_ago
-    ).group_by(
-        func.date(Submission.created_at)
-    ).order_by(
-        func.date(Submission.created_at)
-    ).all()
-    
-    # Format for chart
-    chart_data = [{"date": str(stat.date), "count": stat.count} for stat in daily_stats]
-    
-    return {
-        "total_submissions": total_count,
+    urls = presigned_urls.sign_many(s.pdf_key for s in recent)
+
+    stats = {
+        "total_submissions": total,
         "recent_submissions": [
             {
                 "id": s.id,
                 "created_at": s.created_at,
                 "data": s.raw_data,
-                "pdf_url": s.pdf_url
+                "pdf_url": urls.get(s.pdf_key)
             } for s in recent
         ],
-        "daily_counts": chart_data
+        "daily_counts": daily_counts(db, form_id, start)
     }
+    if granularity == "hour":
+        stats["hourly_counts"] = hourly_counts(db, form_id, start)
+    return stats
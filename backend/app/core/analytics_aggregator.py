@@ -0,0 +1,61 @@
+import logging
+import threading
+from typing import Dict, Any
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.field_stats import apply_pending
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsAggregator:
+    """
+    Folds new submissions into field_stats in micro-batches: each pass
+    claims up to `batch_size` analytics outbox jobs and merges their
+    summaries with one read-modify-write per field row.
+    """
+    def __init__(self, batch_size: int):
+        self.batch_size = max(batch_size, 1)
+        self._lock = threading.Lock()
+        self.applied = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    def aggregate_once(self) -> int:
+        """
+        Applies one micro-batch. Returns the number of jobs applied.
+        """
+        db = SessionLocal()
+        try:
+            applied = apply_pending(db, self.batch_size)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self.failed_batches += 1
+            raise
+        finally:
+            db.close()
+        if applied:
+            with self._lock:
+                self.applied += applied
+                self.batches += 1
+        return applied
+
+    def run_forever(self, stop_event) -> None:
+        while not stop_event.is_set():
+            try:
+                applied = self.aggregate_once()
+            except Exception as e:
+                logger.error(f"Analytics aggregation failed: {e}")
+                applied = 0
+            if not applied:
+                stop_event.wait(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "applied_jobs": self.applied,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+            }
+
+analytics_aggregator = AnalyticsAggregator(batch_size=settings.ANALYTICS_BATCH_SIZE)
@@ -21,6 +21,12 @@ class Settings(BaseSettings):
     MINIO_SECURE: bool = False  # Set True for HTTPS (Supabase, R2, etc.)
     MINIO_ROOT_USER: str = "minioadmin"
     MINIO_ROOT_PASSWORD: str = "minioadmin"
+
+    # S3 uploads: connection pool, parallel part uploads, multipart sizing (parts must be >= 5 MB)
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_UPLOAD_CONCURRENCY: int = 4
+    S3_MULTIPART_THRESHOLD_BYTES: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNK_BYTES: int = 8 * 1024 * 1024
     
     # n8n
     N8N_HOST: str = "localhost"
@@ -30,7 +36,13 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USER: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True  # Disable only for local test servers without TLS (e.g. aiosmtpd)
     EMAILS_FROM_EMAIL: str = "noreply@ktypeform.com"
+    SMTP_POOL_SIZE: int = 2  # Authenticated connections kept open and reused
+    SMTP_IDLE_SECONDS: float = 30.0  # Idle pooled connections are checked with NOOP before reuse
+    SMTP_RATE_LIMIT_PER_SECOND: float = 10.0  # 0 = unlimited
+    EMAIL_DISPATCHER_ENABLED: bool = True
+    EMAIL_BATCH_SIZE: int = 50
 
     # LLM Keys
     GROQ_API_KEY: Optional[str] = None
@@ -42,6 +54,67 @@ class Settings(BaseSettings):
     # Stripe
     STRIPE_SECRET_KEY: Optional[str] = None
 
+    # Form runtime cache (compiled FormVersions for the public submit path)
+    FORM_RUNTIME_CACHE_SIZE: int = 1024
+    FORM_RUNTIME_CACHE_TTL_SECONDS: int = 60
+
+    # Max answer sets accepted by POST /public/{slug}/submit:batch
+    SUBMISSION_BATCH_MAX_SIZE: int = 1000
+
+    # submission_daily_counts: rows per (version, hour) bucket, spreading concurrent upserts on busy forms
+    SUBMISSION_COUNT_SHARDS: int = 8
+
+    # PDF rendering: warm WeasyPrint worker processes (0 renders in-process)
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_TIMEOUT_SECONDS: float = 120.0
+    PDF_TEMPLATE_CACHE_SIZE: int = 256
+
+    # Presigned PDF links: minted on read, reused until REFRESH_MARGIN before expiry
+    PDF_URL_EXPIRES_SECONDS: int = 7 * 24 * 3600
+    PDF_URL_REFRESH_MARGIN_SECONDS: int = 24 * 3600
+    PDF_URL_CACHE_SIZE: int = 10000
+
+    # ZIP export of a form's PDFs: objects fetched (or rendered) ahead of the writer
+    PDF_EXPORT_PREFETCH: int = 8
+
+    # Parquet export of submissions: rows per row group (held in memory while written)
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = 50000
+
+    # Outbox worker (post-submit PDF / webhook / email)
+    OUTBOX_WORKER_MODE: str = "thread"  # "thread" or "process"
+    OUTBOX_WORKER_CONCURRENCY: int = 4
+    OUTBOX_BATCH_SIZE: int = 10
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_LEASE_SECONDS: int = 300
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BASE_SECONDS: float = 5.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 600.0
+    # Finished (done) jobs are deleted after this many days; the worker sweeps once per interval
+    OUTBOX_DONE_RETENTION_DAYS: int = 7
+    OUTBOX_PURGE_INTERVAL_SECONDS: float = 3600.0
+    WORKER_STATS_INTERVAL_SECONDS: float = 60.0
+
+    # Per-field answer statistics: analytics jobs folded into field_stats per micro-batch
+    ANALYTICS_BATCH_SIZE: int = 500
+
+    # Async webhook dispatcher (runs in the worker; retries use the outbox backoff)
+    WEBHOOK_DISPATCHER_ENABLED: bool = True
+    WEBHOOK_MAX_CONNECTIONS: int = 100
+    WEBHOOK_MAX_PER_HOST: int = 10
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    WEBHOOK_HTTP2: bool = True
+    # Per destination URL: parallel deliveries (keep below WEBHOOK_MAX_PER_HOST so destinations
+    # sharing a host don't starve each other) and buffered events before jobs go back to the outbox
+    WEBHOOK_DESTINATION_CONCURRENCY: int = 4
+    WEBHOOK_DESTINATION_QUEUE_SIZE: int = 200
+    # Batching mode (per FormVersion webhook_batch_size): default flush window and size cap
+    WEBHOOK_BATCH_WINDOW_SECONDS: float = 1.0
+    WEBHOOK_BATCH_MAX_SIZE: int = 1000
+    # Claimed jobs buffered in destination queues and open batches at once; claiming pauses
+    # at this many (keep at or above WEBHOOK_BATCH_MAX_SIZE so a full batch can form).
+    # Their leases are renewed while buffered.
+    WEBHOOK_MAX_BUFFERED_JOBS: int = 5000
+
     @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
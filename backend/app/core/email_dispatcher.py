@@ -0,0 +1,107 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core import outbox
+from app.models.outbox import OutboxJob
+from app.core.email_service import email_service
+from app.core.submission_jobs import email_request
+
+logger = logging.getLogger(__name__)
+
+def _claim(limit: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        return outbox.claim_jobs(db, limit, kinds=["email"])
+    finally:
+        db.close()
+
+def _prepare(job_ids: List[int]) -> Tuple[List[Tuple[int, Tuple[str, str, str]]], List[Tuple[int, str]]]:
+    """
+    Resolves recipients and links: returns ([(job_id, message)], [(job_id, error)]).
+    """
+    messages, failures = [], []
+    db = SessionLocal()
+    try:
+        for job_id in job_ids:
+            job = db.get(OutboxJob, job_id)
+            if job is None or job.status != "processing":
+                continue
+            try:
+                messages.append((job_id, email_request(db, job)))
+            except Exception as e:
+                db.rollback()
+                failures.append((job_id, f"Failed to build email: {e}"))
+    finally:
+        db.close()
+    return messages, failures
+
+class EmailDispatcher:
+    """
+    Sends email outbox jobs in batches over the pooled SMTP connections of
+    email_service: each claimed batch is split across SMTP_POOL_SIZE threads,
+    each sending its share over one connection under the shared rate limit.
+    Failed messages are retried through the outbox (exponential backoff with jitter).
+    """
+    def __init__(self, batch_size: int, senders: int):
+        self.batch_size = max(batch_size, 1)
+        self.senders = max(senders, 1)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def _send_chunk(self, chunk: List[Tuple[int, Tuple[str, str, str]]]) -> None:
+        errors = email_service.deliver_batch([message for _, message in chunk])
+        for (job_id, _), error in zip(chunk, errors):
+            outbox.finish_job(job_id, None if error is None else f"{type(error).__name__}: {error}")
+        with self._lock:
+            failed = sum(1 for error in errors if error is not None)
+            self.failed += failed
+            self.sent += len(errors) - failed
+
+    def dispatch_once(self, executor: ThreadPoolExecutor) -> int:
+        """
+        Claims and sends one batch. Returns the number of jobs claimed.
+        """
+        job_ids = _claim(self.batch_size)
+        if not job_ids:
+            return 0
+        messages, failures = _prepare(job_ids)
+        for job_id, error in failures:
+            outbox.finish_job(job_id, error)
+
+        chunk_size = -(-len(messages) // self.senders) if messages else 1
+        chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+        for future in [executor.submit(self._send_chunk, chunk) for chunk in chunks]:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Email batch failed: {e}")
+        return len(job_ids)
+
+    def run_forever(self, stop_event) -> None:
+        with ThreadPoolExecutor(max_workers=self.senders, thread_name_prefix="smtp") as executor:
+            while not stop_event.is_set():
+                try:
+                    claimed = self.dispatch_once(executor)
+                except Exception as e:
+                    logger.error(f"Email dispatch failed: {e}")
+                    claimed = 0
+                if not claimed:
+                    stop_event.wait(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        email_service.pool.close_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "failed_attempts": self.failed,
+                "smtp_connects": email_service.pool.connects,
+            }
+
+email_dispatcher = EmailDispatcher(
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    senders=settings.SMTP_POOL_SIZE
+)
@@ -1,53 +1,217 @@
-
+import time
+import queue
 import smtplib
 import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from jinja2 import Environment
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-class EmailService:
-    def __init__(self):
-        self.enabled = bool(settings.SMTP_HOST)
-    
-    def send_submission_email(self, to_email: str, pdf_url: str, form_title: str):
-        """
-        Sends an email with the PDF link.
-        If SMTP is not configured, mocks the email by logging it.
-        """
-        subject = f"Your Form Submission: {form_title}"
-        body = f"""
+SUBMISSION_EMAIL_TEMPLATE = Environment(autoescape=True).from_string("""
         <h1>Submission Received</h1>
-        <p>Thank you for submitting <b>{form_title}</b>.</p>
+        <p>Thank you for submitting <b>{{ form_title }}</b>.</p>
         <p>You can download your PDF copy here:</p>
-        <p><a href="{pdf_url}">Download PDF</a></p>
+        <p><a href="{{ pdf_url }}">Download PDF</a></p>
         <br>
         <p>Regards,<br>Smart Form Automation</p>
-        """
+        """)
 
-        if not self.enabled:
-            logger.info("------------------------------------------------")
-            logger.info(f"[MOCK EMAIL] To: {to_email}")
-            logger.info(f"[MOCK EMAIL] Subject: {subject}")
-            logger.info(f"[MOCK EMAIL] Body: {body}")
-            logger.info("------------------------------------------------")
+# Placeholder kept through pre-rendering and swapped for each message's link
+_PDF_URL_MARKER = "\x00pdf_url\x00"
+
+@lru_cache(maxsize=1024)
+def compile_submission_email(form_title: str) -> Tuple[str, str, str]:
+    """
+    The confirmation email of a form, rendered once: (subject, body before
+    the PDF link, body after it).
+    """
+    body = SUBMISSION_EMAIL_TEMPLATE.render(form_title=form_title, pdf_url=_PDF_URL_MARKER)
+    before, after = body.split(_PDF_URL_MARKER, 1)
+    return f"Your Form Submission: {form_title}", before, after
+
+class RateLimiter:
+    """
+    Token bucket shared by all sending threads (rate <= 0 disables it).
+    """
+    def __init__(self, rate_per_second: float):
+        self.rate = rate_per_second
+        self.tokens = max(rate_per_second, 1.0)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
             return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP connections (STARTTLS + LOGIN done
+    once) and hands them out for many messages. Connections idle for longer
+    than `idle_seconds` are checked with NOOP; broken ones are replaced.
+    """
+    def __init__(self, size: int, idle_seconds: float):
+        self.size = max(size, 1)
+        self.idle_seconds = idle_seconds
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        if settings.SMTP_STARTTLS: # Off only for local test servers without TLS
+            server.starttls()
+        if settings.SMTP_USER: # Unauthenticated relays skip login, not TLS
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - released_at < self.idle_seconds:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(server)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """
+        Yields a pooled connection. If the body raises, the connection is
+        dropped (it may be mid-transaction or disconnected).
+        """
+        self._slots.acquire()
+        try:
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                self._close(server)
+                raise
+            self._idle.put((server, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+class EmailService:
+    def __init__(self):
+        self.enabled = bool(settings.SMTP_HOST)
+        self.pool = SMTPConnectionPool(settings.SMTP_POOL_SIZE, settings.SMTP_IDLE_SECONDS)
+        self.rate_limiter = RateLimiter(settings.SMTP_RATE_LIMIT_PER_SECOND)
 
+    def send_submission_email(self, to_email: str, pdf_url: str, form_title: str):
+        """
+        Sends an email with the PDF link, logging (not raising) failures.
+        """
         try:
-            msg = MIMEMultipart()
-            msg["From"] = settings.EMAILS_FROM_EMAIL
-            msg["To"] = to_email
-            msg["Subject"] = subject
-            msg.attach(MIMEText(body, "html"))
-
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.sendmail(settings.EMAILS_FROM_EMAIL, to_email, msg.as_string())
-            
-            logger.info(f"Email sent to {to_email}")
+            self.deliver_submission_email(to_email, pdf_url, form_title)
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {e}")
 
+    def build_submission_email(self, to_email: str, pdf_url: str, form_title: str) -> MIMEMultipart:
+        subject, before, after = compile_submission_email(form_title)
+        msg = MIMEMultipart()
+        msg["From"] = settings.EMAILS_FROM_EMAIL
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(before + str(pdf_url) + after, "html"))
+        return msg
+
+    def deliver_submission_email(self, to_email: str, pdf_url: str, form_title: str):
+        """
+        Sends an email with the PDF link. Raises on SMTP errors so callers can retry.
+        If SMTP is not configured, mocks the email by logging it.
+        """
+        errors = self.deliver_batch([(to_email, pdf_url, form_title)])
+        if errors[0] is not None:
+            raise errors[0]
+
+    def deliver_batch(self, messages: List[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+        """
+        Sends (to_email, pdf_url, form_title) messages over one pooled
+        connection, honouring the rate limit. Returns the error of each
+        message (None if sent). A dropped connection is re-established once
+        per message before it counts as failed.
+        """
+        if not self.enabled:
+            for to_email, pdf_url, form_title in messages:
+                msg = self.build_submission_email(to_email, pdf_url, form_title)
+                logger.info("------------------------------------------------")
+                logger.info(f"[MOCK EMAIL] To: {to_email}")
+                logger.info(f"[MOCK EMAIL] Subject: {msg['Subject']}")
+                logger.info(f"[MOCK EMAIL] Body: {msg.get_payload()[0].get_payload()}")
+                logger.info("------------------------------------------------")
+            return [None] * len(messages)
+
+        errors: List[Optional[Exception]] = []
+        index = 0
+        retried = False
+        while index < len(messages):
+            try:
+                with self.pool.connection() as server:
+                    while index < len(messages):
+                        to_email, pdf_url, form_title = messages[index]
+                        msg = self.build_submission_email(to_email, pdf_url, form_title)
+                        self.rate_limiter.acquire()
+                        try:
+                            server.sendmail(settings.EMAILS_FROM_EMAIL, to_email, msg.as_string())
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                            # Message rejected; the connection stays usable
+                            errors.append(e)
+                            index += 1
+                            server.rset()
+                        else:
+                            logger.info(f"Email sent to {to_email}")
+                            errors.append(None)
+                            index += 1
+                        retried = False
+            except (smtplib.SMTPException, OSError) as e:
+                # The pool dropped the broken connection: retry this message once on a fresh one
+                if retried:
+                    errors.append(e)
+                    index += 1
+                    retried = False
+                else:
+                    logger.warning(f"SMTP connection failed, reconnecting: {e}")
+                    retried = True
+        return errors
+
 email_service = EmailService()
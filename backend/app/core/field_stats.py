@@ -0,0 +1,230 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.db import SessionLocal
+from app.core.outbox import job_row, complete_job, fail_job
+from app.core.form_runtime import form_runtime_cache, CompiledForm
+from app.core.logic.field_summary import FieldSummary, RunningStats, summarize_fields, NUMBER_TYPES, OPTION_TYPES
+from app.core.logic.validation import iter_schema_fields
+from app.core.submission_sketches import sketch_rows, merge_sketches, clear_sketches
+from app.models.field_stats import FieldStats
+from app.models.form import FormVersion, Submission
+from app.models.outbox import OutboxJob
+
+logger = logging.getLogger(__name__)
+
+# Outbox kind of the jobs folding new submissions into field_stats and
+# submission_sketches. They are applied in micro-batches by
+# app.core.analytics_aggregator, not by drain_once.
+ANALYTICS_KIND = "analytics"
+
+# version id -> field id -> summary
+Summaries = Dict[int, Dict[str, FieldSummary]]
+
+def analytics_job(form_id: int, submission_ids: Iterable[int]) -> Dict[str, Any]:
+    """
+    Outbox row folding the given (just inserted) submissions into the analytics tables.
+    """
+    return job_row(ANALYTICS_KIND, payload={"form_id": form_id, "submission_ids": list(submission_ids)})
+
+def _version_fields(db: Session, version_id: int) -> List[Dict[str, Any]]:
+    compiled = form_runtime_cache.get_version(db, version_id)
+    return list(iter_schema_fields(compiled.schema)) if compiled else []
+
+def summarize_rows(db: Session, rows: Iterable[Tuple[int, dict]], into: Optional[Summaries] = None) -> Summaries:
+    """
+    Folds (form_version_id, raw_data) rows into per-version field summaries.
+    """
+    into = into if into is not None else {}
+    by_version: Dict[int, List[dict]] = defaultdict(list)
+    for version_id, raw_data in rows:
+        by_version[version_id].append(raw_data)
+    for version_id, answers in by_version.items():
+        summaries = summarize_fields(_version_fields(db, version_id), answers)
+        target = into.setdefault(version_id, {})
+        for field_id, summary in summaries.items():
+            if field_id in target:
+                target[field_id].merge(summary)
+            else:
+                target[field_id] = summary
+    return into
+
+def _to_summary(row: FieldStats) -> FieldSummary:
+    numbers = RunningStats(row.num_count, row.num_mean, row.num_m2, row.num_min, row.num_max)
+    return FieldSummary(row.seen, row.filled, numbers, row.option_counts)
+
+def _store(row: FieldStats, summary: FieldSummary) -> None:
+    row.seen = summary.seen
+    row.filled = summary.filled
+    row.num_count = summary.numbers.count
+    row.num_mean = summary.numbers.mean
+    row.num_m2 = summary.numbers.m2
+    row.num_min = summary.numbers.min
+    row.num_max = summary.numbers.max
+    row.option_counts = dict(summary.options)
+
+def merge_summaries(db: Session, summaries: Summaries) -> None:
+    """
+    Merges partial summaries into field_stats (rows locked while merged).
+    The caller commits.
+    """
+    keys = [(version_id, field_id) for version_id, fields in summaries.items() for field_id in fields]
+    if not keys:
+        return
+    db.execute(insert(FieldStats).values([
+        {"form_version_id": version_id, "field_id": field_id, "seen": 0, "filled": 0,
+         "num_count": 0, "num_mean": 0.0, "num_m2": 0.0, "option_counts": {}}
+        for version_id, field_id in sorted(keys)
+    ]).on_conflict_do_nothing(index_elements=[FieldStats.form_version_id, FieldStats.field_id]))
+
+    rows = db.query(FieldStats).filter(
+        tuple_(FieldStats.form_version_id, FieldStats.field_id).in_(keys)
+    ).order_by(FieldStats.form_version_id, FieldStats.field_id).with_for_update().all()
+    for row in rows:
+        merged = _to_summary(row)
+        merged.merge(summaries[row.form_version_id][row.field_id])
+        _store(row, merged)
+
+def _claim_pending(db: Session, limit: int, job_id: Optional[int] = None) -> List[OutboxJob]:
+    # Waits while a rebuild (EXCLUSIVE) is replacing the rows
+    db.execute(text("LOCK TABLE field_stats IN ROW EXCLUSIVE MODE"))
+    query = db.query(OutboxJob).filter(
+        OutboxJob.kind == ANALYTICS_KIND,
+        OutboxJob.status == "pending",
+        OutboxJob.available_at <= datetime.utcnow()
+    )
+    if job_id is not None:
+        query = query.filter(OutboxJob.id == job_id)
+    return query.order_by(OutboxJob.id).limit(limit).with_for_update(skip_locked=True).all()
+
+def _apply(db: Session, jobs: List[OutboxJob]) -> None:
+    submission_ids = [submission_id for job in jobs for submission_id in (job.payload or {}).get("submission_ids", [])]
+    rows = db.query(
+        Submission.form_id, Submission.form_version_id, Submission.created_at, Submission.raw_data, Submission.computed_data
+    ).filter(Submission.id.in_(submission_ids)).all()
+    merge_summaries(db, summarize_rows(db, ((row.form_version_id, row.raw_data) for row in rows)))
+    merge_sketches(db, sketch_rows(db, rows))
+    for job in jobs:
+        job.attempts += 1
+        complete_job(db, job)
+
+def _apply_one(db: Session, job_id: int) -> bool:
+    """
+    Applies a single job in its own transaction. On error the attempt is
+    counted in a separate transaction and the job retried with backoff, or
+    failed once its attempts are exhausted. Returns True if it was applied.
+    """
+    try:
+        jobs = _claim_pending(db, 1, job_id)
+        if not jobs:
+            db.rollback()
+            return False
+        _apply(db, jobs)
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        job = db.get(OutboxJob, job_id)
+        job.attempts += 1
+        fail_job(db, job, f"{type(e).__name__}: {e}")
+        db.commit()
+        return False
+
+def apply_pending(db: Session, limit: int) -> int:
+    """
+    One micro-batch: claims up to `limit` due analytics jobs, folds their
+    submissions into field_stats and the daily sketches and completes the
+    jobs, all in one transaction, so each submission is counted exactly
+    once. If the batch fails, its jobs are applied one at a time so a bad
+    one is retried (and eventually failed) without holding up the others.
+    Returns the number of jobs applied.
+    """
+    jobs = _claim_pending(db, limit)
+    if not jobs:
+        db.rollback()
+        return 0
+    job_ids = [job.id for job in jobs]
+    try:
+        _apply(db, jobs)
+        db.commit()
+        return len(jobs)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Analytics batch of {len(job_ids)} job(s) failed, applying them one by one: {e}")
+    return sum(_apply_one(db, job_id) for job_id in job_ids)
+
+def rebuild_field_stats(form_id: int, batch_size: int = 5000) -> Dict[str, Any]:
+    """
+    Recomputes field_stats of every version of a form, and its daily
+    sketches, by streaming its submissions from a server-side cursor. Runs in
+    one REPEATABLE READ transaction holding an EXCLUSIVE lock on field_stats
+    (which the aggregator takes before either table): analytics jobs of
+    submissions in the snapshot are completed here, later ones are applied
+    by the aggregator once the rebuild commits.
+    """
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        db.execute(text("LOCK TABLE field_stats IN EXCLUSIVE MODE"))
+        version_ids = [row.id for row in db.query(FormVersion.id).filter(FormVersion.form_id == form_id)]
+        if version_ids:
+            db.execute(delete(FieldStats).where(FieldStats.form_version_id.in_(version_ids)))
+        clear_sketches(db, form_id)
+
+        stmt = select(
+            Submission.form_id, Submission.form_version_id, Submission.created_at, Submission.raw_data, Submission.computed_data
+        ).where(
+            Submission.form_id == form_id
+        ).order_by(Submission.id).execution_options(yield_per=batch_size)
+        summaries: Summaries = {}
+        sketches = {}
+        scanned = 0
+        for batch in db.execute(stmt).partitions():
+            summarize_rows(db, ((row.form_version_id, row.raw_data) for row in batch), into=summaries)
+            sketch_rows(db, batch, into=sketches)
+            scanned += len(batch)
+            logger.info(f"Field stats rebuild of form {form_id}: scanned {scanned}")
+        merge_summaries(db, summaries)
+        merge_sketches(db, sketches)
+
+        # Their submissions are already in the snapshot counted above
+        superseded = db.query(OutboxJob).filter(
+            OutboxJob.kind == ANALYTICS_KIND,
+            OutboxJob.status == "pending",
+            OutboxJob.payload["form_id"].as_integer() == form_id
+        ).all()
+        for job in superseded:
+            complete_job(db, job)
+        db.commit()
+        return {"form_id": form_id, "versions": len(summaries), "scanned": scanned, "superseded_jobs": len(superseded)}
+    finally:
+        db.close()
+
+def read_field_stats(db: Session, compiled: CompiledForm) -> Dict[str, Any]:
+    """
+    Per-field summary of a version, in schema order.
+    """
+    rows = {row.field_id: row for row in db.query(FieldStats).filter(FieldStats.form_version_id == compiled.version_id)}
+    submissions = max((row.seen for row in rows.values()), default=0)
+    fields = []
+    for field in iter_schema_fields(compiled.schema):
+        field_id = field.get("id")
+        row = rows.get(field_id)
+        summary = _to_summary(row) if row is not None else FieldSummary()
+        entry = {
+            "id": field_id,
+            "type": field.get("type"),
+            "label": field.get("label", field_id),
+            "filled": summary.filled,
+            "fill_rate": (summary.filled / summary.seen) if summary.seen else None,
+        }
+        if field.get("type") in NUMBER_TYPES:
+            entry["numeric"] = summary.numbers.to_dict()
+        if field.get("type") in OPTION_TYPES:
+            entry["options"] = dict(summary.options.most_common())
+        fields.append(entry)
+    return {"version_id": compiled.version_id, "version": compiled.version_number, "submissions": submissions, "fields": fields}
@@ -0,0 +1,178 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Set, AbstractSet
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.form import Form, FormVersion
+from app.core.logic.validation import compile_schema, iter_schema_fields
+from app.core.logic.rules import compile_rules
+from app.core.logic.formulas import compile_formulas
+from app.core.logic.projection import compile_destinations
+
+class CompiledForm:
+    """
+    Everything the public submit path needs for one FormVersion, resolved once.
+    Holds plain values only (no ORM instances) so it can be shared across
+    requests and threads.
+    """
+    def __init__(self, form: Form, version: FormVersion):
+        self.form_id = form.id
+        self.form_title = form.title
+        self.slug = form.slug
+
+        self.version_id = version.id
+        self.version_number = version.version_number
+        self.schema = version.schema_json or {}
+        self.rules = version.rules_json or []
+        self.formulas = version.formulas_json or []
+        self.pdf_template = version.pdf_template
+        self.pdf_mode = version.pdf_mode or "eager"
+        self.webhook_url = version.webhook_url
+        self.webhook_batch = self._webhook_batch(version)
+        self.webhook_destinations = compile_destinations(self.webhook_url, version.webhook_destinations)
+
+        self.validator = compile_schema(self.schema, strict=False)
+        self.formula_program = compile_formulas(self.formulas, strict=False)
+        self.rule_table = compile_rules(self.rules)
+        self.email_field_id = self._find_email_field()
+
+    @staticmethod
+    def _webhook_batch(version: FormVersion) -> Optional[Dict[str, Any]]:
+        if not version.webhook_batch_size:
+            return None
+        return {
+            "max_size": min(version.webhook_batch_size, settings.WEBHOOK_BATCH_MAX_SIZE),
+            "window_seconds": version.webhook_batch_window_seconds or settings.WEBHOOK_BATCH_WINDOW_SECONDS,
+        }
+
+    def _find_email_field(self) -> Optional[str]:
+        for field in iter_schema_fields(self.schema):
+            if field.get("type") == "email":
+                return field.get("id")
+        return None
+
+    def strip_hidden(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Set[str]]:
+        """
+        Applies the visibility rules: returns the answers without hidden fields,
+        and the set of hidden field ids.
+        """
+        hidden = self.rule_table.hidden_fields(data)
+        if not hidden:
+            return data, hidden
+        return {key: value for key, value in data.items() if key not in hidden}, hidden
+
+    def validate(self, data: Dict[str, Any], collect_all: bool = False, hidden: AbstractSet[str] = frozenset()) -> None:
+        self.validator.validate(data, collect_all=collect_all, hidden=hidden)
+
+    def compute(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self.formula_program.evaluate(data)
+
+    def visibility(self, data: Dict[str, Any]) -> Dict[str, bool]:
+        return self.rule_table.evaluate(data)
+
+    def visibility_delta(self, changed_fields: List[str], data: Dict[str, Any]) -> Dict[str, bool]:
+        return self.rule_table.evaluate_delta(changed_fields, data)
+
+class FormRuntimeCache:
+    """
+    In-process LRU of CompiledForm keyed by slug (latest version) and version id.
+
+    Entries expire after FORM_RUNTIME_CACHE_TTL_SECONDS so that other API
+    processes pick up new versions even though invalidation is local.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._by_slug: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_version: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _lookup(self, table: OrderedDict, key) -> Optional[CompiledForm]:
+        with self._lock:
+            entry = table.get(key)
+            if entry is not None:
+                compiled, loaded_at = entry
+                if time.monotonic() - loaded_at < self.ttl_seconds:
+                    table.move_to_end(key)
+                    self.hits += 1
+                    return compiled
+                del table[key]
+            self.misses += 1
+            return None
+
+    def _store(self, compiled: CompiledForm, by_slug: bool) -> None:
+        entry = (compiled, time.monotonic())
+        with self._lock:
+            if by_slug:
+                self._by_slug[compiled.slug] = entry
+                self._by_slug.move_to_end(compiled.slug)
+            self._by_version[compiled.version_id] = entry
+            self._by_version.move_to_end(compiled.version_id)
+            for table in (self._by_slug, self._by_version):
+                while len(table) > self.max_size:
+                    table.popitem(last=False)
+
+    def get_latest(self, db: Session, slug: str) -> Optional[CompiledForm]:
+        """
+        Returns the compiled latest version of the form, or None if the form
+        does not exist or has no versions.
+        """
+        compiled = self._lookup(self._by_slug, slug)
+        if compiled is not None:
+            return compiled
+
+        form = db.query(Form).filter(Form.slug == slug).first()
+        if not form:
+            return None
+        version = db.query(FormVersion).filter(FormVersion.form_id == form.id).order_by(FormVersion.version_number.desc()).first()
+        if not version:
+            return None
+
+        compiled = CompiledForm(form, version)
+        self._store(compiled, by_slug=True)
+        return compiled
+
+    def get_version(self, db: Session, version_id: int) -> Optional[CompiledForm]:
+        """
+        Returns a specific compiled version (used for stored submissions).
+        """
+        compiled = self._lookup(self._by_version, version_id)
+        if compiled is not None:
+            return compiled
+
+        version = db.query(FormVersion).filter(FormVersion.id == version_id).first()
+        if not version:
+            return None
+
+        compiled = CompiledForm(version.form, version)
+        self._store(compiled, by_slug=False)
+        return compiled
+
+    def invalidate(self, slug: str) -> None:
+        """
+        Drops the cached latest version for a form. Called when a version is added.
+        """
+        with self._lock:
+            self._by_slug.pop(slug, None)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._by_slug),
+                "versions": len(self._by_version),
+            }
+
+form_runtime_cache = FormRuntimeCache(
+    max_size=settings.FORM_RUNTIME_CACHE_SIZE,
+    ttl_seconds=settings.FORM_RUNTIME_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,101 @@
+import math
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional
+
+NUMBER_TYPES = {"number"}
+OPTION_TYPES = {"select", "radio"}
+
+class RunningStats:
+    """
+    Count, mean and sum of squared deviations (Welford), plus min/max.
+    Two instances merge exactly (Chan et al.), so partial results from
+    micro-batches combine into the same numbers as one pass over all values.
+    """
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "RunningStats") -> None:
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> Optional[float]:
+        # Sample variance
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "min": self.min, "max": self.max, "mean": self.mean if self.count else None, "variance": self.variance}
+
+class FieldSummary:
+    """
+    Answer distribution of one field: how many submissions were seen and
+    answered it, running stats of numeric answers and option frequencies.
+    """
+    def __init__(self, seen: int = 0, filled: int = 0, numbers: Optional[RunningStats] = None, options: Optional[Dict[str, int]] = None):
+        self.seen = seen
+        self.filled = filled
+        self.numbers = numbers or RunningStats()
+        self.options = Counter(options or {})
+
+    def merge(self, other: "FieldSummary") -> None:
+        self.seen += other.seen
+        self.filled += other.filled
+        self.numbers.merge(other.numbers)
+        self.options.update(other.options)
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def summarize_fields(fields: List[Dict[str, Any]], answers: Iterable[Dict[str, Any]]) -> Dict[str, FieldSummary]:
+    """
+    Summarizes answer sets against the schema fields of their version:
+    {field_id: FieldSummary}. Every answer set counts as seen by every field.
+    """
+    typed = [(field.get("id"), field.get("type")) for field in fields if field.get("id") is not None]
+    summaries = {field_id: FieldSummary() for field_id, _ in typed}
+    for data in answers:
+        data = data or {}
+        for field_id, field_type in typed:
+            summary = summaries[field_id]
+            summary.seen += 1
+            value = data.get(field_id)
+            if value is None or value == "" or value == []:
+                continue
+            summary.filled += 1
+            if field_type in NUMBER_TYPES:
+                number = _as_number(value)
+                if number is not None:
+                    summary.numbers.add(number)
+            elif field_type in OPTION_TYPES:
+                for option in (value if isinstance(value, list) else [value]):
+                    summary.options[str(option)] += 1
+    return summaries
@@ -1,7 +1,10 @@
 import ast
+import logging
 import operator
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
 
 # Allowed operators
 OPERATORS = {
@@ -28,98 +31,223 @@ FUNCTIONS = {
     "sum": sum
 }
 
+# {{variable}} placeholders. Bare names ("qty * price", as the agent generates) also work.
+PLACEHOLDER_REGEX = re.compile(r"\{\{([^}]+)\}\}")
+
 class FormulaError(Exception):
     pass
 
-class FormulaEvaluator:
-    def __init__(self, data: Dict[str, Any]):
-        self.data = data
-
-    def _eval(self, node):
-        if isinstance(node, ast.Num):
-            return node.n
-        elif isinstance(node, ast.Constant):  # Python 3.8+
-            return node.value
-        elif isinstance(node, ast.BinOp):
-            op_type = type(node.op)
-            if op_type not in OPERATORS:
-                raise FormulaError(f"Operator {op_type} not allowed")
-            return OPERATORS[op_type](self._eval(node.left), self._eval(node.right))
-        elif isinstance(node, ast.UnaryOp):
-            op_type = type(node.op)
-            if op_type not in OPERATORS:
-                raise FormulaError(f"Operator {op_type} not allowed")
-            return OPERATORS[op_type](self._eval(node.operand))
-        elif isinstance(node, ast.Call):
-            if not isinstance(node.func, ast.Name):
-               raise FormulaError("Function calls must be direct names")
-            func_name = node.func.id
-            if func_name not in FUNCTIONS:
-                raise FormulaError(f"Function '{func_name}' not allowed")
-            args = [self._eval(arg) for arg in node.args]
-            return FUNCTIONS[func_name](*args if func_name != 'sum' else [args]) 
-            # Note: sum() expects an iterable, but our args are unwrapped. 
-            # Adjusting: sum takes iterable. python sum([1,2]). 
-            # If user writes sum(1, 2) it fails. 
-            # Let's handle generic args.
-            
-        elif isinstance(node, ast.Expression):
-             return self._eval(node.body)
-        else:
-            raise FormulaError(f"Node type {type(node)} not allowed in safety sandbox")
-
-    def evaluate(self, expression: str) -> float:
-        """
-        Evaluates a mathemtical expression.
-        Expression should have field references resolved BEFORE calling this 
-        OR we resolve them here. 
-        Current approach: Pre-resolution.
-        """
+# A compiled node: takes the working data, returns a value
+Evaluator = Callable[[Dict[str, Any]], Any]
+
+def coerce_value(value: Any) -> Any:
+    """
+    Converts an answer to a formula operand. Missing/empty answers count as 0
+    and numeric strings become numbers, as they did with text substitution.
+    """
+    if value is None or value == "":
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise FormulaError(f"Value {value!r} is not a number")
+
+def _compile_node(node: ast.AST) -> Evaluator:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda data: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda data: coerce_value(data.get(name))
+
+    if isinstance(node, ast.BinOp):
+        op = OPERATORS.get(type(node.op))
+        if op is None:
+            raise FormulaError(f"Operator {type(node.op)} not allowed")
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda data: op(left(data), right(data))
+
+    if isinstance(node, ast.UnaryOp):
+        op = OPERATORS.get(type(node.op))
+        if op is None:
+            raise FormulaError(f"Operator {type(node.op)} not allowed")
+        operand = _compile_node(node.operand)
+        return lambda data: op(operand(data))
+
+    if isinstance(node, ast.Compare):
+        ops = []
+        for op_node in node.ops:
+            op = OPERATORS.get(type(op_node))
+            if op is None:
+                raise FormulaError(f"Operator {type(op_node)} not allowed")
+            ops.append(op)
+        operands = [_compile_node(node.left)] + [_compile_node(c) for c in node.comparators]
+
+        def compare(data):
+            values = [operand(data) for operand in operands]
+            return all(op(values[i], values[i + 1]) for i, op in enumerate(ops))
+        return compare
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name):
+            raise FormulaError("Function calls must be direct names")
+        func_name = node.func.id
+        if func_name not in FUNCTIONS:
+            raise FormulaError(f"Function '{func_name}' not allowed")
+        if node.keywords:
+            raise FormulaError("Keyword arguments are not allowed")
+        func = FUNCTIONS[func_name]
+        args = [_compile_node(arg) for arg in node.args]
+        if func_name == "sum":
+            # sum() takes an iterable: sum(a, b, c) sums its arguments
+            return lambda data: func([arg(data) for arg in args])
+        return lambda data: func(*[arg(data) for arg in args])
+
+    raise FormulaError(f"Node type {type(node)} not allowed in safety sandbox")
+
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parses a formula into an AST whose Name nodes carry the referenced field ids,
+    whether written as {{field}} or as bare names.
+    """
+    placeholders = {}
+
+    def to_identifier(match):
+        identifier = f"__var_{len(placeholders)}__"
+        placeholders[identifier] = match.group(1)
+        return identifier
+
+    try:
+        tree = ast.parse(PLACEHOLDER_REGEX.sub(to_identifier, expression), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Syntax error: {e.msg}")
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in placeholders:
+            node.id = placeholders[node.id]
+    return tree
+
+def referenced_fields(tree: ast.AST) -> Set[str]:
+    called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and id(node) not in called}
+
+class CompiledFormula:
+    def __init__(self, target: str, expression: str):
+        self.target = target
+        self.expression = expression
+        self.tree: Optional[ast.Expression] = None
+        self.dependencies: Set[str] = set()
+        self.error: Optional[str] = None
         try:
-            tree = ast.parse(expression, mode='eval')
-            return self._eval(tree.body)
+            self.tree = parse_expression(expression)
+            self.dependencies = referenced_fields(self.tree) - {target}
+            self.evaluator = _compile_node(self.tree.body)
+        except FormulaError as e:
+            self.error = str(e)
+            self.evaluator = None
+
+    def evaluate(self, data: Dict[str, Any]) -> Any:
+        if self.error:
+            raise FormulaError(self.error)
+        try:
+            return self.evaluator(data)
+        except FormulaError:
+            raise
         except Exception as e:
             raise FormulaError(f"Evaluation error: {str(e)}")
 
-def process_formulas(formulas: List[Dict[str, Any]], data: Dict[str, Any]) -> Dict[str, Any]:
+class FormulaProgram:
     """
-    Formulas format: 
-    [ { "target_field": "total", "expression": "{{qty}} * {{price}}" } ]
+    Formulas of one FormVersion compiled into evaluators, ordered by their
+    dependencies (a formula may reference the targets of other formulas).
     """
-    computed = {}
-    
-    # Simple Topological sort issues? 
-    # For MVP, assume order in list is correct execution order.
-    
-    # 1. Resolve variables
-    # We allow formulas to reference previously computed values too.
-    working_data = {**data} # Copy
-    
+    def __init__(self, formulas: List[CompiledFormula]):
+        self.formulas = formulas
+        self.targets = [f.target for f in formulas]
+
+    def evaluate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        computed = {}
+        working_data = {**data} # Computed values are visible to later formulas
+        for formula in self.formulas:
+            try:
+                result = formula.evaluate(working_data)
+            except FormulaError as e:
+                result = 0
+                logger.warning(f"Formula error for {formula.target}: {e}")
+            computed[formula.target] = result
+            working_data[formula.target] = result
+        return computed
+
+def _topological_order(formulas: List[CompiledFormula]) -> List[CompiledFormula]:
+    """
+    Kahn's algorithm, keeping the declared order among independent formulas.
+    Raises FormulaError naming the formulas involved in a cycle.
+    """
+    by_target = {f.target: f for f in formulas}
+    dependents: Dict[str, List[str]] = {target: [] for target in by_target}
+    pending = {}
     for f in formulas:
-        target = f.get("target_field")
-        raw_expr = f.get("expression", "")
-        
-        # Regex to find {{variable}}
-        # We replace them with their numeric values.
-        # If value is string, we might break.
-        
-        def replace_var(match):
-            key = match.group(1)
-            val = working_data.get(key, 0) # Default to 0 if missing
-            if val is None or val == "": val = 0
-            return str(val)
-            
-        # Replace {{key}} with value
-        expr_with_values = re.sub(r"\{\{([^}]+)\}\}", replace_var, raw_expr)
-        
-        try:
-            evaluator = FormulaEvaluator(working_data)
-            result = evaluator.evaluate(expr_with_values)
-            computed[target] = result
-            working_data[target] = result
-        except Exception as e:
-            computed[target] = 0 # Or error?
-            # Log error
-            print(f"Formula Error for {target}: {e}")
-            
-    return computed
+        deps = f.dependencies & by_target.keys()
+        pending[f.target] = len(deps)
+        for dep in deps:
+            dependents[dep].append(f.target)
+
+    ready = [f.target for f in formulas if pending[f.target] == 0]
+    position = {f.target: i for i, f in enumerate(formulas)}
+    ordered = []
+    while ready:
+        target = ready.pop(0)
+        ordered.append(by_target[target])
+        for dependent in dependents[target]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+                ready.sort(key=position.get)
+
+    if len(ordered) != len(formulas):
+        cycle = sorted(target for target, count in pending.items() if count > 0)
+        raise FormulaError(f"Circular formula references: {', '.join(cycle)}")
+    return ordered
+
+def compile_formulas(formulas: List[Dict[str, Any]], strict: bool = True) -> FormulaProgram:
+    """
+    Formulas format:
+    [ { "target_field": "total", "expression": "{{qty}} * {{price}}" } ]
+    ("field" is accepted for "target_field", as generated by the agent.)
+
+    strict=True (saving a version) raises FormulaError for invalid expressions
+    and circular references. strict=False (stored versions) keeps serving:
+    invalid formulas evaluate to 0 and a cycle falls back to declared order.
+    """
+    compiled: Dict[str, CompiledFormula] = {}
+    for f in formulas or []:
+        target = f.get("target_field") or f.get("field")
+        formula = CompiledFormula(target, f.get("expression", "") or "")
+        if strict and formula.error:
+            raise FormulaError(f"Formula for '{target}': {formula.error}")
+        compiled.pop(target, None) # Last definition of a target wins
+        compiled[target] = formula
+
+    try:
+        ordered = _topological_order(list(compiled.values()))
+    except FormulaError:
+        if strict:
+            raise
+        ordered = list(compiled.values())
+    return FormulaProgram(ordered)
+
+def process_formulas(formulas: List[Dict[str, Any]], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compiles and evaluates formulas in one go. Prefer compile_formulas once per
+    version (see app.core.form_runtime) on hot paths.
+    """
+    return compile_formulas(formulas, strict=False).evaluate(data)
@@ -0,0 +1,52 @@
+from typing import Dict, Any, List, Optional, Callable
+
+# Takes an answers/computed dict, returns the projected copy
+Projection = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+def compile_projection(include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> Projection:
+    """
+    Compiles a field projection. `include` keeps only the listed fields,
+    `exclude` drops the listed ones; both may be combined.
+    """
+    included = frozenset(include) if include else None
+    excluded = frozenset(exclude or ())
+
+    if included is None and not excluded:
+        return lambda data: data
+    if included is None:
+        return lambda data: {key: value for key, value in data.items() if key not in excluded}
+    keep = included - excluded
+    return lambda data: {key: data[key] for key in keep if key in data}
+
+class WebhookDestination:
+    """
+    One webhook target of a FormVersion, with its payload projection compiled once.
+
+    Destination Format Example:
+    { "url": "https://n8n.example.com/webhook/crm", "include": ["email", "total"],
+      "exclude": [], "computed_only": false }
+    computed_only sends the computed values without the raw answers.
+    """
+    def __init__(self, spec: Dict[str, Any]):
+        self.url = spec.get("url")
+        self.computed_only = bool(spec.get("computed_only", False))
+        self.project = compile_projection(spec.get("include"), spec.get("exclude"))
+
+    def project_submission(self, raw_data: Dict[str, Any], computed_data: Dict[str, Any]):
+        """
+        Returns (data, computed) as sent to this destination.
+        """
+        data = {} if self.computed_only else self.project(raw_data or {})
+        return data, self.project(computed_data or {})
+
+def compile_destinations(webhook_url: Optional[str], destinations: Optional[List[Dict[str, Any]]]) -> List[WebhookDestination]:
+    """
+    The legacy single webhook_url (full payload) followed by the configured destinations.
+    """
+    compiled = []
+    if webhook_url:
+        compiled.append(WebhookDestination({"url": webhook_url}))
+    for spec in destinations or []:
+        if spec.get("url"):
+            compiled.append(WebhookDestination(spec))
+    return compiled
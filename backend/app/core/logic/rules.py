@@ -1,63 +1,217 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Iterable, Set
 
-def evaluate_rules(rules: List[Dict[str, Any]], data: Dict[str, Any]) -> Dict[str, bool]:
+# Reads the (visibility-aware) value of a field
+ValueGetter = Callable[[str], Any]
+
+OPERATORS = ("eq", "neq", "gt", "lt", "inc")
+EFFECTS = ("show", "hide")
+
+class RuleError(ValueError):
+    pass
+
+def _compile_comparison(operator: str, trigger_value: Any) -> Callable[[Any], bool]:
+    """
+    Compiles one trigger comparison. Numeric trigger values are parsed once;
+    answers are coerced to float when possible, otherwise compared as-is.
+    """
+    numeric_trigger = float(trigger_value) if isinstance(trigger_value, (int, float)) else None
+
+    def coerce(actual_value):
+        if numeric_trigger is not None and isinstance(actual_value, (int, float, str)):
+            try:
+                return float(actual_value), numeric_trigger
+            except ValueError:
+                pass # compare as strings
+        return actual_value, trigger_value
+
+    if operator == "eq":
+        def compare(actual_value):
+            actual, expected = coerce(actual_value)
+            return actual == expected
+    elif operator == "neq":
+        def compare(actual_value):
+            actual, expected = coerce(actual_value)
+            return actual != expected
+    elif operator == "gt":
+        def compare(actual_value):
+            actual, expected = coerce(actual_value)
+            try: return actual > expected
+            except TypeError: return False
+    elif operator == "lt":
+        def compare(actual_value):
+            actual, expected = coerce(actual_value)
+            try: return actual < expected
+            except TypeError: return False
+    elif operator == "inc": # includes
+        expected_text = str(trigger_value)
+        def compare(actual_value):
+            return expected_text in str(actual_value)
+    else:
+        def compare(actual_value):
+            return False
+    return compare
+
+def _compile_condition(trigger: Dict[str, Any], strict: bool):
+    """
+    Returns (condition, trigger_fields) where condition(get_value) -> bool.
+
+    A trigger is either a comparison { "field", "operator", "value" } or a
+    compound { "all": [...] } / { "any": [...] } of triggers ("and"/"or" are
+    accepted as aliases). Compound conditions short-circuit.
+    """
+    for key, combine in (("all", all), ("and", all), ("any", any), ("or", any)):
+        if key in trigger:
+            children = trigger.get(key) or []
+            if not isinstance(children, list):
+                if strict:
+                    raise RuleError(f"'{key}' must be a list of triggers")
+                children = []
+            compiled = [_compile_condition(child or {}, strict) for child in children]
+            conditions = [condition for condition, _ in compiled]
+            fields = set().union(*(child_fields for _, child_fields in compiled))
+
+            def compound(get_value: ValueGetter, conditions=conditions, combine=combine) -> bool:
+                return combine(condition(get_value) for condition in conditions)
+            return compound, fields
+
+    field = trigger.get("field")
+    operator = trigger.get("operator")
+    if strict and not field:
+        raise RuleError("Trigger has no field")
+    if strict and operator not in OPERATORS:
+        raise RuleError(f"Operator {operator!r} not allowed (use one of {', '.join(OPERATORS)})")
+    compare = _compile_comparison(operator, trigger.get("value"))
+
+    def condition(get_value: ValueGetter) -> bool:
+        actual_value = get_value(field)
+        return actual_value is not None and compare(actual_value)
+    return condition, {field}
+
+class CompiledRule:
+    def __init__(self, rule: Dict[str, Any], strict: bool = False):
+        action = rule.get("action", {}) or {}
+        self.target = action.get("target_field")
+        self.effect = action.get("effect")
+        if strict and not self.target:
+            raise RuleError("Action has no target_field")
+        if strict and self.effect not in EFFECTS:
+            raise RuleError(f"Effect {self.effect!r} for '{self.target}' not allowed (use show or hide)")
+        try:
+            self.condition, self.trigger_fields = _compile_condition(rule.get("trigger", {}) or {}, strict)
+        except RuleError as e:
+            raise RuleError(f"Rule for '{self.target}': {e}")
+
+class RuleTable:
+    """
+    Visibility rules of one FormVersion compiled into decision tables per target
+    field, plus an index from trigger field to the targets it can affect.
+
+    A field targeted by a "show" rule is hidden unless a rule shows it; other
+    fields are visible unless a rule hides them. When several rules for a target
+    fire, the last one wins. A hidden field's answer is ignored by the rules it
+    triggers, so hiding a field can cascade (rule chains).
+    """
+    def __init__(self, rules: List[CompiledRule]):
+        self.rules_by_target: Dict[str, List[CompiledRule]] = {}
+        self.targets_by_trigger: Dict[str, Set[str]] = {}
+        for rule in rules:
+            if rule.target is None or rule.effect not in EFFECTS:
+                continue
+            self.rules_by_target.setdefault(rule.target, []).append(rule)
+            for field in rule.trigger_fields:
+                self.targets_by_trigger.setdefault(field, set()).add(rule.target)
+
+        self.default_visible = {
+            target: not any(rule.effect == "show" for rule in target_rules)
+            for target, target_rules in self.rules_by_target.items()
+        }
+
+    def _resolver(self, data: Dict[str, Any]):
+        memo: Dict[str, bool] = {}
+        visiting: Set[str] = set()
+
+        def get_value(field: str) -> Any:
+            if field in self.rules_by_target and not is_visible(field):
+                return None
+            return data.get(field)
+
+        def is_visible(target: str) -> bool:
+            if target in memo:
+                return memo[target]
+            if target in visiting: # Cyclic chain: fall back to the default
+                return self.default_visible[target]
+            visiting.add(target)
+            visible = self.default_visible[target]
+            for rule in self.rules_by_target[target]:
+                if rule.condition(get_value):
+                    visible = rule.effect == "show"
+            visiting.discard(target)
+            memo[target] = visible
+            return visible
+
+        return is_visible
+
+    def evaluate(self, data: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Visibility of every field targeted by a rule (untargeted fields are always visible).
+        """
+        is_visible = self._resolver(data)
+        return {target: is_visible(target) for target in self.rules_by_target}
+
+    def hidden_fields(self, data: Dict[str, Any]) -> Set[str]:
+        """
+        Fields hidden for these answers; their answers must be ignored.
+        """
+        if not self.rules_by_target:
+            return set()
+        is_visible = self._resolver(data)
+        return {target for target in self.rules_by_target if not is_visible(target)}
+
+    def affected_targets(self, changed_fields: Iterable[str]) -> Set[str]:
+        """
+        Targets whose visibility may change when `changed_fields` change,
+        following chains through targets that are themselves triggers.
+        """
+        affected: Set[str] = set()
+        stack = list(changed_fields)
+        while stack:
+            field = stack.pop()
+            for target in self.targets_by_trigger.get(field, ()):
+                if target not in affected:
+                    affected.add(target)
+                    stack.append(target)
+        return affected
+
+    def evaluate_delta(self, changed_fields: Iterable[str], data: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Visibility of only the targets affected by `changed_fields`.
+        Unrelated rules are not evaluated.
+        """
+        is_visible = self._resolver(data)
+        return {target: is_visible(target) for target in sorted(self.affected_targets(changed_fields))}
+
+def compile_rules(rules: Optional[List[Dict[str, Any]]], strict: bool = False) -> RuleTable:
     """
-    Evaluates rules to determine field visibility.
-    Returns a dictionary of field_id -> is_visible.
-    By default, all fields are visible unless a rule hides them.
-    
     Rule Format Example:
     {
       "trigger": { "field": "age", "operator": "lt", "value": 18 },
       "action": { "target_field": "beer_brand", "effect": "hide" }
     }
+    Compound trigger:
+    { "all": [ { "field": "age", "operator": "gt", "value": 17 },
+               { "any": [ { "field": "country", "operator": "eq", "value": "DE" },
+                          { "field": "country", "operator": "eq", "value": "FR" } ] } ] }
+
+    strict=True (saving a version) raises RuleError for rules without a target,
+    trigger field, known operator or show/hide effect. strict=False (stored
+    versions) keeps serving: such rules never fire or are ignored.
     """
-    # Initialize visibility map (we only track changes)
-    # Ideally, we should know all fields to set default True, 
-    # but for now we return overrides. The frontend/backend can merge.
-    visibility_overrides = {} 
-    
-    for rule in rules:
-        trigger = rule.get("trigger", {})
-        action = rule.get("action", {})
-        
-        trigger_field = trigger.get("field")
-        operator = trigger.get("operator")
-        trigger_value = trigger.get("value")
-        
-        actual_value = data.get(trigger_field)
-        
-        is_triggered = False
-        
-        if actual_value is not None:
-            # Type conversion for comparison if needed
-            try:
-                if isinstance(trigger_value, (int, float)) and isinstance(actual_value, (int, float, str)):
-                     actual_value = float(actual_value)
-                     trigger_value = float(trigger_value)
-            except ValueError:
-                pass # compare as strings
+    return RuleTable([CompiledRule(rule or {}, strict) for rule in rules or []])
 
-            if operator == "eq":
-                is_triggered = actual_value == trigger_value
-            elif operator == "neq":
-                is_triggered = actual_value != trigger_value
-            elif operator == "gt":
-                try: is_triggered = actual_value > trigger_value
-                except: pass
-            elif operator == "lt":
-                try: is_triggered = actual_value < trigger_value
-                except: pass
-            elif operator == "inc": # includes
-                is_triggered = str(trigger_value) in str(actual_value)
-        
-        if is_triggered:
-            target = action.get("target_field")
-            effect = action.get("effect")
-            
-            if effect == "hide":
-                visibility_overrides[target] = False
-            elif effect == "show":
-                visibility_overrides[target] = True
-                
-    return visibility_overrides
+def evaluate_rules(rules: List[Dict[str, Any]], data: Dict[str, Any]) -> Dict[str, bool]:
+    """
+    Evaluates rules to determine field visibility.
+    Returns a dictionary of field_id -> is_visible for every targeted field.
+    Prefer compile_rules once per version (see app.core.form_runtime) on hot paths.
+    """
+    return compile_rules(rules).evaluate(data)
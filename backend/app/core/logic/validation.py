@@ -1,6 +1,7 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple, AbstractSet
 import re
-from fastapi import HTTPException
+
+EMAIL_REGEX = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
 
 class ValidationError(Exception):
     def __init__(self, message: str, field_id: str):
@@ -8,46 +9,164 @@ class ValidationError(Exception):
         self.field_id = field_id
         super().__init__(message)
 
+class ValidationErrors(ValidationError):
+    """
+    Raised by Validator.validate(collect_all=True). Behaves like the first
+    error for callers that only handle ValidationError.
+    """
+    def __init__(self, errors: List[ValidationError]):
+        self.errors = errors
+        super().__init__(errors[0].message, errors[0].field_id)
+
+class SchemaError(ValueError):
+    """
+    The schema itself is invalid (e.g. a non-numeric min/max).
+    """
+    pass
+
+# A check returns the error for its field, or None if the value is acceptable
+Check = Callable[[Dict[str, Any]], Optional[ValidationError]]
+
+def iter_schema_fields(schema: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every field of a schema, for both the flat "fields" layout
+    and the multi-page "pages" layout generated by the agent.
+    """
+    if not schema:
+        return
+    for field in schema.get("fields", []) or []:
+        yield field
+    for page in schema.get("pages", []) or []:
+        for field in page.get("fields", []) or []:
+            yield field
+
+def _parse_bound(field: Dict[str, Any], key: str, strict: bool) -> Optional[float]:
+    raw = field.get(key)
+    if raw is None:
+        return None
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        if not strict:
+            return None # Stored version: an unusable bound is not enforced
+        raise SchemaError(f"Field '{field.get('id')}' has a non-numeric {key}: {raw!r}")
+
+def _number_check(field_id: str, field: Dict[str, Any], strict: bool) -> Callable[[Any], Optional[ValidationError]]:
+    min_raw, max_raw = field.get("min"), field.get("max")
+    min_val, max_val = _parse_bound(field, "min", strict), _parse_bound(field, "max", strict)
+
+    def check(value):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return ValidationError(f"Field '{field_id}' must be a number", field_id)
+        if min_val is not None and number < min_val:
+            return ValidationError(f"Field '{field_id}' must be at least {min_raw}", field_id)
+        if max_val is not None and number > max_val:
+            return ValidationError(f"Field '{field_id}' must be at most {max_raw}", field_id)
+        return None
+    return check
+
+def _email_check(field_id: str, field: Dict[str, Any], strict: bool) -> Callable[[Any], Optional[ValidationError]]:
+    match = EMAIL_REGEX.match
+
+    def check(value):
+        if not match(str(value)):
+            return ValidationError(f"Field '{field_id}' must be a valid email", field_id)
+        return None
+    return check
+
+def _option_check(field_id: str, field: Dict[str, Any], strict: bool) -> Callable[[Any], Optional[ValidationError]]:
+    # Options are either {"value": ..., "label": ...} dicts or bare values
+    options = frozenset(
+        opt["value"] if isinstance(opt, dict) else opt
+        for opt in field.get("options", []) or []
+    )
+
+    def check(value):
+        try:
+            valid = value in options
+        except TypeError: # Unhashable answer (list/dict) is never an option
+            valid = False
+        if not valid:
+            return ValidationError(f"Value '{value}' is not a valid option for field '{field_id}'", field_id)
+        return None
+    return check
+
+TYPE_CHECKS = {
+    "number": _number_check,
+    "email": _email_check,
+    "select": _option_check,
+    "radio": _option_check,
+}
+
+def _compile_field(field: Dict[str, Any], strict: bool) -> Check:
+    field_id = field.get("id")
+    required = field.get("required", False)
+    label = field.get("label", field_id)
+    build = TYPE_CHECKS.get(field.get("type"))
+    type_check = build(field_id, field, strict) if build else None
+
+    def check(data):
+        value = data.get(field_id)
+        if value is None or value == "":
+            if required:
+                return ValidationError(f"Field '{label}' is required", field_id)
+            return None
+        if type_check is not None:
+            return type_check(value)
+        return None
+    return check
+
+class Validator:
+    """
+    A schema compiled into a flat list of per-field checks.
+    Build once per FormVersion with compile_schema and reuse for every submission.
+    """
+    def __init__(self, checks: List[Tuple[str, Check]]):
+        self.checks = checks
+        self._all_checks = [check for _, check in checks]
+
+    def _active_checks(self, hidden: AbstractSet[str]) -> List[Check]:
+        if not hidden:
+            return self._all_checks
+        return [check for field_id, check in self.checks if field_id not in hidden]
+
+    def errors(self, data: Dict[str, Any], hidden: AbstractSet[str] = frozenset()) -> List[ValidationError]:
+        """
+        Returns every validation error (empty list if valid).
+        Fields in `hidden` (per visibility rules) are not checked.
+        """
+        return [error for error in (check(data) for check in self._active_checks(hidden)) if error is not None]
+
+    def validate(self, data: Dict[str, Any], collect_all: bool = False, hidden: AbstractSet[str] = frozenset()) -> None:
+        """
+        Raises ValidationError on the first invalid field, or ValidationErrors
+        with all of them when collect_all is set.
+        """
+        if collect_all:
+            errors = self.errors(data, hidden)
+            if errors:
+                raise ValidationErrors(errors)
+            return
+        for check in self._active_checks(hidden):
+            error = check(data)
+            if error is not None:
+                raise error
+
+def compile_schema(schema: Dict[str, Any], strict: bool = True) -> Validator:
+    """
+    Compiles a form schema into a Validator.
+
+    strict=True (saving a version) raises SchemaError if the schema is invalid.
+    strict=False (stored versions) keeps serving: checks that cannot be built
+    (e.g. a non-numeric min/max) are skipped.
+    """
+    return Validator([(field.get("id"), _compile_field(field, strict)) for field in iter_schema_fields(schema)])
+
 def validate_submission(schema: Dict[str, Any], data: Dict[str, Any]) -> None:
     """
     Validates submission data against the form schema.
     Raises ValidationError if invalid.
     """
-    fields = schema.get("fields", [])
-    
-    for field in fields:
-        field_id = field.get("id")
-        field_type = field.get("type")
-        required = field.get("required", False)
-        
-        value = data.get(field_id)
-        
-        # Check required
-        if required and (value is None or value == ""):
-            raise ValidationError(f"Field '{field.get('label', field_id)}' is required", field_id)
-            
-        if value is not None and value != "":
-            # Type validation
-            if field_type == "number":
-                try:
-                    float(value)
-                except ValueError:
-                    raise ValidationError(f"Field '{field_id}' must be a number", field_id)
-                    
-                min_val = field.get("min")
-                max_val = field.get("max")
-                if min_val is not None and float(value) < float(min_val):
-                     raise ValidationError(f"Field '{field_id}' must be at least {min_val}", field_id)
-                if max_val is not None and float(value) > float(max_val):
-                     raise ValidationError(f"Field '{field_id}' must be at most {max_val}", field_id)
-
-            elif field_type == "email":
-                # Simple regex for email
-                email_regex = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-                if not re.match(email_regex, str(value)):
-                    raise ValidationError(f"Field '{field_id}' must be a valid email", field_id)
-            
-            elif field_type == "select" or field_type == "radio":
-                options = [opt["value"] for opt in field.get("options", [])]
-                if value not in options:
-                     raise ValidationError(f"Value '{value}' is not a valid option for field '{field_id}'", field_id)
+    compile_schema(schema).validate(data)
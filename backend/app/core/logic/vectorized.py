@@ -0,0 +1,212 @@
+import ast
+import math
+from typing import Dict, Any, List, Callable
+import numpy as np
+from app.core.logic.formulas import FormulaProgram, CompiledFormula, FormulaError, coerce_value
+
+# Same operator set as the scalar evaluator, as NumPy ufuncs
+VECTOR_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.USub: np.negative,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+    ast.Gt: np.greater,
+    ast.Lt: np.less,
+    ast.GtE: np.greater_equal,
+    ast.LtE: np.less_equal,
+}
+
+class NotVectorizable(Exception):
+    pass
+
+class Columns:
+    """
+    Lazily extracts float64 columns from a batch of raw_data dicts.
+    Values the scalar evaluator would reject become NaN (i.e. an error for that row).
+    """
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _to_float(value: Any) -> float:
+        try:
+            return float(coerce_value(value))
+        except (FormulaError, TypeError, ValueError, OverflowError):
+            return math.nan
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        array = self.arrays.get(name)
+        if array is None:
+            array = np.fromiter((self._to_float(row.get(name)) for row in self.rows), dtype=np.float64, count=len(self.rows))
+            self.arrays[name] = array
+        return array
+
+    def __setitem__(self, name: str, array: np.ndarray) -> None:
+        self.arrays[name] = array
+
+# A vector node: takes the batch columns, returns one float64 array (NaN = row error)
+VectorEvaluator = Callable[[Columns], np.ndarray]
+
+def _invalid_to_nan(array: np.ndarray) -> np.ndarray:
+    # Python raises on x/0 and overflow; the row must end up as an error, not inf
+    array[np.isinf(array)] = np.nan
+    return array
+
+def _compile_vector(node: ast.AST) -> VectorEvaluator:
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (int, float)):
+            raise NotVectorizable(f"Constant {node.value!r}")
+        value = float(node.value)
+        return lambda cols: np.full(len(cols.rows), value)
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda cols: cols[name]
+
+    if isinstance(node, ast.BinOp):
+        op = VECTOR_OPERATORS.get(type(node.op))
+        if op is None:
+            raise NotVectorizable(f"Operator {type(node.op)}")
+        left, right = _compile_vector(node.left), _compile_vector(node.right)
+
+        if op is np.power:
+            # pow(1, nan) and pow(nan, 0) are 1.0: keep the row error instead
+            def power(cols):
+                base, exponent = left(cols), right(cols)
+                with np.errstate(all="ignore"):
+                    result = np.where(np.isnan(base) | np.isnan(exponent), np.nan, np.power(base, exponent))
+                return _invalid_to_nan(result)
+            return power
+
+        def binop(cols):
+            with np.errstate(all="ignore"):
+                return _invalid_to_nan(op(left(cols), right(cols)))
+        return binop
+
+    if isinstance(node, ast.UnaryOp):
+        op = VECTOR_OPERATORS.get(type(node.op))
+        if op is None:
+            raise NotVectorizable(f"Operator {type(node.op)}")
+        operand = _compile_vector(node.operand)
+        return lambda cols: op(operand(cols))
+
+    if isinstance(node, ast.Compare):
+        ops = [VECTOR_OPERATORS.get(type(op_node)) for op_node in node.ops]
+        if None in ops:
+            raise NotVectorizable("Comparison operator")
+        operands = [_compile_vector(node.left)] + [_compile_vector(c) for c in node.comparators]
+
+        def compare(cols):
+            values = [operand(cols) for operand in operands]
+            result = np.ones(len(cols.rows), dtype=bool)
+            invalid = np.zeros(len(cols.rows), dtype=bool)
+            for i, op in enumerate(ops):
+                result &= op(values[i], values[i + 1])
+                invalid |= np.isnan(values[i]) | np.isnan(values[i + 1])
+            result = result.astype(np.float64)
+            result[invalid] = np.nan
+            return result
+        return compare
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        func_name = node.func.id
+        args = [_compile_vector(arg) for arg in node.args]
+
+        if func_name in ("min", "max") and len(args) >= 2:
+            ufunc = np.minimum if func_name == "min" else np.maximum
+            return lambda cols: ufunc.reduce([arg(cols) for arg in args])
+        if func_name == "sum" and args:
+            return lambda cols: np.add.reduce([arg(cols) for arg in args])
+        if func_name == "abs" and len(args) == 1:
+            return lambda cols: np.abs(args[0](cols))
+        if func_name == "round" and len(args) == 1:
+            return lambda cols: np.round(args[0](cols))
+        if func_name == "round" and len(args) == 2 and isinstance(node.args[1], ast.Constant) and isinstance(node.args[1].value, int):
+            digits = node.args[1].value
+            return lambda cols: np.round(args[0](cols), digits)
+        raise NotVectorizable(f"Call to {func_name} with {len(args)} argument(s)")
+
+    raise NotVectorizable(f"Node type {type(node)}")
+
+def _produces_int(node: ast.AST) -> bool:
+    """
+    Whether the scalar evaluator returns an int for integral inputs
+    (so integral results are written back as ints, not floats).
+    """
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, int)
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.BinOp):
+        return not isinstance(node.op, ast.Div) and _produces_int(node.left) and _produces_int(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _produces_int(node.operand)
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id == "round":
+            return len(node.args) == 1 or _produces_int(node.args[0])
+        return all(_produces_int(arg) for arg in node.args)
+    return False
+
+class VectorizedFormula:
+    def __init__(self, formula: CompiledFormula):
+        self.formula = formula
+        self.target = formula.target
+        self.evaluator = None
+        if formula.error is None:
+            try:
+                self.evaluator = _compile_vector(formula.tree.body)
+            except NotVectorizable:
+                self.evaluator = None # Evaluated row by row with the scalar evaluator
+        body = formula.tree.body if formula.tree is not None else None
+        self.is_bool = isinstance(body, ast.Compare)
+        self.is_int = body is not None and _produces_int(body)
+
+    def to_python(self, value: float) -> Any:
+        if math.isnan(value):
+            return 0 # Same fallback as FormulaProgram.evaluate
+        if self.is_bool:
+            return bool(value)
+        if self.is_int and value.is_integer():
+            return int(value)
+        return float(value)
+
+class VectorizedProgram:
+    """
+    Evaluates a FormulaProgram over a batch of rows with one NumPy operation per
+    AST node. Formulas that cannot be vectorized (string constants, unusual
+    calls) fall back to the scalar evaluator for that formula only.
+    """
+    def __init__(self, program: FormulaProgram):
+        self.formulas = [VectorizedFormula(f) for f in program.formulas]
+
+    def evaluate(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Returns the computed_data dict for each raw_data row.
+        """
+        columns = Columns(rows)
+        computed = [{} for _ in rows]
+
+        for vformula in self.formulas:
+            target = vformula.target
+            if vformula.evaluator is not None:
+                values = vformula.evaluator(columns)
+                results = [vformula.to_python(value) for value in values.tolist()]
+            else:
+                results = []
+                for row, row_computed in zip(rows, computed):
+                    try:
+                        results.append(vformula.formula.evaluate({**row, **row_computed}))
+                    except FormulaError:
+                        results.append(0)
+
+            for row_computed, result in zip(computed, results):
+                row_computed[target] = result
+            # Later formulas read this target as an operand (errors already became 0)
+            columns[target] = np.fromiter((Columns._to_float(result) for result in results), dtype=np.float64, count=len(rows))
+
+        return computed
@@ -0,0 +1,257 @@
+import random
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Iterable
+from sqlalchemy import or_, and_, insert, update, delete, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.outbox import OutboxJob
+
+logger = logging.getLogger(__name__)
+
+class OutboxHandler:
+    def __init__(self, run: Callable[[Session, OutboxJob], None], on_give_up: Optional[Callable[[Session, OutboxJob], None]] = None):
+        self.run = run
+        self.on_give_up = on_give_up
+
+# kind -> handler. Populated by app.core.submission_jobs.
+HANDLERS: Dict[str, OutboxHandler] = {}
+
+def register(kind: str, on_give_up: Optional[Callable[[Session, OutboxJob], None]] = None):
+    """
+    Decorator registering the handler for an outbox job kind.
+    Handlers must raise to signal a retryable failure.
+    """
+    def decorator(func):
+        HANDLERS[kind] = OutboxHandler(func, on_give_up)
+        return func
+    return decorator
+
+def job_row(kind: str, submission_id: Optional[int] = None, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Column values for a new pending job.
+    """
+    now = datetime.utcnow()
+    return {
+        "kind": kind,
+        "submission_id": submission_id,
+        "payload": payload or {},
+        "status": "pending",
+        "attempts": 0,
+        "max_attempts": settings.OUTBOX_MAX_ATTEMPTS,
+        "available_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def enqueue_many(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Inserts jobs built with job_row in one statement without committing, so they
+    are persisted atomically with whatever the caller is writing (e.g. the Submission rows).
+    """
+    if rows:
+        db.execute(insert(OutboxJob), rows)
+
+def submission_status(db: Session, submission_id: int) -> str:
+    """
+    Derives a pollable status from the submission's outbox jobs:
+    processing while any job is pending, failed if any job gave up.
+    """
+    statuses = {row.status for row in db.query(OutboxJob.status).filter(OutboxJob.submission_id == submission_id).all()}
+    if statuses & {"pending", "processing"}:
+        return "processing"
+    if "failed" in statuses:
+        return "failed"
+    return "completed"
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter, capped at OUTBOX_RETRY_MAX_SECONDS.
+    """
+    base = settings.OUTBOX_RETRY_BASE_SECONDS
+    delay = min(base * (2 ** max(attempts - 1, 0)), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return delay + random.uniform(0, base)
+
+def claim_jobs(db: Session, limit: int, kinds: Optional[Iterable[str]] = None) -> List[int]:
+    """
+    Claims up to `limit` due jobs for this worker by leasing them.
+    Uses SKIP LOCKED so concurrent workers never claim the same rows;
+    jobs whose lease expired (crashed worker) are claimed again, unless that
+    lease was their last attempt: those are marked failed instead.
+    """
+    now = datetime.utcnow()
+    query = db.query(OutboxJob).filter(
+        or_(
+            and_(OutboxJob.status == "pending", OutboxJob.available_at <= now),
+            and_(OutboxJob.status == "processing", OutboxJob.locked_until < now)
+        )
+    )
+    if kinds is not None:
+        query = query.filter(OutboxJob.kind.in_(list(kinds)))
+    jobs = query.order_by(OutboxJob.id).limit(limit).with_for_update(skip_locked=True).all()
+
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    claimed = []
+    for job in jobs:
+        if job.status == "processing" and job.attempts >= job.max_attempts:
+            # A job that keeps killing its worker would otherwise be re-claimed forever
+            fail_job(db, job, f"Lease expired on attempt {job.attempts} (worker crashed or timed out)")
+            continue
+        job.status = "processing"
+        job.locked_until = lease_until
+        job.attempts += 1
+        claimed.append(job.id)
+    db.commit()
+    return claimed
+
+def complete_job(db: Session, job: OutboxJob) -> None:
+    job.status = "done"
+    job.locked_until = None
+    job.last_error = None
+
+def _run_give_up(db: Session, job: OutboxJob, handler: OutboxHandler) -> None:
+    # In a savepoint: a failing hook (e.g. its submission was deleted) is
+    # logged and undone, but the job is still recorded as failed
+    try:
+        with db.begin_nested():
+            handler.on_give_up(db, job)
+    except Exception as e:
+        logger.error(f"Outbox job {job.id} ({job.kind}) give-up hook failed: {e}")
+        job.status = "failed"
+        job.locked_until = None
+
+def fail_job(db: Session, job: OutboxJob, error: str) -> None:
+    """
+    Reschedules the job with backoff, or marks it failed once attempts are
+    exhausted. A failing on_give_up hook is logged; the job still fails.
+    """
+    job.last_error = error[:1000]
+    job.locked_until = None
+    if job.attempts >= job.max_attempts:
+        job.status = "failed"
+        logger.error(f"Outbox job {job.id} ({job.kind}) gave up after {job.attempts} attempts: {error}")
+        handler = HANDLERS.get(job.kind)
+        if handler and handler.on_give_up:
+            _run_give_up(db, job, handler)
+    else:
+        job.status = "pending"
+        job.available_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+        logger.warning(f"Outbox job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+
+def run_job(job_id: int) -> bool:
+    """
+    Runs one claimed job in its own transaction. Returns True on success.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(OutboxJob, job_id)
+        if job is None or job.status != "processing":
+            return False
+        handler = HANDLERS.get(job.kind)
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for outbox job kind '{job.kind}'")
+            handler.run(db, job)
+            complete_job(db, job)
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            job = db.get(OutboxJob, job_id)
+            fail_job(db, job, str(e))
+            db.commit()
+            return False
+    finally:
+        db.close()
+
+def finish_job(job_id: int, error: Optional[str] = None) -> None:
+    """
+    Records the outcome of a claimed job whose work ran outside run_job
+    (e.g. the async webhook dispatcher): done, or failed with retry.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(OutboxJob, job_id)
+        if job is None or job.status != "processing":
+            return
+        if error is None:
+            complete_job(db, job)
+        else:
+            fail_job(db, job, error)
+        db.commit()
+    finally:
+        db.close()
+
+def release_job(job_id: int, delay_seconds: float) -> None:
+    """
+    Hands a claimed job back without counting the attempt (e.g. its
+    destination is backlogged); it becomes due again after delay_seconds.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(OutboxJob, job_id)
+        if job is None or job.status != "processing":
+            return
+        job.status = "pending"
+        job.locked_until = None
+        job.attempts = max(job.attempts - 1, 0)
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        db.commit()
+    finally:
+        db.close()
+
+def renew_leases(job_ids: Iterable[int]) -> int:
+    """
+    Extends the lease of claimed jobs still held in memory (e.g. buffered by
+    the webhook dispatcher), so they are not claimed again by another worker.
+    Returns the number of jobs renewed.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    db = SessionLocal()
+    try:
+        lease_until = datetime.utcnow() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        renewed = db.execute(
+            update(OutboxJob)
+            .where(OutboxJob.id.in_(job_ids), OutboxJob.status == "processing")
+            .values(locked_until=lease_until)
+        ).rowcount
+        db.commit()
+        return renewed
+    finally:
+        db.close()
+
+def purge_done_jobs(older_than_days: int, batch_size: int = 10000) -> int:
+    """
+    Deletes jobs that finished (status done) more than `older_than_days` ago,
+    `batch_size` rows per transaction. Failed jobs are kept for inspection.
+    Returns the number of jobs deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = 0
+    db = SessionLocal()
+    try:
+        while True:
+            ids = select(OutboxJob.id).where(OutboxJob.status == "done", OutboxJob.updated_at < cutoff).limit(batch_size)
+            count = db.execute(delete(OutboxJob).where(OutboxJob.id.in_(ids.scalar_subquery()))).rowcount
+            db.commit()
+            deleted += count
+            if count < batch_size:
+                return deleted
+    finally:
+        db.close()
+
+def drain_once(limit: Optional[int] = None, kinds: Optional[Iterable[str]] = None) -> int:
+    """
+    Claims one batch and runs it. Returns the number of jobs claimed.
+    """
+    db = SessionLocal()
+    try:
+        job_ids = claim_jobs(db, limit or settings.OUTBOX_BATCH_SIZE, kinds)
+    finally:
+        db.close()
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
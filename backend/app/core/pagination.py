@@ -0,0 +1,23 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Opaque keyset cursor: the (created_at, id) of the last row of a page.
+    """
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
@@ -0,0 +1,95 @@
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.form import Submission
+from app.core.pdf_service import pdf_service
+from app.core.pdf_on_demand import ensure_pdf
+
+logger = logging.getLogger(__name__)
+
+class _ZipOutput:
+    """
+    Unseekable sink for ZipFile: collects what was written since the last
+    drain, so the archive can be streamed entry by entry.
+    """
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _fetch_pdf(submission_id: int, pdf_key: Optional[str]) -> Optional[bytes]:
+    if pdf_key is None:
+        # Not rendered yet (lazy mode, or the pdf job has not run): render and store it
+        db = SessionLocal()
+        try:
+            pdf_key = ensure_pdf(db, submission_id)
+        finally:
+            db.close()
+        if pdf_key is None:
+            return None # Version without a PDF template
+    return pdf_service.download_pdf(pdf_key)
+
+def stream_pdf_zip(form_id: int) -> Iterator[bytes]:
+    """
+    Yields a ZIP of every submission PDF of a form, built on the fly.
+
+    Submissions are read with a server-side cursor and their PDFs fetched on
+    a small thread pool, at most PDF_EXPORT_PREFETCH ahead of the writer, so
+    memory stays bounded by the prefetch window whatever the form size.
+    Entries are stored (PDFs are already compressed). PDFs that cannot be
+    fetched or rendered are listed in errors.txt at the end of the archive.
+    """
+    prefetch = max(settings.PDF_EXPORT_PREFETCH, 1)
+    output = _ZipOutput()
+    errors: List[str] = []
+    db = SessionLocal()
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="pdf-export")
+    try:
+        rows = db.query(Submission.id, Submission.pdf_key).filter(
+            Submission.form_id == form_id
+        ).order_by(Submission.id).yield_per(500)
+
+        with zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            pending = deque()
+
+            def write_next():
+                submission_id, future = pending.popleft()
+                try:
+                    pdf_bytes = future.result()
+                except Exception as e:
+                    logger.warning(f"PDF export: submission {submission_id} failed: {e}")
+                    errors.append(f"submission {submission_id}: {e}")
+                    return
+                if pdf_bytes is not None:
+                    archive.writestr(f"submission-{submission_id}.pdf", pdf_bytes)
+
+            for submission_id, pdf_key in rows:
+                pending.append((submission_id, executor.submit(_fetch_pdf, submission_id, pdf_key)))
+                if len(pending) >= prefetch:
+                    write_next()
+                    yield output.drain()
+            while pending:
+                write_next()
+                yield output.drain()
+
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        yield output.drain()
+    finally:
+        # Also runs when the client disconnects mid-download
+        executor.shutdown(wait=False, cancel_futures=True)
+        db.close()
@@ -0,0 +1,85 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from sqlalchemy.orm import Session
+from app.models.form import Submission
+from app.core.form_runtime import form_runtime_cache
+from app.core.submission_jobs import render_submission_pdf
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key in this process: the first
+    caller runs the function, the others wait and share its result (or error).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "_Call"] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            return call.wait()
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+pdf_flights = SingleFlight()
+
+def _render_once(db: Session, submission_id: int) -> Optional[str]:
+    # The row lock coalesces across API processes and the worker: whoever
+    # waits on it sees the stored key instead of rendering again. The caller
+    # may already hold the row in its identity map, so reload it under the lock
+    submission = (
+        db.query(Submission)
+        .filter(Submission.id == submission_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if submission is None:
+        db.rollback()
+        return None
+    if submission.pdf_key is not None:
+        key = submission.pdf_key
+        db.commit()
+        return key
+
+    compiled = form_runtime_cache.get_version(db, submission.form_version_id)
+    if not compiled or not compiled.pdf_template:
+        db.commit()
+        return None
+
+    key = render_submission_pdf(db, submission, compiled)
+    db.commit()
+    return key
+
+def ensure_pdf(db: Session, submission_id: int) -> Optional[str]:
+    """
+    Returns the object key of the submission's PDF, rendering and storing it
+    on first access. Concurrent calls for one submission render once.
+    Returns None if the form version has no PDF template. Commits `db`.
+    """
+    return pdf_flights.do(submission_id, lambda: _render_once(db, submission_id))
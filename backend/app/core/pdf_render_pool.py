@@ -0,0 +1,155 @@
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_HTML = "<html><body><p style='font-family: sans-serif'>warm-up</p></body></html>"
+
+def _warm_worker() -> None:
+    """
+    Process initializer: imports WeasyPrint and renders a tiny document so
+    fonts and CSS machinery are loaded before the first real job arrives.
+    """
+    from weasyprint import HTML
+    HTML(string=WARMUP_HTML).write_pdf()
+
+def render_pdf(html_content: str) -> Tuple[bytes, int, float]:
+    """
+    Renders HTML to PDF. Returns (pdf_bytes, page_count, render_seconds).
+    Runs inside a pool worker (or in-process when the pool is disabled).
+    """
+    from weasyprint import HTML
+    started = time.perf_counter()
+    document = HTML(string=html_content).render()
+    pdf_bytes = document.write_pdf()
+    return pdf_bytes, len(document.pages), time.perf_counter() - started
+
+def render_pdf_to_s3(html_content: str, bucket: str, key: str) -> Tuple[Tuple[int, float], int, float]:
+    """
+    Renders HTML and streams the PDF into S3 as WeasyPrint writes it, so the
+    finished document is never held in memory as one bytes object.
+    Returns ((size_bytes, upload_seconds), page_count, render_seconds);
+    render_seconds stops once WeasyPrint has written the last byte, so the
+    final PUT / multipart completion is counted as upload only.
+    """
+    from weasyprint import HTML
+    from app.core.s3_upload import get_s3_client, MultipartUploadWriter
+    started = time.perf_counter()
+    document = HTML(string=html_content).render()
+    with MultipartUploadWriter(get_s3_client(), bucket, key) as writer:
+        document.write_pdf(target=writer)
+        render_seconds = time.perf_counter() - started
+    return (writer.bytes_written, writer.seconds), len(document.pages), render_seconds
+
+class PDFRenderPool:
+    """
+    Pool of pre-warmed WeasyPrint worker processes. Rendering is CPU-bound and
+    holds the GIL, so it runs outside the calling process; callers block on the
+    result without holding the interpreter.
+    """
+    def __init__(self, workers: int, timeout_seconds: float):
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.queued = 0
+        self.rendered = 0
+        self.failed = 0
+        self.pages = 0
+        self.render_seconds_total = 0.0
+        self.render_seconds_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting PDF render pool with {self.workers} worker(s)")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+            return self._executor
+
+    def _reset_executor(self, executor: Optional[ProcessPoolExecutor] = None, terminate: bool = False) -> None:
+        """
+        Drops the pool so the next job starts a fresh one. With `executor`,
+        only if that pool is still the current one (another caller may have
+        replaced it already). terminate also kills workers that are still busy.
+        """
+        with self._lock:
+            if self._executor is None or (executor is not None and self._executor is not executor):
+                return
+            executor, self._executor = self._executor, None
+        # ProcessPoolExecutor has no public handle on its workers
+        processes = list((executor._processes or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def _record(self, success: bool, pages: int = 0, seconds: float = 0.0) -> None:
+        with self._metrics_lock:
+            self.queued -= 1
+            if success:
+                self.rendered += 1
+                self.pages += pages
+                self.render_seconds_total += seconds
+                self.render_seconds_max = max(self.render_seconds_max, seconds)
+            else:
+                self.failed += 1
+
+    def submit(self, func, *args):
+        """
+        Runs func(*args) in a warm worker (or inline if PDF_RENDER_WORKERS is 0)
+        and returns its result. The function must return (result, page_count, seconds).
+        """
+        with self._metrics_lock:
+            self.queued += 1
+        try:
+            if self.workers <= 0:
+                result, pages, seconds = func(*args)
+            else:
+                executor = self._get_executor()
+                future = executor.submit(func, *args)
+                try:
+                    result, pages, seconds = future.result(timeout=self.timeout_seconds)
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM); start a fresh pool for the next job
+                    self._reset_executor(executor)
+                    raise
+                except FutureTimeoutError:
+                    # A stuck render would keep its worker busy after we give up on it;
+                    # renders sharing the pool fail with BrokenProcessPool and are retried
+                    if not future.cancel():
+                        logger.error(f"PDF render timed out after {self.timeout_seconds}s; recycling the render pool")
+                        self._reset_executor(executor, terminate=True)
+                    raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True, pages, seconds)
+        return result
+
+    def render(self, html_content: str) -> bytes:
+        return self.submit(render_pdf, html_content)
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queued,
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "pages": self.pages,
+                "render_seconds_avg": (self.render_seconds_total / self.rendered) if self.rendered else 0.0,
+                "render_seconds_max": self.render_seconds_max,
+            }
+
+pdf_render_pool = PDFRenderPool(
+    workers=settings.PDF_RENDER_WORKERS,
+    timeout_seconds=settings.PDF_RENDER_TIMEOUT_SECONDS
+)
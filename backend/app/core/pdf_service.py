@@ -1,31 +1,19 @@
 import os
 import io
 import uuid
-import boto3
-from jinja2 import Template
-from weasyprint import HTML
-from botocore.client import Config
+import time
+from typing import Optional
+from functools import lru_cache
+from jinja2 import Environment, Template
 from app.core.config import settings
+from app.core.pdf_render_pool import pdf_render_pool, render_pdf_to_s3
+from app.core.s3_upload import get_s3_client, transfer_config, upload_stats
 
 # S3-Compatible Storage Config (MinIO, Supabase, Cloudflare R2, AWS S3)
-MINIO_ENDPOINT = settings.MINIO_ENDPOINT
-MINIO_SECURE = settings.MINIO_SECURE
-MINIO_ACCESS_KEY = settings.MINIO_ROOT_USER
-MINIO_SECRET_KEY = settings.MINIO_ROOT_PASSWORD
 BUCKET_NAME = "submissions"
 
-# Build endpoint URL
-ENDPOINT_URL = f"{'https' if MINIO_SECURE else 'http'}://{MINIO_ENDPOINT}"
-
-# Initialize S3 Client
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=MINIO_ACCESS_KEY,
-    aws_secret_access_key=MINIO_SECRET_KEY,
-    config=Config(signature_version="s3v4"),
-    region_name="us-east-1"
-)
+# Initialize S3 Client (shared, pooled; see app.core.s3_upload)
+s3_client = get_s3_client()
 
 # Ensure bucket exists
 try:
@@ -38,41 +26,78 @@ except:
     except Exception as e:
         print(f"Failed to create bucket: {e}")
 
+jinja_env = Environment()
+
+@lru_cache(maxsize=settings.PDF_TEMPLATE_CACHE_SIZE)
+def compile_template(template_str: str) -> Template:
+    """
+    Compiled Jinja2 templates, keyed by the template source (i.e. its hash).
+    Versions sharing a template share one compiled entry.
+    """
+    return jinja_env.from_string(template_str)
+
 class PDFService:
     @staticmethod
     def render_html(template_str: str, data: dict) -> str:
         """
-        Renders HTML from a Jinja2 template string.
+        Renders HTML from a Jinja2 template string (compiled once, then cached).
         """
-        template = Template(template_str)
-        return template.render(data)
+        return compile_template(template_str).render(data)
 
     @staticmethod
     def generate_pdf_bytes(html_content: str) -> bytes:
         """
-        Converts HTML string to PDF bytes using WeasyPrint.
+        Converts HTML string to PDF bytes using WeasyPrint, in the warm render pool.
         """
-        return HTML(string=html_content).write_pdf()
+        return pdf_render_pool.render(html_content)
+
+    @staticmethod
+    def render_to_storage(html_content: str, key: str) -> int:
+        """
+        Renders HTML to PDF and streams it straight into S3 under `key`
+        (multipart for large documents). Returns the object size in bytes.
+        """
+        try:
+            size, upload_seconds = pdf_render_pool.submit(render_pdf_to_s3, html_content, BUCKET_NAME, key)
+        except Exception:
+            upload_stats.record_failure()
+            raise
+        upload_stats.record(size, upload_seconds)
+        return size
+
+    @staticmethod
+    def new_object_key() -> str:
+        return f"pdf/{uuid.uuid4()}.pdf"
 
     @staticmethod
-    def upload_pdf(pdf_bytes: bytes) -> str:
+    def upload_pdf(pdf_bytes: bytes, key: Optional[str] = None) -> str:
         """
-        Uploads PDF bytes to MinIO and returns a 7-day presigned URL.
+        Uploads PDF bytes to MinIO and returns the object key.
+        Links are minted on read (see app.core.presigned_urls).
         """
-        filename = f"{uuid.uuid4()}.pdf"
+        filename = key or PDFService.new_object_key()
         file_obj = io.BytesIO(pdf_bytes)
         
+        started = time.perf_counter()
         s3_client.upload_fileobj(
             file_obj,
             BUCKET_NAME,
             filename,
-            ExtraArgs={'ContentType': 'application/pdf'}
+            ExtraArgs={'ContentType': 'application/pdf'},
+            Config=transfer_config
         )
-        
+        upload_stats.record(len(pdf_bytes), time.perf_counter() - started)
+        return filename
+
+    @staticmethod
+    def presign(key: str, expires_in: int = settings.PDF_URL_EXPIRES_SECONDS) -> str:
+        """
+        Signs a GET URL for an object. Signing is local (no request to S3).
+        """
         url = s3_client.generate_presigned_url(
             'get_object',
-            Params={'Bucket': BUCKET_NAME, 'Key': filename},
-            ExpiresIn=604800  # 7 days
+            Params={'Bucket': BUCKET_NAME, 'Key': key},
+            ExpiresIn=expires_in
         )
         # Use localhost for URL if internal
         # The URL generated inside Docker says "minio:9000". 
@@ -80,5 +105,13 @@ class PDFService:
         # But if frontend uses it, it needs to reach minio.
         # For now, return as is.
         return url
+
+    @staticmethod
+    def download_pdf(key: str) -> bytes:
+        return s3_client.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read()
+
+    @staticmethod
+    def delete_object(key: str) -> None:
+        s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
         
 pdf_service = PDFService()
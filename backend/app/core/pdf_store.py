@@ -0,0 +1,82 @@
+import hashlib
+import logging
+from typing import Optional, Tuple
+from sqlalchemy import update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.pdf_object import PDFObject
+from app.core.pdf_service import pdf_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when the renderer output changes for the same HTML (WeasyPrint upgrade,
+# fonts, stylesheets) so old objects are no longer reused.
+RENDER_REVISION = "1"
+
+def content_hash(template_str: str, html: str) -> str:
+    """
+    Identity of a rendered PDF: renderer revision, template source and the
+    rendered HTML. Identical answers on the same template hash the same.
+    """
+    digest = hashlib.sha256()
+    for part in (RENDER_REVISION, hashlib.sha256(template_str.encode("utf-8")).hexdigest(), html):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _acquire_existing(db: Session, pdf_hash: str) -> Optional[str]:
+    # Only objects still referenced can be reused; one at zero is being released
+    return db.execute(
+        update(PDFObject)
+        .where(PDFObject.content_hash == pdf_hash, PDFObject.ref_count > 0)
+        .values(ref_count=PDFObject.ref_count + 1)
+        .returning(PDFObject.object_key)
+    ).scalar()
+
+def store_pdf(db: Session, template_str: str, html: str) -> Tuple[str, str]:
+    """
+    Returns (content_hash, object_key) for the rendered HTML, taking one
+    reference on the stored object. Renders and uploads only on a miss.
+    The caller commits.
+    """
+    pdf_hash = content_hash(template_str, html)
+    key = _acquire_existing(db, pdf_hash)
+    if key is not None:
+        return pdf_hash, key
+
+    new_key = pdf_service.new_object_key()
+    size = pdf_service.render_to_storage(html, new_key)
+
+    # A concurrent job may have stored the same content meanwhile: keep its object
+    stmt = insert(PDFObject).values(
+        content_hash=pdf_hash, object_key=new_key, size_bytes=size, ref_count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PDFObject.content_hash],
+        set_={"ref_count": PDFObject.ref_count + 1},
+    ).returning(PDFObject.object_key)
+    key = db.execute(stmt).scalar()
+
+    if key != new_key:
+        try:
+            pdf_service.delete_object(new_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete duplicate PDF object {new_key}: {e}")
+    return pdf_hash, key
+
+def release_pdf(db: Session, pdf_hash: str) -> Optional[str]:
+    """
+    Drops one reference. When the last one goes, the row is deleted and its
+    object key is returned; delete that object (pdf_service.delete_object)
+    only after the caller's transaction has committed.
+    """
+    db.execute(
+        update(PDFObject)
+        .where(PDFObject.content_hash == pdf_hash)
+        .values(ref_count=PDFObject.ref_count - 1)
+    )
+    return db.execute(
+        delete(PDFObject)
+        .where(PDFObject.content_hash == pdf_hash, PDFObject.ref_count <= 0)
+        .returning(PDFObject.object_key)
+    ).scalar()
@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+from app.core.config import settings
+from app.core.pdf_service import pdf_service
+
+class PresignedURLCache:
+    """
+    In-process LRU of presigned GET URLs keyed by object key.
+
+    Submissions store only the object key; links are minted when read. A cached
+    URL is handed out until it is within refresh_margin of expiring, so every
+    URL returned stays valid for at least that long.
+    """
+    def __init__(self, max_size: int, expires_seconds: int, refresh_margin_seconds: int):
+        self.max_size = max_size
+        self.expires_seconds = expires_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, expires_seconds // 2)
+        self._urls: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.signed = 0
+
+    def _cached(self, key: str, now: float) -> Optional[str]:
+        entry = self._urls.get(key)
+        if entry is not None:
+            url, expires_at = entry
+            if now < expires_at - self.refresh_margin_seconds:
+                self._urls.move_to_end(key)
+                self.hits += 1
+                return url
+            del self._urls[key]
+        return None
+
+    def sign_many(self, keys: Iterable[Optional[str]]) -> Dict[str, str]:
+        """
+        URLs for a batch of object keys (None keys are skipped): one lock and
+        one clock read for the whole batch, signing only the misses.
+        """
+        now = time.time()
+        urls: Dict[str, str] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key is None or key in urls:
+                    continue
+                url = self._cached(key, now)
+                if url is None:
+                    missing.append(key)
+                else:
+                    urls[key] = url
+
+        signed = {key: pdf_service.presign(key, self.expires_seconds) for key in dict.fromkeys(missing)}
+        if signed:
+            with self._lock:
+                for key, url in signed.items():
+                    self._urls[key] = (url, now + self.expires_seconds)
+                    self._urls.move_to_end(key)
+                self.signed += len(signed)
+                while len(self._urls) > self.max_size:
+                    self._urls.popitem(last=False)
+            urls.update(signed)
+        return urls
+
+    def url_for(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        return self.sign_many([key])[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "signed": self.signed,
+                "size": len(self._urls),
+            }
+
+presigned_urls = PresignedURLCache(
+    max_size=settings.PDF_URL_CACHE_SIZE,
+    expires_seconds=settings.PDF_URL_EXPIRES_SECONDS,
+    refresh_margin_seconds=settings.PDF_URL_REFRESH_MARGIN_SECONDS
+)
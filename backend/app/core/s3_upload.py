@@ -0,0 +1,208 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Build endpoint URL
+ENDPOINT_URL = f"{'https' if settings.MINIO_SECURE else 'http'}://{settings.MINIO_ENDPOINT}"
+
+transfer_config = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNK_BYTES,
+    max_concurrency=settings.S3_UPLOAD_CONCURRENCY,
+)
+
+_local_lock = threading.Lock()
+_clients: Dict[int, Any] = {}
+_executors: Dict[int, ThreadPoolExecutor] = {}
+
+def get_s3_client():
+    """
+    The S3 client of this process (boto3 clients must not cross a fork, so
+    render pool workers get their own). Thread-safe, with a connection pool
+    sized for concurrent part uploads.
+    """
+    pid = os.getpid()
+    with _local_lock:
+        client = _clients.get(pid)
+        if client is None:
+            client = boto3.client(
+                "s3",
+                endpoint_url=ENDPOINT_URL,
+                aws_access_key_id=settings.MINIO_ROOT_USER,
+                aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
+                config=Config(
+                    signature_version="s3v4",
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                ),
+                region_name="us-east-1"
+            )
+            _clients[pid] = client
+        return client
+
+def get_upload_executor() -> ThreadPoolExecutor:
+    """
+    Shared pool uploading multipart parts for every upload in this process.
+    """
+    pid = os.getpid()
+    with _local_lock:
+        executor = _executors.get(pid)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=settings.S3_UPLOAD_CONCURRENCY, thread_name_prefix="s3-upload")
+            _executors[pid] = executor
+        return executor
+
+class MultipartUploadWriter:
+    """
+    Write-only file object that streams into S3. Output is buffered up to the
+    multipart threshold; small objects end up as a single PUT, larger ones as
+    a multipart upload whose parts are sent on the shared upload executor
+    while the producer keeps writing. At most S3_UPLOAD_CONCURRENCY parts are
+    held in memory at once.
+
+    Use as a context manager: close() completes the upload, an exception
+    aborts it.
+    """
+    def __init__(self, client, bucket: str, key: str, content_type: str = "application/pdf"):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(settings.S3_MULTIPART_CHUNK_BYTES, 5 * 1024 * 1024)
+        self.threshold = settings.S3_MULTIPART_THRESHOLD_BYTES
+        self.max_in_flight = max(settings.S3_UPLOAD_CONCURRENCY, 1)
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.upload_id: Optional[str] = None
+        self.parts: List[Future] = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.closed = False
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.bytes_written += len(data)
+        if self.upload_id is None and len(self.buffer) >= self.threshold:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        if self.upload_id is not None:
+            while len(self.buffer) >= self.part_size:
+                self._send_part(bytes(self.buffer[:self.part_size]))
+                del self.buffer[:self.part_size]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _send_part(self, body: bytes) -> None:
+        in_flight = [part for part in self.parts if not part.done()]
+        if len(in_flight) >= self.max_in_flight:
+            in_flight[0].result() # Back-pressure: bounds memory to max_in_flight parts
+        part_number = len(self.parts) + 1
+        self.parts.append(get_upload_executor().submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number: int, body: bytes) -> Dict[str, Any]:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=body
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), ContentType=self.content_type
+            )
+        else:
+            try:
+                if self.buffer or not self.parts:
+                    self._send_part(bytes(self.buffer))
+                parts = [part.result() for part in self.parts]
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+            except Exception:
+                # An unfinished multipart upload keeps its parts (and is billed) until aborted
+                self.abort()
+                raise
+        self.buffer = bytearray()
+        self.seconds = time.perf_counter() - self.started
+
+    def abort(self) -> None:
+        self.closed = True
+        self.buffer = bytearray()
+        if self.upload_id is None:
+            return
+        for part in self.parts:
+            part.exception() # Wait so no part lands after the abort
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            logger.warning(f"Failed to abort multipart upload of {self.key}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+class UploadStats:
+    """
+    Per-upload latency and size, aggregated for /metrics (per process).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.failed = 0
+        self.bytes_total = 0
+        self.bytes_max = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def record(self, size: int, seconds: float) -> None:
+        with self._lock:
+            self.uploads += 1
+            self.bytes_total += size
+            self.bytes_max = max(self.bytes_max, size)
+            self.seconds_total += seconds
+            self.seconds_max = max(self.seconds_max, seconds)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "uploads": self.uploads,
+                "failed": self.failed,
+                "bytes_total": self.bytes_total,
+                "bytes_max": self.bytes_max,
+                "upload_seconds_avg": (self.seconds_total / self.uploads) if self.uploads else 0.0,
+                "upload_seconds_max": self.seconds_max,
+            }
+
+upload_stats = UploadStats()
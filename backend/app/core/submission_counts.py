@@ -0,0 +1,134 @@
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, extract, cast, Date, SmallInteger, select, delete, update, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.form import Form, Submission
+from app.models.submission_count import SubmissionDailyCount
+
+def record_submissions(db: Session, form_id: int, submissions: Iterable[Tuple[int, int, datetime]]) -> None:
+    """
+    Adds (form_version_id, submission_id, created_at) submissions to the
+    rollup with one upsert. Runs in the caller's transaction, so the counts
+    commit (or roll back) with the submissions themselves.
+    """
+    shards = max(settings.SUBMISSION_COUNT_SHARDS, 1)
+    buckets = Counter(
+        (version_id, created_at.date(), created_at.hour, submission_id % shards)
+        for version_id, submission_id, created_at in submissions
+    )
+    if not buckets:
+        return
+    # Sorted so concurrent batches lock bucket rows in the same order
+    rows = [
+        {"form_id": form_id, "form_version_id": version_id, "day": day, "hour": hour, "shard": shard, "count": count}
+        for (version_id, day, hour, shard), count in sorted(buckets.items())
+    ]
+    stmt = insert(SubmissionDailyCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            SubmissionDailyCount.form_id, SubmissionDailyCount.form_version_id,
+            SubmissionDailyCount.day, SubmissionDailyCount.hour, SubmissionDailyCount.shard
+        ],
+        set_={"count": SubmissionDailyCount.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+def unrecord_submission(db: Session, submission: Submission) -> None:
+    """
+    Takes a deleted submission out of the rollup, in the caller's transaction.
+    """
+    if submission.created_at is None:
+        return # Legacy rows without a timestamp were never counted
+    # Same lock an insert's foreign key check takes: waits for a rebuild of this form
+    db.query(Form.id).filter(Form.id == submission.form_id).with_for_update(read=True, key_share=True).first()
+    shards = max(settings.SUBMISSION_COUNT_SHARDS, 1)
+    db.execute(
+        update(SubmissionDailyCount)
+        .where(
+            SubmissionDailyCount.form_id == submission.form_id,
+            SubmissionDailyCount.form_version_id == submission.form_version_id,
+            SubmissionDailyCount.day == submission.created_at.date(),
+            SubmissionDailyCount.hour == submission.created_at.hour,
+            SubmissionDailyCount.shard == submission.id % shards,
+        )
+        .values(count=SubmissionDailyCount.count - 1)
+    )
+
+def total_count(db: Session, form_id: int) -> int:
+    return db.query(func.coalesce(func.sum(SubmissionDailyCount.count), 0)).filter(
+        SubmissionDailyCount.form_id == form_id
+    ).scalar()
+
+def daily_counts(db: Session, form_id: int, start: date, end: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    [{"date", "count"}] for the days from `start` to `end` (inclusive) that
+    had submissions.
+    """
+    query = db.query(
+        SubmissionDailyCount.day, func.sum(SubmissionDailyCount.count).label("count")
+    ).filter(
+        SubmissionDailyCount.form_id == form_id,
+        SubmissionDailyCount.day >= start
+    )
+    if end is not None:
+        query = query.filter(SubmissionDailyCount.day <= end)
+    rows = query.group_by(SubmissionDailyCount.day).order_by(SubmissionDailyCount.day).all()
+    return [{"date": str(row.day), "count": int(row.count)} for row in rows]
+
+def hourly_counts(db: Session, form_id: int, start: date, end: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    [{"hour", "count"}] (hour as an ISO UTC timestamp) for the days from
+    `start` to `end` (inclusive).
+    """
+    query = db.query(
+        SubmissionDailyCount.day, SubmissionDailyCount.hour, func.sum(SubmissionDailyCount.count).label("count")
+    ).filter(
+        SubmissionDailyCount.form_id == form_id,
+        SubmissionDailyCount.day >= start
+    )
+    if end is not None:
+        query = query.filter(SubmissionDailyCount.day <= end)
+    rows = query.group_by(
+        SubmissionDailyCount.day, SubmissionDailyCount.hour
+    ).order_by(SubmissionDailyCount.day, SubmissionDailyCount.hour).all()
+    return [
+        {"hour": datetime(row.day.year, row.day.month, row.day.day, row.hour).isoformat(), "count": int(row.count)}
+        for row in rows
+    ]
+
+def rebuild_counts(db: Session, form_id: Optional[int] = None) -> int:
+    """
+    Recomputes the rollup from the submissions table (one form, or all) and
+    returns the number of bucket rows written. Concurrent writers are locked
+    out first, so submissions committed meanwhile are counted exactly once.
+    The caller commits.
+    """
+    if form_id is None:
+        db.execute(text("LOCK TABLE submission_daily_counts IN EXCLUSIVE MODE"))
+    else:
+        # Inserting a submission checks its form row (FOR KEY SHARE), which FOR UPDATE
+        # blocks: only this form's submissions wait, other forms keep writing the rollup
+        db.query(Form.id).filter(Form.id == form_id).with_for_update().first()
+    clear = delete(SubmissionDailyCount)
+    if form_id is not None:
+        clear = clear.where(SubmissionDailyCount.form_id == form_id)
+    db.execute(clear)
+
+    shards = max(settings.SUBMISSION_COUNT_SHARDS, 1)
+    day = cast(Submission.created_at, Date)
+    hour = cast(extract("hour", Submission.created_at), SmallInteger)
+    shard = cast(Submission.id % shards, SmallInteger)
+    source = select(
+        Submission.form_id, Submission.form_version_id, day, hour, shard, func.count()
+    ).where(Submission.created_at.isnot(None))
+    if form_id is not None:
+        source = source.where(Submission.form_id == form_id)
+    source = source.group_by(Submission.form_id, Submission.form_version_id, day, hour, shard)
+
+    result = db.execute(insert(SubmissionDailyCount).from_select(
+        ["form_id", "form_version_id", "day", "hour", "shard", "count"], source
+    ))
+    return result.rowcount
@@ -0,0 +1,41 @@
+import logging
+from sqlalchemy.orm import Session
+from app.models.form import Submission
+from app.models.outbox import OutboxJob
+from app.models.webhook import WebhookDeadLetter
+from app.core.pdf_store import release_pdf
+from app.core.pdf_service import pdf_service
+from app.core.submission_counts import unrecord_submission
+
+logger = logging.getLogger(__name__)
+
+def delete_submission(db: Session, submission_id: int) -> bool:
+    """
+    Deletes a submission with its outbox jobs and dead letters, drops its
+    reference on the stored PDF and takes it out of the count rollup, in one
+    transaction. The PDF object itself is deleted after the commit, once its
+    last reference is gone. Returns False if the submission does not exist.
+
+    Field statistics and sketches keep its answers until they are rebuilt
+    (python -m app.rebuild_field_stats).
+    """
+    # Locked so a concurrent lazy render (app.core.pdf_on_demand) either
+    # finishes first, and its reference is released here, or sees no row
+    submission = db.query(Submission).filter(Submission.id == submission_id).with_for_update().populate_existing().first()
+    if submission is None:
+        db.rollback()
+        return False
+
+    db.query(WebhookDeadLetter).filter(WebhookDeadLetter.submission_id == submission.id).delete(synchronize_session=False)
+    db.query(OutboxJob).filter(OutboxJob.submission_id == submission.id).delete(synchronize_session=False)
+    orphaned_key = release_pdf(db, submission.pdf_hash) if submission.pdf_hash else None
+    unrecord_submission(db, submission)
+    db.delete(submission)
+    db.commit()
+
+    if orphaned_key:
+        try:
+            pdf_service.delete_object(orphaned_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete PDF object {orphaned_key}: {e}")
+    return True
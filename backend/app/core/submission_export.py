@@ -0,0 +1,270 @@
+import io
+import csv
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.form import FormVersion, Submission
+from app.core.form_runtime import form_runtime_cache
+from app.core.logic.validation import iter_schema_fields
+
+# Rows per chunk handed to the client (and per server-side cursor fetch)
+EXPORT_CHUNK_ROWS = 1000
+
+def export_fields(db: Session, form_id: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Columns of a form export: the schema fields of every version (first
+    definition wins, in version order) and the computed formula targets.
+    """
+    fields: Dict[str, Dict[str, Any]] = {}
+    computed: Dict[str, None] = {}
+    version_ids = [row.id for row in db.query(FormVersion.id).filter(FormVersion.form_id == form_id).order_by(FormVersion.version_number)]
+    for version_id in version_ids:
+        compiled = form_runtime_cache.get_version(db, version_id)
+        if compiled is None:
+            continue
+        for field in iter_schema_fields(compiled.schema):
+            field_id = field.get("id")
+            if field_id is not None and field_id not in fields:
+                fields[field_id] = field
+        for target in compiled.formula_program.targets:
+            if target:
+                computed.setdefault(target)
+    return list(fields.values()), list(computed)
+
+def iter_submission_rows(form_id: int) -> Iterator[Tuple[int, Any, int, dict, dict]]:
+    """
+    (id, created_at, form_version_id, raw_data, computed_data) of every
+    submission of a form in (created_at, id) order, streamed from a
+    server-side cursor in its own session.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            Submission.id, Submission.created_at, Submission.form_version_id,
+            Submission.raw_data, Submission.computed_data
+        ).filter(
+            Submission.form_id == form_id
+        ).order_by(Submission.created_at, Submission.id).execution_options(
+            yield_per=EXPORT_CHUNK_ROWS
+        )
+        for row in rows:
+            yield tuple(row)
+    finally:
+        db.close()
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+def stream_csv(form_id: int, fields: List[Dict[str, Any]], computed: List[str]) -> Iterator[str]:
+    """
+    CSV with one column per schema field (named by field id) and one
+    "computed.<target>" column per formula. Nested answers are JSON-encoded.
+    """
+    field_ids = [field["id"] for field in fields]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "created_at", "form_version_id"] + field_ids + [f"computed.{name}" for name in computed])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for submission_id, created_at, version_id, raw_data, computed_data in iter_submission_rows(form_id):
+        raw_data, computed_data = raw_data or {}, computed_data or {}
+        writer.writerow(
+            [submission_id, created_at.isoformat() if created_at else "", version_id]
+            + [_cell(raw_data.get(field_id)) for field_id in field_ids]
+            + [_cell(computed_data.get(name)) for name in computed]
+        )
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_ndjson(form_id: int) -> Iterator[str]:
+    """
+    One JSON object per submission: {id, created_at, form_version_id, data, computed}.
+    """
+    lines = []
+    for submission_id, created_at, version_id, raw_data, computed_data in iter_submission_rows(form_id):
+        lines.append(json.dumps({
+            "id": submission_id,
+            "created_at": created_at.isoformat() if created_at else None,
+            "form_version_id": version_id,
+            "data": raw_data or {},
+            "computed": computed_data or {},
+        }, default=str))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+# Parquet export: schema field type -> column type (anything else is a string)
+NUMBER_TYPES = {"number"}
+CATEGORY_TYPES = {"select", "radio"}
+DATE_TYPES = {"date", "datetime"}
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "" or isinstance(value, (dict, list)):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_timestamp(value: Any) -> Optional[datetime]:
+    # Naive UTC, like created_at; answers with an offset are converted, not truncated
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _to_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+class _ChunkSink:
+    """
+    Unseekable sink for the Parquet writer: collects what was written since
+    the last drain, so the file can be streamed row group by row group.
+    """
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False # Checked by pyarrow before writing
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_columns(fields: List[Dict[str, Any]], computed: List[str]):
+    """
+    (column name, arrow type, converter, source, key) for every exported
+    column; source is "raw" or "computed" and key the answer or formula name.
+    Answers are "data.<field id>" so that fields named like the metadata
+    columns (id, created_at, form_version_id) cannot collide with them.
+    """
+    import pyarrow as pa
+    columns = []
+    for field in fields:
+        field_type = field.get("type")
+        if field_type in NUMBER_TYPES:
+            arrow_type, convert = pa.float64(), _to_float
+        elif field_type in CATEGORY_TYPES:
+            arrow_type, convert = pa.dictionary(pa.int32(), pa.string()), _to_text
+        elif field_type in DATE_TYPES:
+            arrow_type, convert = pa.timestamp("us"), _to_timestamp
+        else:
+            arrow_type, convert = pa.string(), _to_text
+        columns.append((f"data.{field['id']}", arrow_type, convert, "raw", field["id"]))
+    for name in computed:
+        # Formulas evaluate to numbers
+        columns.append((f"computed.{name}", pa.float64(), _to_float, "computed", name))
+    return columns
+
+def write_parquet(form_id: int, fields: List[Dict[str, Any]], computed: List[str], sink) -> Iterator[int]:
+    """
+    Writes the submissions of a form to `sink` as Parquet with typed columns
+    id, created_at, form_version_id, then "data.<field id>" per answer
+    (numbers as float64, select/radio answers dictionary-encoded, dates as
+    timestamps) and "computed.<name>" per formula as float64.
+
+    Row groups of EXPORT_PARQUET_ROW_GROUP_ROWS are built from the server-side
+    cursor and written one at a time. Yields the running row count after each
+    row group and once more after the footer, so callers can forward the
+    sink's output as it is produced.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = _parquet_columns(fields, computed)
+    schema = pa.schema(
+        [("id", pa.int64()), ("created_at", pa.timestamp("us")), ("form_version_id", pa.int64())]
+        + [(name, arrow_type) for name, arrow_type, _, _, _ in columns]
+    )
+    group_rows = max(settings.EXPORT_PARQUET_ROW_GROUP_ROWS, 1)
+
+    def row_group(ids, created, versions, values):
+        arrays = [pa.array(ids, pa.int64()), pa.array(created, pa.timestamp("us")), pa.array(versions, pa.int64())]
+        for (_, arrow_type, _, _, _), column in zip(columns, values):
+            if pa.types.is_dictionary(arrow_type):
+                arrays.append(pa.array(column, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(column, arrow_type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    total = 0
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        ids, created, versions = [], [], []
+        values: List[List[Any]] = [[] for _ in columns]
+        for submission_id, created_at, version_id, raw_data, computed_data in iter_submission_rows(form_id):
+            raw_data, computed_data = raw_data or {}, computed_data or {}
+            ids.append(submission_id)
+            created.append(created_at)
+            versions.append(version_id)
+            for (_, _, convert, source, key), column in zip(columns, values):
+                column.append(convert((raw_data if source == "raw" else computed_data).get(key)))
+            if len(ids) >= group_rows:
+                writer.write_table(row_group(ids, created, versions, values))
+                total += len(ids)
+                yield total
+                ids, created, versions = [], [], []
+                values = [[] for _ in columns]
+        if ids:
+            writer.write_table(row_group(ids, created, versions, values))
+            total += len(ids)
+    finally:
+        writer.close()
+    yield total
+
+def stream_parquet(form_id: int, fields: List[Dict[str, Any]], computed: List[str]) -> Iterator[bytes]:
+    """
+    Parquet file of a form's submissions, streamed as each row group is written.
+    """
+    sink = _ChunkSink()
+    for _ in write_parquet(form_id, fields, computed, sink):
+        data = sink.drain()
+        if data:
+            yield data
+
+def export_parquet_to_s3(form_id: int, fields: List[Dict[str, Any]], computed: List[str]) -> Tuple[str, int]:
+    """
+    Writes the Parquet export of a form into the submissions bucket (multipart,
+    row group by row group). Returns (object key, row count).
+    """
+    from app.core.pdf_service import BUCKET_NAME
+    from app.core.s3_upload import get_s3_client, MultipartUploadWriter
+    key = f"exports/{form_id}/{uuid.uuid4()}.parquet"
+    rows = 0
+    with MultipartUploadWriter(get_s3_client(), BUCKET_NAME, key, content_type="application/vnd.apache.parquet") as writer:
+        for rows in write_parquet(form_id, fields, computed, writer):
+            pass
+    return key, rows
@@ -0,0 +1,81 @@
+import re
+import json
+import math
+from typing import Any, Dict, List
+from sqlalchemy import cast, or_
+from sqlalchemy.dialects.postgresql import JSONPATH
+from app.models.form import Submission
+from app.core.logic.field_summary import NUMBER_TYPES, OPTION_TYPES
+
+# field=value, field>=n, field<=n, field>n, field<n, field~option
+FILTER_PATTERN = re.compile(r"^(?P<field>[^=<>~]+?)(?P<op>>=|<=|=|>|<|~)(?P<value>.*)$", re.DOTALL)
+RANGE_OPS = {">=", "<=", ">", "<"}
+
+class InvalidFilter(ValueError):
+    pass
+
+def _number(value: str) -> float:
+    try:
+        number = float(value)
+    except ValueError:
+        raise InvalidFilter(f"'{value}' is not a number")
+    if not math.isfinite(number):
+        raise InvalidFilter(f"'{value}' is not a finite number")
+    return number
+
+def _jsonpath_key(field_id: str) -> str:
+    # Quoted member accessor: $."field id"
+    return json.dumps(field_id)
+
+def _range_condition(field_id: str, op: str, value: str):
+    # @? with .double() also matches numeric strings; non-numeric answers are skipped, not errors.
+    # Not served by the jsonb_path_ops GIN index (it only answers == on plain key paths):
+    # ranges scan the form's submissions, reached through ix_submissions_form_id_created_at_id
+    path = f"$.{_jsonpath_key(field_id)} ? (@.double() {op} {_number(value)!r})"
+    return Submission.raw_data.op("@?")(cast(path, JSONPATH))
+
+def _condition(field: Dict[str, Any], op: str, value: str):
+    field_id, field_type = field["id"], field.get("type")
+
+    if op == "=":
+        # Containment (@>) is served by the jsonb_path_ops GIN index
+        if field_type in NUMBER_TYPES:
+            # Number answers may be stored as numbers or numeric strings
+            number = _number(value)
+            return or_(Submission.raw_data.contains({field_id: number}), Submission.raw_data.contains({field_id: value}))
+        return Submission.raw_data.contains({field_id: value})
+
+    if op == "~":
+        if field_type not in OPTION_TYPES:
+            raise InvalidFilter(f"'~' matches options of multi-value answers; '{field_id}' is {field_type or 'untyped'}")
+        # A multi-value answer (list) that includes the option (indexed containment)
+        return Submission.raw_data.contains({field_id: [value]})
+
+    if field_type not in NUMBER_TYPES:
+        raise InvalidFilter(f"Range filters need a number field; '{field_id}' is {field_type or 'untyped'}")
+    return _range_condition(field_id, op, value)
+
+def parse_filters(raw_filters: List[str], fields: List[Dict[str, Any]]) -> list:
+    """
+    Turns `field=value`, `field>=n` (also <=, >, <) and `field~option`
+    expressions into SQL conditions on Submission.raw_data. Field names must
+    be schema fields of the form; ranges are only allowed on number fields
+    and `~` (list answer includes the option) on option fields. `=` and `~`
+    use the GIN index on raw_data; ranges do not (see _range_condition).
+    Raises InvalidFilter.
+    """
+    by_id = {field["id"]: field for field in fields}
+    conditions = []
+    for raw in raw_filters:
+        match = FILTER_PATTERN.match(raw)
+        if not match:
+            raise InvalidFilter(f"Invalid filter '{raw}': expected field=value, field>=n, field<=n, field>n, field<n or field~option")
+        field_id, op, value = match.group("field").strip(), match.group("op"), match.group("value")
+        field = by_id.get(field_id)
+        if field is None:
+            raise InvalidFilter(f"Unknown field '{field_id}'")
+        try:
+            conditions.append(_condition(field, op, value))
+        except InvalidFilter as e:
+            raise InvalidFilter(f"Invalid filter '{raw}': {e}")
+    return conditions
@@ -0,0 +1,141 @@
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.form import Submission
+from app.models.outbox import OutboxJob
+from app.models.webhook import WebhookDeadLetter
+from app.core.outbox import register, job_row, enqueue_many
+from app.core.form_runtime import form_runtime_cache, CompiledForm
+from app.core.logic.projection import WebhookDestination
+from app.core.pdf_service import pdf_service
+from app.core.pdf_store import store_pdf
+from app.core.presigned_urls import presigned_urls
+from app.core.webhook_service import webhook_service
+from app.core.email_service import email_service
+
+def plan_submission_jobs(compiled: CompiledForm, submission_id: int, raw_data: dict) -> List[dict]:
+    """
+    Outbox rows for a freshly stored submission. In eager mode the PDF (if any)
+    is rendered first; webhook and email follow once it is stored. In lazy mode
+    nothing is rendered up front (see app.core.pdf_on_demand).
+    """
+    if compiled.pdf_template and compiled.pdf_mode == "eager":
+        return [job_row("pdf", submission_id)]
+    return plan_notifications(compiled, submission_id, raw_data, pdf_key=None)
+
+def plan_notifications(compiled: CompiledForm, submission_id: int, raw_data: dict, pdf_key: Optional[str]) -> List[dict]:
+    rows = []
+
+    # Trigger Logic (n8n): one job per destination, so each is delivered and retried on its own
+    for index, destination in enumerate(compiled.webhook_destinations):
+        payload = {"url": destination.url, "destination": index}
+        if compiled.webhook_batch:
+            payload["batch"] = compiled.webhook_batch
+        rows.append(job_row("webhook", submission_id, payload))
+
+    # Email Notification: only when there is a PDF to send (lazy PDFs are rendered for it)
+    has_pdf = pdf_key or (compiled.pdf_template and compiled.pdf_mode == "lazy")
+    if compiled.email_field_id and has_pdf:
+        recipient_email = (raw_data or {}).get(compiled.email_field_id)
+        if recipient_email:
+            rows.append(job_row("email", submission_id, {"to_email": recipient_email}))
+
+    return rows
+
+def enqueue_submission_jobs(db: Session, submission: Submission, compiled: CompiledForm) -> int:
+    """
+    Queues the post-submit side effects in the caller's transaction and
+    returns how many jobs were queued.
+    """
+    rows = plan_submission_jobs(compiled, submission.id, submission.raw_data)
+    enqueue_many(db, rows)
+    return len(rows)
+
+def enqueue_notifications(db: Session, submission: Submission, compiled: CompiledForm) -> int:
+    rows = plan_notifications(compiled, submission.id, submission.raw_data, submission.pdf_key)
+    enqueue_many(db, rows)
+    return len(rows)
+
+def build_webhook_payload(submission: Submission, destination: Optional[WebhookDestination] = None) -> dict:
+    data, computed = submission.raw_data, submission.computed_data
+    if destination is not None:
+        data, computed = destination.project_submission(data, computed)
+    # The link is minted at dispatch time, so retries carry a fresh one
+    return {
+        "event": "submission.created",
+        "form_id": submission.form_id,
+        "submission_id": submission.id,
+        "data": data,
+        "computed": computed,
+        "pdf_url": presigned_urls.url_for(submission.pdf_key)
+    }
+
+def _pdf_gave_up(db: Session, job: OutboxJob) -> None:
+    # Still notify integrations without a PDF, as the synchronous path used to
+    submission = db.get(Submission, job.submission_id)
+    compiled = form_runtime_cache.get_version(db, submission.form_version_id)
+    enqueue_notifications(db, submission, compiled)
+
+def render_submission_pdf(db: Session, submission: Submission, compiled: CompiledForm) -> str:
+    """
+    Renders and stores the submission's PDF, sets its pdf_key/pdf_hash and
+    returns the key. The caller commits.
+    """
+    # Prepare data for template: raw + computed
+    tpl_data = {**(submission.raw_data or {}), **(submission.computed_data or {})}
+    html = pdf_service.render_html(compiled.pdf_template, tpl_data)
+    # Identical renders share one stored object (no re-render, no re-upload)
+    submission.pdf_hash, submission.pdf_key = store_pdf(db, compiled.pdf_template, html)
+    db.add(submission)
+    return submission.pdf_key
+
+@register("pdf", on_give_up=_pdf_gave_up)
+def handle_pdf(db: Session, job: OutboxJob) -> None:
+    submission = db.get(Submission, job.submission_id)
+    compiled = form_runtime_cache.get_version(db, submission.form_version_id)
+    if submission.pdf_key is None: # May already exist via the download endpoint
+        render_submission_pdf(db, submission, compiled)
+    enqueue_notifications(db, submission, compiled)
+
+def webhook_request(db: Session, job: OutboxJob) -> Tuple[str, dict]:
+    """
+    (url, payload) of a webhook job; sent by handle_webhook or the async dispatcher.
+    """
+    submission = db.get(Submission, job.submission_id)
+    destination = None
+    index = job.payload.get("destination")
+    if index is not None:
+        compiled = form_runtime_cache.get_version(db, submission.form_version_id)
+        if index < len(compiled.webhook_destinations):
+            destination = compiled.webhook_destinations[index]
+    return job.payload["url"], build_webhook_payload(submission, destination)
+
+def _webhook_dead_letter(db: Session, job: OutboxJob) -> None:
+    url, payload = webhook_request(db, job)
+    db.add(WebhookDeadLetter(
+        url=url,
+        payload=payload,
+        attempts=job.attempts,
+        last_error=job.last_error,
+        outbox_job_id=job.id,
+        submission_id=job.submission_id
+    ))
+
+@register("webhook", on_give_up=_webhook_dead_letter)
+def handle_webhook(db: Session, job: OutboxJob) -> None:
+    webhook_service.send(*webhook_request(db, job))
+
+def email_request(db: Session, job: OutboxJob) -> Tuple[str, str, str]:
+    """
+    (to_email, pdf_url, form_title) of an email job; sent by handle_email or the email dispatcher.
+    """
+    submission = db.get(Submission, job.submission_id)
+    compiled = form_runtime_cache.get_version(db, submission.form_version_id)
+    if submission.pdf_key is None: # Lazy mode: the email is the first access
+        from app.core.pdf_on_demand import ensure_pdf
+        ensure_pdf(db, submission.id)
+        db.refresh(submission)
+    return job.payload["to_email"], presigned_urls.url_for(submission.pdf_key), compiled.form_title
+
+@register("email")
+def handle_email(db: Session, job: OutboxJob) -> None:
+    email_service.deliver_submission_email(*email_request(db, job))
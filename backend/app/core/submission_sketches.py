@@ -0,0 +1,140 @@
+import math
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.form_runtime import form_runtime_cache
+from app.core.logic.field_summary import NUMBER_TYPES
+from app.core.logic.sketches import HyperLogLog, TDigest
+from app.core.logic.validation import iter_schema_fields
+from app.models.submission_sketch import SubmissionSketch
+
+Sketch = Union[HyperLogLog, TDigest]
+# (form_id, day, kind, name) -> sketch
+Sketches = Dict[Tuple[int, date, str, str], Sketch]
+
+SKETCH_TYPES = {"hll": HyperLogLog, "tdigest": TDigest}
+
+def _sketched_fields(db: Session, version_id: int) -> Tuple[List[str], List[str], List[str]]:
+    # (email field ids, number field ids, formula targets) of a version
+    compiled = form_runtime_cache.get_version(db, version_id)
+    if compiled is None:
+        return [], [], []
+    fields = list(iter_schema_fields(compiled.schema))
+    return (
+        [field["id"] for field in fields if field.get("type") == "email" and field.get("id")],
+        [field["id"] for field in fields if field.get("type") in NUMBER_TYPES and field.get("id")],
+        [target for target in compiled.formula_program.targets if target],
+    )
+
+def _as_number(value: Any) -> Optional[float]:
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # inf/nan would poison the digest's centroids and quantile interpolation
+    return number if math.isfinite(number) else None
+
+def sketch_rows(db: Session, rows: Iterable[Tuple[int, int, datetime, dict, dict]], into: Optional[Sketches] = None) -> Sketches:
+    """
+    Folds (form_id, form_version_id, created_at, raw_data, computed_data)
+    rows into per-day sketches: an HLL per email field (lower-cased) and a
+    t-digest per number field and per computed value.
+    """
+    into = into if into is not None else {}
+    fields_by_version: Dict[int, Tuple[List[str], List[str], List[str]]] = {}
+
+    def sketch(key, kind):
+        current = into.get(key)
+        if current is None:
+            current = into[key] = SKETCH_TYPES[kind]()
+        return current
+
+    for form_id, version_id, created_at, raw_data, computed_data in rows:
+        if created_at is None:
+            continue
+        if version_id not in fields_by_version:
+            fields_by_version[version_id] = _sketched_fields(db, version_id)
+        emails, numbers, targets = fields_by_version[version_id]
+        raw_data, computed_data = raw_data or {}, computed_data or {}
+        day = created_at.date()
+        for field_id in emails:
+            value = raw_data.get(field_id)
+            if isinstance(value, str) and value.strip():
+                sketch((form_id, day, "hll", field_id), "hll").add(value.strip().lower())
+        for field_id in numbers:
+            number = _as_number(raw_data.get(field_id))
+            if number is not None:
+                sketch((form_id, day, "tdigest", field_id), "tdigest").add(number)
+        for target in targets:
+            number = _as_number(computed_data.get(target))
+            if number is not None:
+                sketch((form_id, day, "tdigest", f"computed.{target}"), "tdigest").add(number)
+    return into
+
+def merge_sketches(db: Session, sketches: Sketches) -> None:
+    """
+    Merges sketches into submission_sketches (rows locked while merged).
+    The caller commits.
+    """
+    if not sketches:
+        return
+    keys = sorted(sketches)
+    db.execute(insert(SubmissionSketch).values([
+        {"form_id": form_id, "day": day, "kind": kind, "name": name, "data": b""}
+        for form_id, day, kind, name in keys
+    ]).on_conflict_do_nothing(index_elements=[
+        SubmissionSketch.form_id, SubmissionSketch.day, SubmissionSketch.kind, SubmissionSketch.name
+    ]))
+
+    rows = db.query(SubmissionSketch).filter(
+        tuple_(SubmissionSketch.form_id, SubmissionSketch.day, SubmissionSketch.kind, SubmissionSketch.name).in_(keys)
+    ).order_by(SubmissionSketch.form_id, SubmissionSketch.day, SubmissionSketch.kind, SubmissionSketch.name).with_for_update().all()
+    for row in rows:
+        incoming = sketches[(row.form_id, row.day, row.kind, row.name)]
+        if row.data:
+            merged = SKETCH_TYPES[row.kind].from_bytes(row.data)
+            merged.merge(incoming)
+        else:
+            merged = incoming
+        row.data = merged.to_bytes()
+
+def clear_sketches(db: Session, form_id: int) -> None:
+    db.execute(delete(SubmissionSketch).where(SubmissionSketch.form_id == form_id))
+
+def read_sketches(db: Session, form_id: int, start: date, end: date, quantiles: List[float]) -> Dict[str, Any]:
+    """
+    Merges the form's daily sketches from `start` to `end` (inclusive):
+    estimated distinct values per email field and quantiles per number
+    field / computed value.
+    """
+    rows = db.query(SubmissionSketch.kind, SubmissionSketch.name, SubmissionSketch.data).filter(
+        SubmissionSketch.form_id == form_id,
+        SubmissionSketch.day >= start,
+        SubmissionSketch.day <= end
+    ).all()
+    merged: Dict[Tuple[str, str], Sketch] = {}
+    for kind, name, data in rows:
+        if not data:
+            continue
+        sketch = SKETCH_TYPES[kind].from_bytes(data)
+        if (kind, name) in merged:
+            merged[(kind, name)].merge(sketch)
+        else:
+            merged[(kind, name)] = sketch
+
+    distinct, percentiles = {}, {}
+    for (kind, name), sketch in sorted(merged.items()):
+        if kind == "hll":
+            distinct[name] = round(sketch.estimate())
+        else:
+            percentiles[name] = {
+                "count": int(sketch.count),
+                "min": sketch.min,
+                "max": sketch.max,
+                **{f"p{q * 100:g}": sketch.quantile(q) for q in quantiles},
+            }
+    return {"start": str(start), "end": str(end), "distinct": distinct, "quantiles": percentiles}
@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core import outbox
+from app.models.outbox import OutboxJob
+from app.core.submission_jobs import webhook_request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2 # noqa: F401 (HTTP/2 support for httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def _prepare(job_id: int) -> Optional[Tuple[str, dict, Optional[dict]]]:
+    # (url, payload, batch settings or None)
+    db = SessionLocal()
+    try:
+        job = db.get(OutboxJob, job_id)
+        if job is None or job.status != "processing":
+            return None
+        url, payload = webhook_request(db, job)
+        return url, payload, (job.payload or {}).get("batch")
+    finally:
+        db.close()
+
+def _finish_many(results: List[Tuple[int, Optional[str]]]) -> None:
+    for job_id, error in results:
+        outbox.finish_job(job_id, error)
+
+def _failed_event_ids(response: httpx.Response) -> Set[int]:
+    """
+    Partial acknowledgement: a 2xx body of {"failed": [event_id, ...]} marks
+    only those events for retry. Any other body acknowledges the whole batch.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return set()
+    if not isinstance(body, dict):
+        return set()
+    return {event_id for event_id in body.get("failed") or [] if isinstance(event_id, int)}
+
+class _Batch:
+    def __init__(self):
+        self.events: List[Tuple[int, dict]] = [] # (outbox job id, payload)
+        self.timer: Optional[asyncio.Task] = None
+
+class _Destination:
+    # Delivery queue of one webhook URL, drained by its own workers
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.workers: List[asyncio.Task] = []
+
+def _claim(limit: int):
+    db = SessionLocal()
+    try:
+        return outbox.claim_jobs(db, limit, kinds=["webhook"])
+    finally:
+        db.close()
+
+class WebhookStats:
+    """
+    Delivery counters and latency of the dispatcher, for the worker's stats log.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, success: bool, seconds: float) -> None:
+        with self._lock:
+            if success:
+                self.delivered += 1
+            else:
+                self.failed += 1
+            self.latency_total += seconds
+            self.latency_max = max(self.latency_max, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.delivered + self.failed
+            return {
+                "delivered": self.delivered,
+                "failed_attempts": self.failed,
+                "success_ratio": (self.delivered / attempts) if attempts else 0.0,
+                "in_flight": self.in_flight,
+                "latency_seconds_avg": (self.latency_total / attempts) if attempts else 0.0,
+                "latency_seconds_max": self.latency_max,
+            }
+
+class WebhookDispatcher:
+    """
+    Delivers webhook outbox jobs from one asyncio loop over a single pooled
+    httpx.AsyncClient (keep-alive, HTTP/2 when available).
+
+    A producer claims jobs into a bounded queue; consumers build the payloads
+    and route them to a queue per destination URL, each drained by its own
+    workers (`per_destination`), so a slow destination only backs up its own
+    queue. At most `per_host` requests are in flight per host. Failures go back
+    through the outbox (exponential backoff with jitter), and deliveries that
+    exhaust their attempts land in webhook_dead_letters.
+
+    Versions with webhook_batch_size set are delivered in batches: events are
+    buffered per URL and flushed as one array when the batch is full or its
+    window has elapsed, whichever comes first.
+
+    Jobs waiting in a destination queue or a batch count against the claim
+    limit (WEBHOOK_MAX_BUFFERED_JOBS) and their leases are renewed until they
+    are delivered, so no other worker claims them meanwhile.
+    """
+    def __init__(self, max_connections: int, per_host: int, per_destination: int, timeout_seconds: float, http2: bool):
+        self.max_connections = max(max_connections, 1)
+        self.per_host = max(per_host, 1)
+        self.per_destination = max(per_destination, 1)
+        self.timeout_seconds = timeout_seconds
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.metrics = WebhookStats()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._batches: Dict[str, _Batch] = {}
+        self._url_locks: Dict[str, asyncio.Lock] = {}
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._buffered: Set[int] = set() # Claimed job ids waiting in a destination queue or batch
+        self._destinations: Dict[str, _Destination] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return semaphore
+
+    def _url_lock(self, url: str) -> asyncio.Lock:
+        lock = self._url_locks.get(url)
+        if lock is None:
+            lock = self._url_locks[url] = asyncio.Lock()
+        return lock
+
+    def _add_to_batch(self, client: httpx.AsyncClient, url: str, job_id: int, payload: dict, batch_settings: dict) -> None:
+        batch = self._batches.get(url)
+        if batch is None:
+            batch = self._batches[url] = _Batch()
+            batch.timer = asyncio.create_task(self._flush_after(client, url, batch, batch_settings["window_seconds"]))
+        batch.events.append((job_id, payload))
+        self._buffered.add(job_id)
+        if len(batch.events) >= batch_settings["max_size"]:
+            batch.timer.cancel()
+            self._flush(client, url, batch)
+
+    async def _flush_after(self, client: httpx.AsyncClient, url: str, batch: _Batch, window_seconds: float) -> None:
+        await asyncio.sleep(window_seconds)
+        self._flush(client, url, batch)
+
+    def _flush(self, client: httpx.AsyncClient, url: str, batch: _Batch) -> None:
+        if self._batches.get(url) is batch:
+            del self._batches[url]
+            task = asyncio.create_task(self._send_batch(client, url, batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, client: httpx.AsyncClient, url: str, batch: _Batch) -> None:
+        """
+        POSTs {"batch_id", "events": [...]} with events in job (submission)
+        order. Batches for one URL are sent one at a time, so they arrive in
+        the order they were formed; retried events go out in a later batch.
+        """
+        events = sorted(batch.events, key=lambda event: event[0])
+        try:
+            await self._post_batch(client, url, events)
+        finally:
+            self._buffered.difference_update(job_id for job_id, _ in events)
+
+    async def _post_batch(self, client: httpx.AsyncClient, url: str, events: List[Tuple[int, dict]]) -> None:
+        body = {
+            "batch_id": str(uuid.uuid4()),
+            "events": [{**payload, "event_id": job_id} for job_id, payload in events],
+        }
+        failed: Set[int] = set()
+        error = None
+        async with self._url_lock(url), self._host_limit(url):
+            self.metrics.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=body)
+                response.raise_for_status()
+                failed = _failed_event_ids(response)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                self.metrics.in_flight -= 1
+            self.metrics.record(error is None, time.perf_counter() - started)
+
+        results = [
+            (job_id, error or ("Rejected by receiver (partial batch ack)" if job_id in failed else None))
+            for job_id, _ in events
+        ]
+        await asyncio.to_thread(_finish_many, results)
+
+    def _destination(self, client: httpx.AsyncClient, url: str) -> _Destination:
+        destination = self._destinations.get(url)
+        if destination is None:
+            destination = self._destinations[url] = _Destination(settings.WEBHOOK_DESTINATION_QUEUE_SIZE)
+            destination.workers = [
+                asyncio.create_task(self._drain_destination(client, url, destination))
+                for _ in range(self.per_destination)
+            ]
+        return destination
+
+    async def _drain_destination(self, client: httpx.AsyncClient, url: str, destination: _Destination) -> None:
+        while True:
+            job_id, payload = await destination.queue.get()
+            try:
+                await self._send(client, url, job_id, payload)
+            except Exception as e:
+                logger.error(f"Webhook job {job_id} failed unexpectedly: {e}")
+            finally:
+                self._buffered.discard(job_id)
+                destination.queue.task_done()
+
+    async def _send(self, client: httpx.AsyncClient, url: str, job_id: int, payload: dict) -> None:
+        error = None
+        async with self._host_limit(url):
+            self.metrics.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                self.metrics.in_flight -= 1
+            self.metrics.record(error is None, time.perf_counter() - started)
+
+        await asyncio.to_thread(outbox.finish_job, job_id, error)
+
+    async def _deliver(self, client: httpx.AsyncClient, job_id: int) -> None:
+        try:
+            request = await asyncio.to_thread(_prepare, job_id)
+        except Exception as e:
+            await asyncio.to_thread(outbox.finish_job, job_id, f"Failed to build webhook: {e}")
+            return
+        if request is None:
+            return
+        url, payload, batch_settings = request
+        if batch_settings:
+            self._add_to_batch(client, url, job_id, payload, batch_settings)
+            return
+
+        try:
+            self._destination(client, url).queue.put_nowait((job_id, payload))
+            self._buffered.add(job_id)
+        except asyncio.QueueFull:
+            # Backlogged destination: retry later instead of holding the lease
+            await asyncio.to_thread(outbox.release_job, job_id, settings.OUTBOX_RETRY_BASE_SECONDS)
+
+    async def _renew_leases(self) -> None:
+        # Buffered jobs may outlive their lease: a full destination queue takes
+        # about queue size / concurrency * timeout to drain, batches wait for their window
+        while True:
+            await asyncio.sleep(settings.OUTBOX_LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(outbox.renew_leases, list(self._buffered))
+            except Exception as e:
+                logger.error(f"Webhook lease renewal failed: {e}")
+
+    async def _consume(self, client: httpx.AsyncClient, queue: asyncio.Queue) -> None:
+        while True:
+            job_id = await queue.get()
+            try:
+                await self._deliver(client, job_id)
+            except Exception as e:
+                logger.error(f"Webhook job {job_id} failed unexpectedly: {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self, stop_event) -> None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_connections * 2)
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(http2=self.http2, limits=limits, timeout=self.timeout_seconds) as client:
+            consumers = [asyncio.create_task(self._consume(client, queue)) for _ in range(self.max_connections)]
+            consumers.append(asyncio.create_task(self._renew_leases()))
+            logger.info(f"Webhook dispatcher started ({self.max_connections} connections, {self.per_host} per host, http2={self.http2})")
+            while not stop_event.is_set():
+                # Claim only what the queue can take, so leases don't expire while queued,
+                # and stop claiming while too many jobs wait in destination queues and batches
+                free = min(queue.maxsize - queue.qsize(), settings.WEBHOOK_MAX_BUFFERED_JOBS - len(self._buffered))
+                job_ids = []
+                if free > 0:
+                    try:
+                        job_ids = await asyncio.to_thread(_claim, free)
+                    except Exception as e:
+                        logger.error(f"Webhook claim failed: {e}")
+                for job_id in job_ids:
+                    await queue.put(job_id)
+                if not job_ids:
+                    await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+            await queue.join() # Finish what was claimed
+            for url, batch in list(self._batches.items()):
+                batch.timer.cancel()
+                self._flush(client, url, batch)
+            while self._batch_tasks:
+                await asyncio.gather(*list(self._batch_tasks), return_exceptions=True)
+            for destination in self._destinations.values():
+                await destination.queue.join()
+                consumers.extend(destination.workers)
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+
+    def run_forever(self, stop_event) -> None:
+        asyncio.run(self.run(stop_event))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.metrics.stats()
+        stats["buffered_jobs"] = len(self._buffered)
+        stats["destination_backlog"] = {url: destination.queue.qsize() for url, destination in list(self._destinations.items())}
+        return stats
+
+webhook_dispatcher = WebhookDispatcher(
+    max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    per_host=settings.WEBHOOK_MAX_PER_HOST,
+    per_destination=settings.WEBHOOK_DESTINATION_CONCURRENCY,
+    timeout_seconds=settings.WEBHOOK_TIMEOUT_SECONDS,
+    http2=settings.WEBHOOK_HTTP2
+)
@@ -1,9 +1,34 @@
 import httpx
 import logging
+import threading
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 class WebhookService:
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        # One pooled keep-alive client instead of a new connection per event
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(max_connections=settings.WEBHOOK_MAX_CONNECTIONS)
+                )
+            return self._client
+
+    def send(self, url: str, payload: dict):
+        """
+        Posts the payload and raises on network errors or non-2xx responses,
+        so the outbox worker can retry the delivery.
+        """
+        response = self._get_client().post(url, json=payload)
+        response.raise_for_status()
+        logger.info(f"Webhook {url} success: {response.status_code}")
+
     def trigger_webhook(self, url: str, payload: dict):
         """
         Triggers an external webhook (e.g. n8n) with the submission payload.
@@ -14,10 +39,7 @@ class WebhookService:
 
         try:
             # Short timeout to not block thread too long
-            with httpx.Client(timeout=5.0) as client:
-                response = client.post(url, json=payload)
-                response.raise_for_status()
-                logger.info(f"Webhook {url} success: {response.status_code}")
+            self.send(url, payload)
         except Exception as e:
             logger.error(f"Webhook {url} failed: {str(e)}")
 
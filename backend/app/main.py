@@ -2,10 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import forms, submissions, agents, login, payments
 from app.core.config import settings
+from app.core.form_runtime import form_runtime_cache
+from app.core.pdf_render_pool import pdf_render_pool
+from app.core.s3_upload import upload_stats
+from app.core.presigned_urls import presigned_urls
 
 from app.core.db import Base, engine
 # Import all models to ensure they are registered with Base
-from app.models import user, form, invite, api_key 
+from app.models import user, form, invite, api_key, outbox, pdf_object, webhook, submission_count, field_stats, submission_sketch
 
 app = FastAPI(title="Smart Form Automation API", version="0.1.0")
 
@@ -25,6 +29,18 @@ app.add_middleware(
 def health_check():
     return {"status": "ok", "service": "backend"}
 
+@app.get("/metrics")
+def metrics():
+    """
+    In-process counters for alerting (per API process).
+    """
+    return {
+        "form_runtime_cache": form_runtime_cache.stats(),
+        "pdf_render_pool": pdf_render_pool.stats(),
+        "s3_uploads": upload_stats.stats(),
+        "presigned_urls": presigned_urls.stats(),
+    }
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Smart Form Automation API"}
@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from app.core.db import Base
+
+class FieldStats(Base):
+    """
+    Running answer distribution of one field of a FormVersion
+    (app.core.logic.field_summary.FieldSummary), folded in by the analytics
+    aggregator as submissions arrive.
+    """
+    __tablename__ = "field_stats"
+
+    form_version_id = Column(Integer, ForeignKey("form_versions.id"), primary_key=True)
+    field_id = Column(String, primary_key=True)
+
+    seen = Column(Integer, nullable=False, default=0) # Submissions folded in
+    filled = Column(Integer, nullable=False, default=0) # ... that answered this field
+    num_count = Column(Integer, nullable=False, default=0)
+    num_mean = Column(Float, nullable=False, default=0.0)
+    num_m2 = Column(Float, nullable=False, default=0.0) # Sum of squared deviations (Welford)
+    num_min = Column(Float, nullable=True)
+    num_max = Column(Float, nullable=True)
+    option_counts = Column(JSON, default=dict) # select/radio: {option: count}
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
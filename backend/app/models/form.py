@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, JSON, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.db import Base
@@ -30,7 +31,11 @@ class FormVersion(Base):
     rules_json = Column(JSON, default=list)
     formulas_json = Column(JSON, default=list)
     pdf_template = Column(String, nullable=True) # HTML/Jinja Template
+    pdf_mode = Column(String, default="eager", nullable=False) # eager: render on submit, lazy: on first download
     webhook_url = Column(String, nullable=True) # n8n Webhook
+    webhook_destinations = Column(JSON, default=list) # [{url, include, exclude, computed_only}]
+    webhook_batch_size = Column(Integer, nullable=True) # Set to deliver events in batches (async dispatcher)
+    webhook_batch_window_seconds = Column(Float, nullable=True)
     
     is_published = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -44,12 +49,20 @@ class Submission(Base):
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    raw_data = Column(JSON, default=dict)
+    raw_data = Column(JSONB, default=dict) # JSONB so answers can be filtered through a GIN index
     computed_data = Column(JSON, default=dict)
-    pdf_url = Column(String, nullable=True)
+    pdf_key = Column(String, nullable=True) # S3 object key; links are presigned on read
+    pdf_hash = Column(String, nullable=True, index=True) # -> pdf_objects.content_hash
     
     form_id = Column(Integer, ForeignKey("forms.id"), nullable=False)
     form = relationship("Form", back_populates="submissions")
     
     form_version_id = Column(Integer, ForeignKey("form_versions.id"), nullable=False)
     form_version = relationship("FormVersion")
+
+    __table_args__ = (
+        # Keyset pagination of a form's submissions in (created_at, id) order
+        Index("ix_submissions_form_id_created_at_id", "form_id", "created_at", "id"),
+        # Containment (@>) and jsonpath (@?) filters on answers
+        Index("ix_submissions_raw_data_path_ops", "raw_data", postgresql_using="gin", postgresql_ops={"raw_data": "jsonb_path_ops"}),
+    )
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Index
+from sqlalchemy.orm import relationship
+from app.core.db import Base
+
+class OutboxJob(Base):
+    """
+    Post-submit side effect (pdf, webhook, email) written in the same
+    transaction as its Submission and drained by the worker (app.worker).
+    """
+    __tablename__ = "outbox_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False) # pdf, webhook, email, analytics
+    payload = Column(JSON, default=dict)
+
+    status = Column(String, default="pending", nullable=False) # pending, processing, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True) # Lease of the worker that claimed it
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=True, index=True)
+    submission = relationship("Submission")
+
+    __table_args__ = (
+        Index("ix_outbox_jobs_status_available_at", "status", "available_at"),
+    )
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.db import Base
+
+class PDFObject(Base):
+    """
+    Content-addressed PDF: submissions whose rendered HTML is identical share
+    one stored object. ref_count is the number of submissions pointing at it.
+    """
+    __tablename__ = "pdf_objects"
+
+    content_hash = Column(String, primary_key=True) # sha256 of render revision + HTML
+    object_key = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, SmallInteger, Date, ForeignKey
+from app.core.db import Base
+
+class SubmissionDailyCount(Base):
+    """
+    Rollup of submissions per form version and UTC hour, maintained in the
+    inserting transaction (app.core.submission_counts). Each bucket is split
+    over `shard` rows so concurrent submissions to one form don't all update
+    the same row; readers sum the shards.
+    """
+    __tablename__ = "submission_daily_counts"
+
+    form_id = Column(Integer, ForeignKey("forms.id"), primary_key=True)
+    form_version_id = Column(Integer, ForeignKey("form_versions.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    hour = Column(SmallInteger, primary_key=True) # 0-23, UTC
+    shard = Column(SmallInteger, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, LargeBinary, ForeignKey
+from app.core.db import Base
+
+class SubmissionSketch(Base):
+    """
+    Mergeable sketch of one form's submissions on one UTC day
+    (app.core.logic.sketches): "hll" distinct respondents of an email field,
+    or "tdigest" quantiles of a number field / computed value ("computed.<target>").
+    """
+    __tablename__ = "submission_sketches"
+
+    form_id = Column(Integer, ForeignKey("forms.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    kind = Column(String, primary_key=True) # hll, tdigest
+    name = Column(String, primary_key=True) # field id, or computed.<target>
+    data = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
+from app.core.db import Base
+
+class WebhookDeadLetter(Base):
+    """
+    A webhook delivery that exhausted its retries. Kept with the payload that
+    was being sent so it can be inspected and replayed.
+    """
+    __tablename__ = "webhook_dead_letters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False)
+    payload = Column(JSON, default=dict)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    outbox_job_id = Column(Integer, ForeignKey("outbox_jobs.id"), nullable=True, index=True)
+    submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=True, index=True)
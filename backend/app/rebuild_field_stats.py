@@ -0,0 +1,28 @@
+"""
+Rebuilds the per-field answer statistics (field_stats) and the daily
+sketches (submission_sketches) of a form from its submission history.
+
+    python -m app.rebuild_field_stats --form-id 12
+
+Submissions keep arriving meanwhile; the aggregator in app.worker catches
+up on them once the rebuild commits.
+"""
+import json
+import argparse
+import logging
+# Import all models to ensure they are registered with Base
+from app.models import user, form, invite, api_key, outbox, pdf_object, webhook, submission_count, field_stats, submission_sketch
+from app.core.field_stats import rebuild_field_stats
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild field_stats and submission_sketches for a form")
+    parser.add_argument("--form-id", type=int, required=True)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    summary = rebuild_field_stats(args.form_id, batch_size=args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
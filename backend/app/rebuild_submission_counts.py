@@ -0,0 +1,36 @@
+"""
+Rebuilds the submission_daily_counts rollup from the submissions table.
+
+    python -m app.rebuild_submission_counts
+    python -m app.rebuild_submission_counts --form-id 12
+
+Safe to run while submissions keep arriving: they wait for the rebuild to
+commit and are then counted on top of it. A full rebuild holds up writers of
+every form; with --form-id only that form's submissions and deletes wait.
+"""
+import argparse
+import logging
+from app.core.db import SessionLocal
+# Import all models to ensure they are registered with Base
+from app.models import user, form, invite, api_key, outbox, pdf_object, webhook, submission_count, field_stats, submission_sketch
+from app.core.submission_counts import rebuild_counts
+
+logger = logging.getLogger(__name__)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the submission_daily_counts rollup")
+    parser.add_argument("--form-id", type=int, default=None, help="Only rebuild this form (default: all forms)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = SessionLocal()
+    try:
+        rows = rebuild_counts(db, args.form_id)
+        db.commit()
+    finally:
+        db.close()
+    scope = f"form {args.form_id}" if args.form_id is not None else "all forms"
+    logger.info(f"Rebuilt submission_daily_counts for {scope}: {rows} bucket rows")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+
+class WebhookDestination(BaseModel):
+    url: str
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    computed_only: bool = False
 
 class FormVersionBase(BaseModel):
     schema_json: Dict[str, Any] = {}
     rules_json: List[Dict[str, Any]] = []
     formulas_json: List[Dict[str, Any]] = []
     pdf_template: Optional[str] = None
+    pdf_mode: Literal["eager", "lazy"] = "eager"
     webhook_url: Optional[str] = None
+    webhook_destinations: Optional[List[WebhookDestination]] = []
+    webhook_batch_size: Optional[int] = Field(None, ge=1)
+    webhook_batch_window_seconds: Optional[float] = Field(None, gt=0)
     is_published: bool = False
 
 class FormVersionCreate(FormVersionBase):
@@ -18,5 +18,32 @@ class Submission(SubmissionBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class SubmissionPage(BaseModel):
+    items: List[Submission]
+    next_cursor: Optional[str] = None # Pass as ?cursor= for the next page
+    has_more: bool
+
 class PublicSubmissionCreate(BaseModel):
     answers: Dict[str, Any]
+
+class PublicSubmissionBatchCreate(BaseModel):
+    submissions: List[PublicSubmissionCreate]
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str # processing, completed, rejected
+    error: Optional[Dict[str, Any]] = None
+
+class PublicSubmissionBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BatchItemResult]
+
+class VisibilityRequest(BaseModel):
+    changed: List[str]
+    answers: Dict[str, Any]
+
+class VisibilityDelta(BaseModel):
+    version: int
+    visibility: Dict[str, bool]
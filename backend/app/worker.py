@@ -0,0 +1,115 @@
+"""
+Outbox worker: drains post-submit side effects (PDF, webhook, email).
+
+Run alongside the API:
+    python -m app.worker
+
+Concurrency is configured with OUTBOX_WORKER_CONCURRENCY and
+OUTBOX_WORKER_MODE ("thread" or "process"). PDFs are rendered in a separate
+pool of warm WeasyPrint processes (PDF_RENDER_WORKERS), so "thread" mode
+already uses several cores; in "process" mode every worker owns its own pool.
+Webhooks are delivered by the async dispatcher (one pooled HTTP client in the
+main process) unless WEBHOOK_DISPATCHER_ENABLED is off; emails likewise go
+through the batched email dispatcher (pooled SMTP connections) unless
+EMAIL_DISPATCHER_ENABLED is off. Analytics jobs are folded into field_stats
+in micro-batches by the analytics aggregator. Done jobs are deleted after
+OUTBOX_DONE_RETENTION_DAYS.
+"""
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+from app.core.config import settings
+from app.core.db import engine
+from app.core import outbox
+from app.core.pdf_render_pool import pdf_render_pool
+from app.core.webhook_dispatcher import webhook_dispatcher
+from app.core.email_dispatcher import email_dispatcher
+from app.core.analytics_aggregator import analytics_aggregator
+# Import all models to ensure they are registered with Base
+from app.models import user, form, invite, api_key, outbox as outbox_model, pdf_object, webhook, submission_count, field_stats, submission_sketch
+# Registers the pdf/webhook/email handlers
+from app.core import submission_jobs
+
+logger = logging.getLogger(__name__)
+
+def drain_forever(stop_event, kinds=None, forked: bool = False) -> None:
+    """
+    Claims and runs batches until stopped, sleeping when the outbox is empty.
+    forked: running in a child process (process mode).
+    """
+    if forked:
+        # Connections inherited from the parent must not be shared
+        engine.dispose(close=False)
+    while not stop_event.is_set():
+        try:
+            claimed = outbox.drain_once(kinds=kinds)
+        except KeyboardInterrupt:
+            break
+        except Exception as e:
+            logger.error(f"Outbox drain failed: {e}")
+            claimed = 0
+        if not claimed:
+            stop_event.wait(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    concurrency = max(settings.OUTBOX_WORKER_CONCURRENCY, 1)
+    mode = settings.OUTBOX_WORKER_MODE
+    dispatch_webhooks = settings.WEBHOOK_DISPATCHER_ENABLED
+    dispatch_emails = settings.EMAIL_DISPATCHER_ENABLED
+    dispatched = {kind for kind, enabled in (("webhook", dispatch_webhooks), ("email", dispatch_emails)) if enabled}
+    # Analytics jobs have no per-job handler: only the aggregator applies them
+    kinds = [kind for kind in outbox.HANDLERS if kind not in dispatched]
+
+    if mode == "process":
+        stop_event = multiprocessing.Event()
+        # Not daemonic: each worker process starts its own PDF render pool
+        workers = [multiprocessing.Process(target=drain_forever, args=(stop_event, kinds, True)) for _ in range(concurrency)]
+    else:
+        stop_event = threading.Event()
+        workers = [threading.Thread(target=drain_forever, args=(stop_event, kinds), daemon=True) for _ in range(concurrency)]
+    if dispatch_webhooks:
+        workers.append(threading.Thread(target=webhook_dispatcher.run_forever, args=(stop_event,), daemon=True))
+    if dispatch_emails:
+        workers.append(threading.Thread(target=email_dispatcher.run_forever, args=(stop_event,), daemon=True))
+    workers.append(threading.Thread(target=analytics_aggregator.run_forever, args=(stop_event,), daemon=True))
+
+    def shutdown(signum, frame):
+        logger.info("Stopping outbox worker...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"Starting outbox worker: {concurrency} {mode} worker(s)")
+    for worker in workers:
+        worker.start()
+    last_stats = time.monotonic()
+    last_purge = time.monotonic() - settings.OUTBOX_PURGE_INTERVAL_SECONDS # Sweep on start
+    while any(worker.is_alive() for worker in workers):
+        for worker in workers:
+            worker.join(timeout=1.0)
+        if time.monotonic() - last_stats >= settings.WORKER_STATS_INTERVAL_SECONDS:
+            if mode != "process":
+                logger.info(f"PDF render pool: {pdf_render_pool.stats()}")
+            if dispatch_webhooks:
+                logger.info(f"Webhook dispatcher: {webhook_dispatcher.stats()}")
+            if dispatch_emails:
+                logger.info(f"Email dispatcher: {email_dispatcher.stats()}")
+            logger.info(f"Analytics aggregator: {analytics_aggregator.stats()}")
+            last_stats = time.monotonic()
+        if time.monotonic() - last_purge >= settings.OUTBOX_PURGE_INTERVAL_SECONDS:
+            try:
+                purged = outbox.purge_done_jobs(settings.OUTBOX_DONE_RETENTION_DAYS)
+                if purged:
+                    logger.info(f"Purged {purged} done outbox job(s) older than {settings.OUTBOX_DONE_RETENTION_DAYS} day(s)")
+            except Exception as e:
+                logger.error(f"Outbox purge failed: {e}")
+            last_purge = time.monotonic()
+
+    pdf_render_pool.shutdown()
+
+if __name__ == "__main__":
+    main()
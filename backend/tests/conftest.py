@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No object store in unit tests: fail fast instead of retrying a real endpoint
+os.environ.setdefault("MINIO_ENDPOINT", "127.0.0.1:1")
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite.base import SQLiteTypeCompiler
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Submissions store answers as JSONB; SQLite keeps them as JSON text
+SQLiteTypeCompiler.visit_JSONB = SQLiteTypeCompiler.visit_JSON
+
+from app.core.db import Base
+from app.models import user, form, invite, api_key, outbox, pdf_object, webhook, submission_count, field_stats, submission_sketch
+
+@pytest.fixture(autouse=True)
+def empty_form_runtime_cache():
+    # Ids repeat across test databases: start every test with a cold cache
+    from app.core.form_runtime import form_runtime_cache
+    form_runtime_cache._by_slug.clear()
+    form_runtime_cache._by_version.clear()
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def submission(db):
+    """A submission on a one-field form, with its org, form and version."""
+    org = user.Organization(name="org")
+    db.add(org)
+    db.flush()
+    f = form.Form(org_id=org.id, title="Form", slug="form")
+    db.add(f)
+    db.flush()
+    version = form.FormVersion(
+        form_id=f.id,
+        version_number=1,
+        schema_json={"fields": [{"id": "qty", "type": "number"}]},
+    )
+    db.add(version)
+    db.flush()
+    sub = form.Submission(form_id=f.id, form_version_id=version.id, raw_data={"qty": 1})
+    db.add(sub)
+    db.commit()
+    return sub
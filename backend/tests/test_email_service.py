@@ -0,0 +1,33 @@
+import pytest
+
+from app.core import email_service
+from app.core.config import settings
+from app.core.email_service import SMTPConnectionPool
+
+class StubSMTP:
+    def __init__(self, host, port, timeout):
+        self.calls = [("connect", host, port)]
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, user, password):
+        self.calls.append(("login", user))
+
+@pytest.fixture(autouse=True)
+def stub_smtp(monkeypatch):
+    monkeypatch.setattr(email_service.smtplib, "SMTP", StubSMTP)
+    monkeypatch.setattr(settings, "SMTP_HOST", "relay")
+    monkeypatch.setattr(settings, "SMTP_PORT", 587)
+
+@pytest.mark.parametrize("user, starttls, expected", [
+    ("mailer", True, ["starttls", ("login", "mailer")]),
+    (None, True, ["starttls"]), # Relays without credentials still get TLS
+    (None, False, []),
+])
+def test_connect_always_uses_starttls_unless_disabled(monkeypatch, user, starttls, expected):
+    monkeypatch.setattr(settings, "SMTP_USER", user)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", starttls)
+
+    server = SMTPConnectionPool(size=1, idle_seconds=30)._connect()
+    assert server.calls == [("connect", "relay", 587)] + expected
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import field_stats, submission_sketches
+from app.core.field_stats import analytics_job, apply_pending, rebuild_field_stats
+from app.models.field_stats import FieldStats
+from app.models.form import Submission
+from app.models.outbox import OutboxJob
+
+class _Session(Session):
+    # SQLite has no REPEATABLE READ; the rebuild's snapshot is moot with one connection
+    def connection(self, **kw):
+        kw.pop("execution_options", None)
+        return super().connection(**kw)
+
+@pytest.fixture(autouse=True)
+def sqlite_statements(engine, monkeypatch):
+    """Postgres-only statements of the analytics path, mapped onto SQLite."""
+    monkeypatch.setattr(field_stats, "insert", sqlite_insert)
+    monkeypatch.setattr(submission_sketches, "insert", sqlite_insert)
+    monkeypatch.setattr(field_stats, "text", lambda sql: text("SELECT 1") if sql.startswith("LOCK") else text(sql))
+    monkeypatch.setattr(field_stats, "SessionLocal", sessionmaker(bind=engine, class_=_Session, autoflush=False))
+
+def submit(db, like, answers):
+    sub = Submission(form_id=like.form_id, form_version_id=like.form_version_id, raw_data=answers, computed_data={}, created_at=datetime.utcnow())
+    db.add(sub)
+    db.flush()
+    job = OutboxJob(**analytics_job(sub.form_id, [sub.id]))
+    db.add(job)
+    db.commit()
+    return job
+
+def stored_qty(db, submission):
+    row = db.query(FieldStats).filter(FieldStats.form_version_id == submission.form_version_id, FieldStats.field_id == "qty").one()
+    return row.seen, row.num_count, row.num_mean
+
+@pytest.fixture
+def poison(monkeypatch):
+    """Makes summarizing any batch containing {"qty": "poison"} raise."""
+    summarize_rows = field_stats.summarize_rows
+
+    def failing(db, rows, into=None):
+        rows = list(rows)
+        if any(raw.get("qty") == "poison" for _, raw in rows):
+            raise ValueError("cannot summarize")
+        return summarize_rows(db, rows, into)
+    monkeypatch.setattr(field_stats, "summarize_rows", failing)
+
+def test_batch_is_applied_once(db, submission):
+    jobs = [submit(db, submission, {"qty": qty}) for qty in (1, 2, 3)]
+
+    assert apply_pending(db, 10) == 3
+    assert apply_pending(db, 10) == 0
+    assert stored_qty(db, submission) == (3, 3, 2.0)
+    assert {job.status for job in db.query(OutboxJob)} == {"done"}
+    assert all(db.get(OutboxJob, job.id).attempts == 1 for job in jobs)
+
+def test_bad_job_is_isolated_and_backs_off(db, submission, poison):
+    good = submit(db, submission, {"qty": 2})
+    bad = submit(db, submission, {"qty": "poison"})
+    other = submit(db, submission, {"qty": 4})
+
+    assert apply_pending(db, 10) == 2
+    assert stored_qty(db, submission) == (2, 2, 3.0)
+    db.expire_all()
+    assert good.status == other.status == "done"
+    assert bad.status == "pending" and bad.attempts == 1
+    assert bad.available_at > datetime.utcnow() and "cannot summarize" in bad.last_error
+    # Not due yet: the next pass has nothing to do instead of failing again
+    assert apply_pending(db, 10) == 0
+
+def test_bad_job_fails_after_its_last_attempt(db, submission, poison):
+    bad = submit(db, submission, {"qty": "poison"})
+    bad.max_attempts = 1
+    db.commit()
+
+    assert apply_pending(db, 10) == 0
+    db.expire_all()
+    assert bad.status == "failed" and bad.attempts == 1
+
+def test_rebuild_supersedes_only_the_forms_pending_jobs(db, submission):
+    mine = submit(db, submission, {"qty": 5})
+    theirs = OutboxJob(**analytics_job(submission.form_id + 1, [12345]))
+    db.add(theirs)
+    db.commit()
+
+    result = rebuild_field_stats(submission.form_id)
+    assert result["superseded_jobs"] == 1
+    db.expire_all()
+    assert (mine.status, theirs.status) == ("done", "pending")
+    assert stored_qty(db, submission) == (2, 2, 3.0) # The fixture submission (qty 1) and qty 5
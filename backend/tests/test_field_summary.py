@@ -0,0 +1,89 @@
+import random
+import statistics
+
+import pytest
+
+from app.core.logic.field_summary import RunningStats, summarize_fields
+
+def running(values):
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+def test_welford_matches_two_pass_statistics():
+    values = [random.Random(1).gauss(1e6, 3.0) for _ in range(1000)]
+    stats = running(values)
+
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.fmean(values), rel=1e-12)
+    assert stats.variance == pytest.approx(statistics.variance(values), rel=1e-9)
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+@pytest.mark.parametrize("split", [0, 1, 7, 500, 999, 1000])
+def test_chan_merge_equals_one_pass(split):
+    rng = random.Random(split)
+    values = [rng.uniform(-50, 50) for _ in range(1000)]
+    merged = running(values[:split])
+    merged.merge(running(values[split:]))
+    whole = running(values)
+
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean, abs=1e-12)
+    assert merged.m2 == pytest.approx(whole.m2, rel=1e-12)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+
+def test_merging_many_micro_batches_is_order_independent():
+    rng = random.Random(7)
+    batches = [[rng.expovariate(0.1) for _ in range(rng.randint(0, 20))] for _ in range(50)]
+    forward, backward = RunningStats(), RunningStats()
+    for batch in batches:
+        forward.merge(running(batch))
+    for batch in reversed(batches):
+        backward.merge(running(batch))
+
+    assert forward.count == backward.count == sum(len(batch) for batch in batches)
+    assert forward.mean == pytest.approx(backward.mean, rel=1e-12)
+    assert forward.variance == pytest.approx(backward.variance, rel=1e-9)
+
+def test_variance_needs_two_values():
+    assert RunningStats().to_dict()["mean"] is None
+    assert running([3.0]).variance is None
+    assert running([3.0, 5.0]).variance == 2.0
+
+def test_summary_counts_and_skips_unusable_numbers():
+    fields = [{"id": "qty", "type": "number"}, {"id": "color", "type": "select"}, {"id": "note", "type": "text"}]
+    answers = [
+        {"qty": 2, "color": "red"},
+        {"qty": "4", "color": ["red", "blue"]},
+        {"qty": "inf", "note": "hi"},
+        {"qty": True},
+        {"qty": "", "color": []},
+        None,
+    ]
+    summaries = summarize_fields(fields, answers)
+
+    qty = summaries["qty"]
+    assert (qty.seen, qty.filled) == (6, 4)
+    assert qty.numbers.to_dict() == {"count": 2, "min": 2.0, "max": 4.0, "mean": 3.0, "variance": 2.0}
+    assert summaries["color"].options == {"red": 2, "blue": 1}
+    assert (summaries["note"].filled, summaries["note"].numbers.count) == (1, 0)
+
+def test_stored_stats_merge_like_one_pass(db, submission, monkeypatch):
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from app.core import field_stats
+    from app.models.field_stats import FieldStats
+    monkeypatch.setattr(field_stats, "insert", sqlite_insert)
+
+    fields = [{"id": "qty", "type": "number"}]
+    answers = [{"qty": value} for value in (1, 2, 3, 4, 10, "", 7)]
+    version = submission.form_version_id
+    for batch in (answers[:3], answers[3:]):
+        field_stats.merge_summaries(db, {version: summarize_fields(fields, batch)})
+        db.commit()
+
+    row = db.query(FieldStats).filter(FieldStats.form_version_id == version).one()
+    stored = field_stats._to_summary(row)
+    whole = summarize_fields(fields, answers)["qty"]
+    assert (stored.seen, stored.filled) == (whole.seen, whole.filled) == (7, 6)
+    assert stored.numbers.to_dict() == pytest.approx(whole.numbers.to_dict())
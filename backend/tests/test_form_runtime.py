@@ -0,0 +1,73 @@
+import pytest
+
+from app.core import form_runtime
+from app.core.form_runtime import FormRuntimeCache
+from app.models.form import Form, FormVersion
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(form_runtime.time, "monotonic", lambda: now[0])
+    return now
+
+def add_form(db, org_id, slug):
+    f = Form(org_id=org_id, title=slug, slug=slug)
+    db.add(f)
+    db.flush()
+    db.add(FormVersion(form_id=f.id, version_number=1, schema_json={}))
+    db.commit()
+    return f
+
+def add_version(db, form_id, number):
+    version = FormVersion(form_id=form_id, version_number=number, schema_json={})
+    db.add(version)
+    db.commit()
+    return version
+
+def test_latest_version_is_compiled_once(db, submission, clock):
+    cache = FormRuntimeCache(max_size=10, ttl_seconds=60)
+    first = cache.get_latest(db, "form")
+    assert cache.get_latest(db, "form") is first
+    assert cache.get_version(db, first.version_id) is first
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+    assert cache.get_latest(db, "missing") is None
+
+def test_least_recently_used_form_is_evicted(db, submission, clock):
+    cache = FormRuntimeCache(max_size=2, ttl_seconds=60)
+    org_id = submission.form.org_id
+    add_form(db, org_id, "b")
+    add_form(db, org_id, "c")
+
+    form_a = cache.get_latest(db, "form")
+    cache.get_latest(db, "b")
+    cache.get_latest(db, "form") # "b" is now least recently used
+    cache.get_latest(db, "c")
+
+    assert list(cache._by_slug) == ["form", "c"]
+    assert cache.get_latest(db, "form") is form_a
+    assert cache.get_latest(db, "b") is not None
+    assert cache.stats()["misses"] == 4
+
+def test_entries_expire_after_ttl(db, submission, clock):
+    cache = FormRuntimeCache(max_size=10, ttl_seconds=60)
+    first = cache.get_latest(db, "form")
+    clock[0] += 59
+    assert cache.get_latest(db, "form") is first
+
+    # Another process added a version: seen once the entry expires
+    version = add_version(db, submission.form_id, 2)
+    assert cache.get_latest(db, "form").version_id == first.version_id
+    clock[0] += 60
+    assert cache.get_latest(db, "form").version_id == version.id
+
+def test_invalidate_serves_new_version(db, submission, clock):
+    cache = FormRuntimeCache(max_size=10, ttl_seconds=60)
+    first = cache.get_latest(db, "form")
+    version = add_version(db, submission.form_id, 2)
+
+    cache.invalidate("form")
+    latest = cache.get_latest(db, "form")
+    assert latest.version_id == version.id
+    # Stored submissions still resolve their own version from the cache
+    assert cache.get_version(db, first.version_id) is first
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,55 @@
+import logging
+
+import pytest
+
+from app.core.logic.formulas import compile_formulas, FormulaError
+
+def test_formulas_run_in_dependency_order():
+    program = compile_formulas([
+        {"target_field": "total", "expression": "{{subtotal}} + {{tax}}"},
+        {"target_field": "tax", "expression": "{{subtotal}} / 10"},
+        {"target_field": "subtotal", "expression": "{{qty}} * {{price}}"},
+    ])
+    assert program.targets == ["subtotal", "tax", "total"]
+    assert program.evaluate({"qty": 2, "price": 5}) == {"subtotal": 10, "tax": 1.0, "total": 11.0}
+
+def test_independent_formulas_keep_declared_order():
+    program = compile_formulas([
+        {"target_field": "b", "expression": "{{x}} + 1"},
+        {"target_field": "a", "expression": "{{x}} + 2"},
+    ])
+    assert program.targets == ["b", "a"]
+
+@pytest.mark.parametrize("formulas, cycle", [
+    ([{"target_field": "a", "expression": "{{b}} + 1"},
+      {"target_field": "b", "expression": "{{a}} + 1"}], "a, b"),
+    ([{"target_field": "a", "expression": "{{c}} + 1"},
+      {"target_field": "b", "expression": "{{a}} + 1"},
+      {"target_field": "c", "expression": "{{b}} + 1"},
+      {"target_field": "d", "expression": "{{qty}}"}], "a, b, c"),
+])
+def test_circular_references_are_rejected(formulas, cycle):
+    with pytest.raises(FormulaError, match=f"Circular formula references: {cycle}$"):
+        compile_formulas(formulas)
+
+    # Stored versions keep serving in declared order
+    program = compile_formulas(formulas, strict=False)
+    assert program.targets == [f["target_field"] for f in formulas]
+
+def test_self_reference_is_not_a_cycle():
+    program = compile_formulas([{"target_field": "qty", "expression": "{{qty}} * 2"}])
+    assert program.evaluate({"qty": 3}) == {"qty": 6}
+
+def test_unknown_reference_counts_as_missing_answer():
+    # Formulas may reference optional fields: an unknown name reads as 0, like an empty answer
+    program = compile_formulas([{"target_field": "total", "expression": "{{qty}} + {{missing}}"}])
+    assert program.evaluate({"qty": 2}) == {"total": 2}
+
+def test_invalid_formula_is_rejected_on_save_and_logged_when_served(caplog):
+    formulas = [{"target_field": "total", "expression": "{{qty}} +"}]
+    with pytest.raises(FormulaError, match="Formula for 'total'"):
+        compile_formulas(formulas)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.logic.formulas"):
+        assert compile_formulas(formulas, strict=False).evaluate({"qty": 2}) == {"total": 0}
+    assert "Formula error for total" in caplog.text
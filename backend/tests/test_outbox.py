@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core import outbox
+from app.core.config import settings
+from app.models.outbox import OutboxJob
+
+@pytest.fixture(autouse=True)
+def session_local(engine, monkeypatch):
+    monkeypatch.setattr(outbox, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+def add_job(db, kind="test", **values):
+    # A kind without handlers, so giving up runs no on_give_up hook
+    row = {**outbox.job_row(kind), **values}
+    job = OutboxJob(**row)
+    db.add(job)
+    db.commit()
+    return job
+
+def test_renew_leases_extends_processing_jobs_only(db):
+    soon = datetime.utcnow() + timedelta(seconds=5)
+    held = add_job(db, status="processing", attempts=1, locked_until=soon)
+    finished = add_job(db, status="done", attempts=1, locked_until=None)
+
+    assert outbox.renew_leases([held.id, finished.id]) == 1
+    db.expire_all()
+    assert held.locked_until > soon + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS / 2)
+    assert finished.locked_until is None
+    assert outbox.renew_leases([]) == 0
+
+def test_claim_leases_due_jobs_in_id_order(db):
+    later = add_job(db, available_at=datetime.utcnow() + timedelta(minutes=5))
+    first = add_job(db)
+    second = add_job(db)
+
+    assert outbox.claim_jobs(db, 10) == [first.id, second.id]
+    db.expire_all()
+    assert first.status == "processing" and first.attempts == 1
+    assert first.locked_until > datetime.utcnow()
+    assert later.status == "pending"
+    # Leased jobs are not claimed again while the lease holds
+    assert outbox.claim_jobs(db, 10) == []
+
+def test_claim_respects_limit_and_kinds(db):
+    webhook = add_job(db, kind="webhook")
+    email = add_job(db, kind="email")
+    add_job(db, kind="webhook")
+
+    assert outbox.claim_jobs(db, 1, kinds=["webhook"]) == [webhook.id]
+    assert outbox.claim_jobs(db, 10, kinds=["email"]) == [email.id]
+
+def test_expired_lease_is_claimed_again(db):
+    job = add_job(db, status="processing", attempts=1, locked_until=datetime.utcnow() - timedelta(seconds=1))
+
+    assert outbox.claim_jobs(db, 10) == [job.id]
+    db.expire_all()
+    assert job.attempts == 2
+
+def test_expired_lease_on_last_attempt_fails_the_job(db):
+    job = add_job(db, status="processing", attempts=5, max_attempts=5, locked_until=datetime.utcnow() - timedelta(seconds=1))
+
+    assert outbox.claim_jobs(db, 10) == []
+    db.expire_all()
+    assert job.status == "failed"
+    assert job.locked_until is None
+    assert "Lease expired" in job.last_error
+
+def test_release_returns_the_attempt(db):
+    job = add_job(db)
+    outbox.claim_jobs(db, 10)
+
+    outbox.release_job(job.id, 60)
+    db.expire_all()
+    assert job.status == "pending" and job.attempts == 0
+    assert job.available_at > datetime.utcnow()
+
+def test_finish_retries_with_backoff_then_gives_up(db):
+    job = add_job(db, max_attempts=2)
+    outbox.claim_jobs(db, 10)
+    outbox.finish_job(job.id, "boom")
+    db.expire_all()
+    assert job.status == "pending" and job.last_error == "boom"
+
+    db.query(OutboxJob).update({"available_at": datetime.utcnow()})
+    db.commit()
+    outbox.claim_jobs(db, 10)
+    outbox.finish_job(job.id, "boom again")
+    db.expire_all()
+    assert job.status == "failed" and job.attempts == 2
+
+def test_purge_deletes_old_done_jobs_only(db):
+    old = datetime.utcnow() - timedelta(days=30)
+    add_job(db, status="done", updated_at=old)
+    add_job(db, status="done", updated_at=old)
+    recent = add_job(db, status="done")
+    failed = add_job(db, status="failed", updated_at=old)
+
+    assert outbox.purge_done_jobs(7, batch_size=1) == 2
+    assert {job.id for job in db.query(OutboxJob).all()} == {recent.id, failed.id}
+
+@pytest.fixture
+def failing_hook(monkeypatch):
+    calls = []
+
+    def give_up(db, job):
+        calls.append(job.id)
+        db.add(OutboxJob(**outbox.job_row("test", payload={"from": "hook"})))
+        db.flush()
+        raise LookupError("submission is gone")
+    monkeypatch.setitem(outbox.HANDLERS, "doomed", outbox.OutboxHandler(lambda db, job: None, on_give_up=give_up))
+    return calls
+
+def test_failing_give_up_hook_does_not_block_claims(db, failing_hook):
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    doomed = add_job(db, kind="doomed", status="processing", attempts=5, max_attempts=5, locked_until=expired)
+    other = add_job(db)
+
+    assert outbox.claim_jobs(db, 10) == [other.id]
+    assert failing_hook == [doomed.id]
+    db.expire_all()
+    assert doomed.status == "failed" and doomed.locked_until is None
+    # The hook's own writes were rolled back with its savepoint
+    assert db.query(OutboxJob).count() == 2
+
+def test_failing_give_up_hook_still_fails_a_finished_job(db, failing_hook):
+    job = add_job(db, kind="doomed", max_attempts=1)
+    outbox.claim_jobs(db, 10)
+
+    outbox.finish_job(job.id, "boom")
+    db.expire_all()
+    assert failing_hook == [job.id]
+    assert job.status == "failed" and job.last_error == "boom"
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def test_cursor_round_trips():
+    created_at = datetime(2024, 2, 29, 23, 59, 59, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+    # URL-safe and unpadded, so it can go in a query string as is
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+def test_cursors_differ_by_row_id_on_equal_timestamps():
+    created_at = datetime(2024, 1, 1)
+    assert encode_cursor(created_at, 1) != encode_cursor(created_at, 2)
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(datetime(2024, 1, 1), 1)[:-3],
+    "bnVsbA", # null
+    "WyJ4IiwxXQ", # ["x",1]
+    "WyIyMDI0LTAxLTAxIl0", # ["2024-01-01"]
+])
+def test_malformed_cursors_raise_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,22 @@
+from sqlalchemy import update
+
+from app.core import pdf_on_demand
+from app.models.form import Submission
+
+def test_render_once_sees_key_stored_while_waiting(db, submission, monkeypatch):
+    # The caller loaded the row before another process stored the PDF
+    loaded = db.get(Submission, submission.id)
+    assert loaded.pdf_key is None
+    db.execute(
+        update(Submission)
+        .where(Submission.id == submission.id)
+        .values(pdf_key="pdfs/stored.pdf", pdf_hash="abc")
+        .execution_options(synchronize_session=False)
+    )
+
+    def render(*args):
+        raise AssertionError("rendered a submission that already has a PDF")
+    monkeypatch.setattr(pdf_on_demand, "render_submission_pdf", render)
+
+    assert pdf_on_demand.ensure_pdf(db, submission.id) == "pdfs/stored.pdf"
+    assert loaded.pdf_key == "pdfs/stored.pdf"
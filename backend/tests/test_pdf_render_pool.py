@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from app.core import pdf_render_pool
+from app.core.pdf_render_pool import PDFRenderPool
+
+def _stuck(seconds):
+    time.sleep(seconds)
+    return None, 0, seconds
+
+def _render(html):
+    return html.encode(), 1, 0.25
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Workers skip the WeasyPrint warm-up
+    monkeypatch.setattr(pdf_render_pool, "_warm_worker", lambda: None)
+    pool = PDFRenderPool(workers=1, timeout_seconds=1.0)
+    yield pool
+    pool.shutdown()
+
+def test_timed_out_render_does_not_hold_the_worker(pool):
+    with pytest.raises(TimeoutError):
+        pool.submit(_stuck, 60)
+
+    started = time.perf_counter()
+    assert pool.submit(_render, "<p>ok</p>") == b"<p>ok</p>"
+    assert time.perf_counter() - started < 1.0
+    stats = pool.stats()
+    assert (stats["rendered"], stats["failed"], stats["queue_depth"]) == (1, 1, 0)
+    assert stats["render_seconds_max"] == 0.25
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core import pdf_store, submission_counts, submission_delete
+from app.models.form import Submission
+from app.models.outbox import OutboxJob
+from app.models.pdf_object import PDFObject
+
+TEMPLATE = "<p>{{ qty }}</p>"
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    """Records renders and deletes instead of talking to S3."""
+    calls = {"rendered": [], "deleted": []}
+    keys = iter(f"pdfs/{i}.pdf" for i in range(100))
+
+    def render_to_storage(html, key):
+        calls["rendered"].append(key)
+        return len(html)
+    monkeypatch.setattr(pdf_store.pdf_service, "new_object_key", lambda: next(keys))
+    monkeypatch.setattr(pdf_store.pdf_service, "render_to_storage", render_to_storage)
+    monkeypatch.setattr(pdf_store.pdf_service, "delete_object", calls["deleted"].append)
+    # The upserts are Postgres statements; SQLite has the same ON CONFLICT clause
+    monkeypatch.setattr(pdf_store, "insert", sqlite_insert)
+    monkeypatch.setattr(submission_counts, "insert", sqlite_insert)
+    return calls
+
+def ref_count(db, pdf_hash):
+    return db.query(PDFObject.ref_count).filter(PDFObject.content_hash == pdf_hash).scalar()
+
+def store(db, submission, html):
+    submission.pdf_hash, submission.pdf_key = pdf_store.store_pdf(db, TEMPLATE, html)
+    db.commit()
+
+def add_submission(db, like):
+    sub = Submission(form_id=like.form_id, form_version_id=like.form_version_id, raw_data={}, created_at=datetime.utcnow())
+    db.add(sub)
+    db.flush()
+    submission_counts.record_submissions(db, sub.form_id, [(sub.form_version_id, sub.id, sub.created_at)])
+    db.commit()
+    return sub
+
+def test_identical_renders_share_one_object(db, submission, storage):
+    other = add_submission(db, submission)
+    store(db, submission, "<p>1</p>")
+    store(db, other, "<p>1</p>")
+
+    assert submission.pdf_key == other.pdf_key
+    assert storage["rendered"] == [submission.pdf_key]
+    assert ref_count(db, submission.pdf_hash) == 2
+
+def test_different_renders_or_templates_do_not_share(db):
+    assert pdf_store.content_hash(TEMPLATE, "<p>1</p>") != pdf_store.content_hash(TEMPLATE, "<p>2</p>")
+    assert pdf_store.content_hash(TEMPLATE, "<p>1</p>") != pdf_store.content_hash("<p>{{ qty }}</p> ", "<p>1</p>")
+
+def test_release_deletes_the_row_with_the_last_reference(db, submission):
+    other = add_submission(db, submission)
+    store(db, submission, "<p>1</p>")
+    store(db, other, "<p>1</p>")
+
+    assert pdf_store.release_pdf(db, submission.pdf_hash) is None
+    assert ref_count(db, submission.pdf_hash) == 1
+    assert pdf_store.release_pdf(db, submission.pdf_hash) == submission.pdf_key
+    assert ref_count(db, submission.pdf_hash) is None
+
+def test_delete_submission_releases_its_pdf(db, submission, storage):
+    other = add_submission(db, submission)
+    store(db, submission, "<p>1</p>")
+    store(db, other, "<p>1</p>")
+    key, pdf_hash = other.pdf_key, other.pdf_hash
+    db.add(OutboxJob(kind="webhook", submission_id=other.id, payload={}))
+    db.commit()
+
+    assert submission_delete.delete_submission(db, other.id)
+    assert ref_count(db, pdf_hash) == 1
+    assert storage["deleted"] == []
+    assert db.query(OutboxJob).count() == 0
+    assert submission_counts.total_count(db, submission.form_id) == 0 # Out of the rollup
+
+    assert submission_delete.delete_submission(db, submission.id)
+    assert ref_count(db, pdf_hash) is None
+    assert storage["deleted"] == [key]
+    assert not submission_delete.delete_submission(db, submission.id)
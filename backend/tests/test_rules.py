@@ -0,0 +1,82 @@
+import pytest
+
+from app.core.logic.rules import compile_rules, RuleError
+
+def rule(field, operator, value, target, effect):
+    return {
+        "trigger": {"field": field, "operator": operator, "value": value},
+        "action": {"target_field": target, "effect": effect},
+    }
+
+def test_show_targets_are_hidden_until_a_rule_shows_them():
+    table = compile_rules([
+        rule("plan", "eq", "pro", "seats", "show"),
+        rule("age", "lt", 18, "beer", "hide"),
+    ])
+    assert table.evaluate({}) == {"seats": False, "beer": True}
+    assert table.evaluate({"plan": "pro", "age": "16"}) == {"seats": True, "beer": False}
+    # The answer of a hidden show target is stripped before validation
+    assert table.hidden_fields({"plan": "free", "seats": 5}) == {"seats"}
+
+def test_last_firing_rule_wins():
+    table = compile_rules([
+        rule("qty", "gt", 0, "notes", "show"),
+        rule("qty", "gt", 10, "notes", "hide"),
+    ])
+    assert [table.evaluate({"qty": qty})["notes"] for qty in (0, 5, 20)] == [False, True, False]
+
+@pytest.mark.parametrize("key, expected", [
+    ("all", [False, False, True]),
+    ("and", [False, False, True]),
+    ("any", [False, True, True]),
+    ("or", [False, True, True]),
+])
+def test_compound_conditions(key, expected):
+    table = compile_rules([{
+        "trigger": {key: [
+            {"field": "age", "operator": "gt", "value": 17},
+            {"field": "country", "operator": "eq", "value": "DE"},
+        ]},
+        "action": {"target_field": "beer", "effect": "show"},
+    }])
+    answers = [{"age": 16, "country": "FR"}, {"age": 16, "country": "DE"}, {"age": 18, "country": "DE"}]
+    assert [table.evaluate(data)["beer"] for data in answers] == expected
+
+def test_hiding_a_field_cascades_through_chains():
+    table = compile_rules([
+        rule("minor", "eq", "yes", "drinks", "hide"),
+        rule("drinks", "eq", "beer", "brand", "show"),
+    ])
+    assert table.evaluate({"drinks": "beer"}) == {"drinks": True, "brand": True}
+    # drinks is hidden, so its answer no longer shows brand
+    assert table.evaluate({"minor": "yes", "drinks": "beer"}) == {"drinks": False, "brand": False}
+
+def test_cyclic_chain_falls_back_to_default_visibility():
+    table = compile_rules([
+        rule("b", "eq", "x", "a", "hide"),
+        rule("a", "eq", "x", "b", "show"),
+    ])
+    # a -> b -> a: the inner lookup of a uses its default (visible)
+    assert table.evaluate({"a": "x", "b": "x"}) == {"a": False, "b": True}
+
+def test_affected_targets_follow_chains():
+    table = compile_rules([
+        rule("country", "eq", "DE", "state", "show"),
+        rule("state", "eq", "BY", "beer", "show"),
+        rule("age", "lt", 18, "wine", "hide"),
+    ])
+    assert table.affected_targets(["country"]) == {"state", "beer"}
+    assert table.affected_targets(["age", "unrelated"]) == {"wine"}
+    assert table.evaluate_delta(["state"], {"country": "DE", "state": "BY"}) == {"beer": True}
+
+@pytest.mark.parametrize("bad_rule, message", [
+    (rule("age", "lt", 18, None, "hide"), "no target_field"),
+    (rule("age", "lt", 18, "beer", "toggle"), "Effect 'toggle'"),
+    (rule("age", "between", 18, "beer", "hide"), "Operator 'between'"),
+    (rule(None, "lt", 18, "beer", "hide"), "no field"),
+    ({"trigger": {"any": {"field": "age"}}, "action": {"target_field": "beer", "effect": "hide"}}, "must be a list"),
+])
+def test_invalid_rules_are_rejected_on_save_and_ignored_when_served(bad_rule, message):
+    with pytest.raises(RuleError, match=message):
+        compile_rules([bad_rule], strict=True)
+    assert compile_rules([bad_rule]).evaluate({"age": 10}).get("beer", True) is True
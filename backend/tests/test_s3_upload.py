@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.config import settings
+from app.core.s3_upload import MultipartUploadWriter
+
+PART = 5 * 1024 * 1024
+
+class StubClient:
+    def __init__(self, fail_part=None):
+        self.calls = []
+        self.fail_part = fail_part
+
+    def create_multipart_upload(self, **kw):
+        self.calls.append("create")
+        return {"UploadId": "u1"}
+
+    def upload_part(self, PartNumber, **kw):
+        self.calls.append(("part", PartNumber))
+        if PartNumber == self.fail_part:
+            raise ConnectionError("part upload failed")
+        return {"ETag": f"e{PartNumber}"}
+
+    def complete_multipart_upload(self, MultipartUpload, **kw):
+        self.calls.append(("complete", [part["PartNumber"] for part in MultipartUpload["Parts"]]))
+
+    def abort_multipart_upload(self, **kw):
+        self.calls.append("abort")
+
+    def put_object(self, Body, **kw):
+        self.calls.append(("put", len(Body)))
+
+@pytest.fixture(autouse=True)
+def multipart_from_one_part(monkeypatch):
+    monkeypatch.setattr(settings, "S3_MULTIPART_CHUNK_BYTES", PART)
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD_BYTES", PART)
+
+def upload(client, size):
+    with MultipartUploadWriter(client, "bucket", "key") as writer:
+        writer.write(b"x" * size)
+    return writer
+
+def test_small_object_is_one_put():
+    client = StubClient()
+    upload(client, 10)
+    assert client.calls == [("put", 10)]
+
+def test_large_object_is_completed():
+    client = StubClient()
+    writer = upload(client, PART + 10)
+    assert client.calls == ["create", ("part", 1), ("part", 2), ("complete", [1, 2])]
+    assert writer.bytes_written == PART + 10
+
+@pytest.mark.parametrize("fail_part", [1, 2])
+def test_failed_part_aborts_the_upload(fail_part):
+    client = StubClient(fail_part=fail_part)
+    with pytest.raises(ConnectionError):
+        upload(client, PART + 10)
+    assert client.calls[-1] == "abort"
+    assert not any(call[0] == "complete" for call in client.calls if isinstance(call, tuple))
+
+def test_error_while_writing_aborts_the_upload():
+    client = StubClient()
+    with pytest.raises(RuntimeError):
+        with MultipartUploadWriter(client, "bucket", "key") as writer:
+            writer.write(b"x" * PART)
+            raise RuntimeError("renderer crashed")
+    assert client.calls == ["create", ("part", 1), "abort"]
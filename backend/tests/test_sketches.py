@@ -0,0 +1,88 @@
+import math
+import random
+
+import pytest
+
+from app.core.logic.sketches import HyperLogLog, TDigest
+from app.core.submission_sketches import _as_number
+
+def hll(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def digest(values):
+    sketch = TDigest()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+def test_hll_merge_equals_sketch_of_union():
+    emails = [f"user{i}@example.com" for i in range(20000)]
+    left, right = hll(emails[:12000]), hll(emails[8000:])
+    left.merge(right)
+
+    assert left.registers == hll(emails).registers
+    assert left.estimate() == pytest.approx(20000, rel=0.05) # ~3 standard errors at precision 12
+
+def test_hll_ignores_duplicates_and_is_exactish_when_small():
+    sketch = hll(["a@b.com", "c@d.com", "a@b.com"] * 100)
+    assert round(sketch.estimate()) == 2
+    assert HyperLogLog().estimate() == 0
+
+@pytest.mark.parametrize("distinct", [10, 5000])
+def test_hll_round_trips_sparse_and_dense(distinct):
+    sketch = hll(str(i) for i in range(distinct))
+    data = sketch.to_bytes()
+
+    assert data[0] == (1 if distinct == 10 else 0)
+    assert HyperLogLog.from_bytes(data).registers == sketch.registers
+
+def test_hll_rejects_merging_other_precisions():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+def test_tdigest_merged_days_keep_quantiles_accurate():
+    rng = random.Random(3)
+    days = [[rng.lognormvariate(3, 1) for _ in range(2000)] for _ in range(15)]
+    merged = TDigest()
+    for values in days:
+        merged.merge(TDigest.from_bytes(digest(values).to_bytes()))
+    values = [value for day in days for value in day]
+
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (min(values), max(values))
+    for q in (0.5, 0.9, 0.99):
+        assert merged.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.02)
+    assert len(merged.means) <= merged.compression
+
+def test_tdigest_merge_order_does_not_matter_much():
+    rng = random.Random(5)
+    parts = [[rng.uniform(0, 100) for _ in range(500)] for _ in range(10)]
+    forward, backward = TDigest(), TDigest()
+    for part in parts:
+        forward.merge(digest(part))
+    for part in reversed(parts):
+        backward.merge(digest(part))
+
+    for q in (0.1, 0.5, 0.99):
+        assert forward.quantile(q) == pytest.approx(backward.quantile(q), abs=1.0)
+
+def test_tdigest_edge_cases():
+    assert TDigest().quantile(0.5) is None
+    assert digest([4.0]).quantile(0.99) == 4.0
+    single = digest([1.0, 2.0])
+    single.merge(TDigest())
+    assert single.count == 2 and (single.min, single.max) == (1.0, 2.0)
+
+@pytest.mark.parametrize("value, expected", [
+    (3, 3.0), ("2.5", 2.5), ("", None), (None, None), (True, None), ("abc", None),
+    ("inf", None), (float("-inf"), None), ("nan", None), (math.nan, None),
+])
+def test_sketched_numbers_must_be_finite(value, expected):
+    assert _as_number(value) == expected
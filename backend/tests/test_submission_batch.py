@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.api.endpoints import submissions
+from app.core import submission_counts
+from app.core.config import settings
+from app.models.form import FormVersion, Submission
+from app.models.outbox import OutboxJob
+from app.schemas.submission import PublicSubmissionBatchCreate, PublicSubmissionCreate
+
+@pytest.fixture(autouse=True)
+def sqlite_upserts(monkeypatch):
+    # The rollup upsert is a Postgres statement; SQLite has the same ON CONFLICT clause
+    monkeypatch.setattr(submission_counts, "insert", sqlite_insert)
+
+def submit_batch(db, answers):
+    batch_in = PublicSubmissionBatchCreate(submissions=[{"answers": item} for item in answers])
+    return submissions.create_public_submissions_batch("form", batch_in, db)
+
+def test_batch_stores_valid_items_and_reports_invalid_ones(db, submission):
+    result = submit_batch(db, [{"qty": 2}, {"qty": "many"}, {"qty": 3}])
+
+    assert result["accepted"] == 2 and result["rejected"] == 1
+    first, rejected, last = result["results"]
+    assert rejected["status"] == "rejected" and rejected["error"]["field"] == "qty"
+    stored = {row.id: row.raw_data for row in db.query(Submission).filter(Submission.id != submission.id)}
+    assert stored == {first["id"]: {"qty": 2}, last["id"]: {"qty": 3}}
+    assert first["id"] < last["id"] # Ids come back in item order
+
+    assert submission_counts.total_count(db, submission.form_id) == 2
+    analytics = db.query(OutboxJob).filter(OutboxJob.kind == "analytics").one()
+    assert sorted(analytics.payload["submission_ids"]) == [first["id"], last["id"]]
+
+def test_batch_with_only_invalid_items_stores_nothing(db, submission):
+    result = submit_batch(db, [{"qty": "many"}])
+    assert result["accepted"] == 0
+    assert db.query(Submission).count() == 1
+    assert db.query(OutboxJob).count() == 0
+
+def test_oversized_batch_is_rejected(db, submission, monkeypatch):
+    monkeypatch.setattr(settings, "SUBMISSION_BATCH_MAX_SIZE", 2)
+    with pytest.raises(HTTPException) as e:
+        submit_batch(db, [{"qty": 1}] * 3)
+    assert e.value.status_code == 413
+
+def test_unknown_form_is_404_and_form_without_versions_is_400(db, submission):
+    with pytest.raises(HTTPException) as e:
+        submissions.create_public_submissions_batch("missing", PublicSubmissionBatchCreate(submissions=[]), db)
+    assert e.value.status_code == 404
+
+    db.query(FormVersion).delete()
+    db.query(Submission).delete()
+    db.commit()
+    for submit in (
+        lambda: submit_batch(db, [{"qty": 1}]),
+        lambda: submissions.create_public_submission("form", PublicSubmissionCreate(answers={"qty": 1}), db),
+    ):
+        with pytest.raises(HTTPException) as e:
+            submit()
+        assert e.value.status_code == 400
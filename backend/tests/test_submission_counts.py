@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core import submission_counts
+from app.models.form import Submission
+
+@pytest.fixture(autouse=True)
+def sqlite_statements(monkeypatch):
+    # The upserts are Postgres statements; SQLite has the same ON CONFLICT clause and no LOCK
+    monkeypatch.setattr(submission_counts, "insert", sqlite_insert)
+    monkeypatch.setattr(submission_counts, "text", lambda sql: text("SELECT 1") if sql.startswith("LOCK") else text(sql))
+
+def add_submission(db, like, created_at):
+    sub = Submission(form_id=like.form_id, form_version_id=like.form_version_id, raw_data={}, created_at=created_at)
+    db.add(sub)
+    db.flush()
+    return sub
+
+def record(db, *subs):
+    submission_counts.record_submissions(db, subs[0].form_id, [(sub.form_version_id, sub.id, sub.created_at) for sub in subs])
+    db.commit()
+
+def test_unrecord_takes_submission_out_of_its_bucket(db, submission):
+    when = datetime(2026, 3, 1, 14, 30)
+    subs = [add_submission(db, submission, when) for _ in range(3)]
+    record(db, *subs)
+
+    submission_counts.unrecord_submission(db, subs[1])
+    db.commit()
+    assert submission_counts.hourly_counts(db, submission.form_id, when.date()) == [{"hour": "2026-03-01T14:00:00", "count": 2}]
+
+def test_unrecord_skips_legacy_rows_without_timestamp(db, submission):
+    legacy = add_submission(db, submission, None)
+    legacy.created_at = None # The column default filled it in on insert
+    db.flush()
+    record(db, add_submission(db, submission, datetime(2026, 3, 1, 9)))
+
+    submission_counts.unrecord_submission(db, legacy)
+    assert submission_counts.total_count(db, submission.form_id) == 1
+
+def test_single_form_rebuild_does_not_lock_the_rollup(db, submission, monkeypatch):
+    statements = []
+    monkeypatch.setattr(submission_counts, "text", lambda sql: statements.append(sql) or text("SELECT 1"))
+    other = add_submission(db, submission, datetime(2026, 3, 1, 9))
+    record(db, other)
+
+    submission_counts.rebuild_counts(db, submission.form_id)
+    assert statements == []
+    submission_counts.rebuild_counts(db)
+    assert statements == ["LOCK TABLE submission_daily_counts IN EXCLUSIVE MODE"]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import submission_export
+from app.core.submission_export import _to_timestamp
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-03-01T10:30:00Z", datetime(2024, 3, 1, 10, 30)),
+    ("2024-03-01T10:30:00+02:00", datetime(2024, 3, 1, 8, 30)),
+    ("2024-03-01T01:00:00-05:00", datetime(2024, 3, 1, 6, 0)),
+    ("2024-03-01T10:30:00", datetime(2024, 3, 1, 10, 30)), # Naive answers are taken as UTC
+    ("2024-03-01", datetime(2024, 3, 1)),
+    (datetime(2024, 3, 1, 12, tzinfo=timezone(timedelta(hours=5))), datetime(2024, 3, 1, 7)),
+    (datetime(2024, 3, 1, 12), datetime(2024, 3, 1, 12)),
+    ("", None),
+    ("tomorrow", None),
+    (20240301, None),
+    (None, None),
+])
+def test_timestamps_are_naive_utc(value, expected):
+    assert _to_timestamp(value) == expected
+
+def test_parquet_field_columns_cannot_collide_with_metadata(monkeypatch):
+    import io
+    import pyarrow.parquet as pq
+
+    created = datetime(2024, 3, 1, 10, 30)
+    rows = [(7, created, 3, {"id": "A-1", "created_at": "2024-01-02", "qty": "4"}, {"total": 8})]
+    monkeypatch.setattr(submission_export, "iter_submission_rows", lambda form_id: iter(rows))
+    fields = [{"id": "id", "type": "text"}, {"id": "created_at", "type": "date"}, {"id": "qty", "type": "number"}]
+
+    sink = io.BytesIO()
+    assert list(submission_export.write_parquet(1, fields, ["total"], sink)) == [1]
+    table = pq.read_table(io.BytesIO(sink.getvalue()))
+    assert table.column_names == ["id", "created_at", "form_version_id", "data.id", "data.created_at", "data.qty", "computed.total"]
+    assert table.to_pylist() == [{
+        "id": 7, "created_at": created, "form_version_id": 3,
+        "data.id": "A-1", "data.created_at": datetime(2024, 1, 2), "data.qty": 4.0, "computed.total": 8.0,
+    }]
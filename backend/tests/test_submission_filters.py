@@ -0,0 +1,101 @@
+import os
+import re
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.submission_filters import InvalidFilter, parse_filters
+
+FIELDS = [
+    {"id": "email", "type": "email"},
+    {"id": "qty", "type": "number"},
+    {"id": "tags", "type": "select"},
+    {"id": "first name", "type": "text"},
+]
+
+def sql(raw):
+    (condition,) = parse_filters([raw], FIELDS)
+    compiled = condition.compile(dialect=postgresql.dialect())
+    return str(compiled), list(compiled.params.values())
+
+def test_text_equality_is_containment():
+    statement, params = sql("email=a@b.com")
+    assert "@>" in statement
+    assert params == [{"email": "a@b.com"}]
+
+def test_number_equality_is_containment_of_number_or_numeric_string():
+    statement, params = sql("qty=10")
+    assert statement.count("@>") == 2 and " OR " in statement and "@?" not in statement
+    assert params == [{"qty": 10.0}, {"qty": "10"}]
+
+# Ranges are @? jsonpath filters: the jsonb_path_ops GIN index cannot serve
+# .double() or inequalities, so they only narrow the form's submissions
+@pytest.mark.parametrize("raw, path", [
+    ("qty>=1.5", '$."qty" ? (@.double() >= 1.5)'),
+    ("qty<=-2", '$."qty" ? (@.double() <= -2.0)'),
+    ("qty>0", '$."qty" ? (@.double() > 0.0)'),
+    ("qty<1e3", '$."qty" ? (@.double() < 1000.0)'),
+])
+def test_number_ranges_use_jsonpath(raw, path):
+    statement, params = sql(raw)
+    assert "@?" in statement and "@>" not in statement
+    assert params == [path]
+
+def test_option_filter_is_list_containment_only():
+    statement, params = sql("tags~vip")
+    assert "@>" in statement
+    assert "ILIKE" not in statement.upper() and " OR " not in statement
+    assert params == [{"tags": ["vip"]}]
+
+def test_field_ids_are_quoted_in_paths_and_split_at_the_first_operator():
+    (condition,) = parse_filters(["first name=a=b"], FIELDS)
+    assert list(condition.compile(dialect=postgresql.dialect()).params.values()) == [{"first name": "a=b"}]
+    (condition,) = parse_filters(['qty >= 3'], FIELDS)
+    assert list(condition.compile(dialect=postgresql.dialect()).params.values()) == ['$."qty" ? (@.double() >= 3.0)']
+
+def test_filters_combine():
+    assert len(parse_filters(["qty>=1", "qty<5", "tags~vip"], FIELDS)) == 3
+    assert parse_filters([], FIELDS) == []
+
+@pytest.mark.parametrize("raw, message", [
+    ("qty", "expected field=value"),
+    ("=5", "expected field=value"),
+    ("size=5", "Unknown field 'size'"),
+    ("qty>=ten", "'ten' is not a number"),
+    ("qty=nan", "not a finite number"),
+    ("qty<inf", "not a finite number"),
+    ("email>=3", "Range filters need a number field"),
+    ("email~gmail", "'~' matches options"),
+    ("qty~1", "'~' matches options"),
+])
+def test_invalid_filters(raw, message):
+    with pytest.raises(InvalidFilter, match=message):
+        parse_filters([raw], FIELDS)
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="needs TEST_POSTGRES_URL (a scratch Postgres database)")
+def test_equality_and_options_use_the_gin_index_but_ranges_do_not():
+    from sqlalchemy import bindparam, create_engine, select, text
+    from app.models.form import Submission
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TEMP TABLE submissions (id serial PRIMARY KEY, form_id int, raw_data jsonb)"))
+        conn.execute(text("CREATE INDEX ON submissions USING gin (raw_data jsonb_path_ops)"))
+        conn.execute(text(
+            "INSERT INTO submissions (form_id, raw_data) "
+            "SELECT 1, jsonb_build_object('qty', i, 'email', i || '@b.com', 'tags', jsonb_build_array('t' || i % 50)) "
+            "FROM generate_series(1, 20000) i"
+        ))
+        conn.execute(text("ANALYZE submissions"))
+        conn.execute(text("SET enable_seqscan = off"))
+
+        def plan(raw):
+            compiled = select(Submission.id).where(*parse_filters([raw], FIELDS)).compile(dialect=engine.dialect)
+            # Re-bind the typed parameters (JSONB, JSONPATH) under EXPLAIN
+            sql = re.sub(r"%\((\w+)\)s", r":\1", str(compiled))
+            binds = [bindparam(name, param.value, type_=param.type) for param, name in compiled.bind_names.items()]
+            return "\n".join(row[0] for row in conn.execute(text("EXPLAIN " + sql).bindparams(*binds)))
+
+        for raw in ("qty=10", "email=3@b.com", "tags~t7"):
+            assert "Bitmap Index Scan" in plan(raw), raw
+        assert "Bitmap Index Scan" not in plan("qty>=10")
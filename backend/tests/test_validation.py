@@ -0,0 +1,23 @@
+import pytest
+
+from app.core.logic.validation import SchemaError, ValidationError, compile_schema
+
+SCHEMA = {"fields": [
+    {"id": "qty", "type": "number", "min": "one", "max": 10},
+    {"id": "email", "type": "email", "required": True},
+]}
+
+def test_strict_compile_rejects_non_numeric_bounds():
+    with pytest.raises(SchemaError):
+        compile_schema(SCHEMA)
+
+def test_stored_schema_skips_unusable_bounds_only():
+    validator = compile_schema(SCHEMA, strict=False)
+
+    validator.validate({"qty": -5, "email": "a@b.com"})
+    with pytest.raises(ValidationError, match="at most 10"):
+        validator.validate({"qty": 11, "email": "a@b.com"})
+    with pytest.raises(ValidationError, match="must be a number"):
+        validator.validate({"qty": "x", "email": "a@b.com"})
+    with pytest.raises(ValidationError, match="required"):
+        validator.validate({"qty": 1})
@@ -0,0 +1,33 @@
+import itertools
+
+import pytest
+
+from app.core.logic.formulas import compile_formulas
+from app.core.logic.vectorized import VectorizedProgram
+
+VALUES = [None, "", "abc", 0, 1, 2, 2.5, "3", "0.5"]
+
+ROWS = [{"qty": qty, "price": price} for qty, price in itertools.product(VALUES, repeat=2)]
+
+FORMULAS = [
+    {"target_field": "pow", "expression": "{{qty}} ** {{price}}"},
+    {"target_field": "pow_zero", "expression": "{{qty}} ** 0"},
+    {"target_field": "one_pow", "expression": "1 ** {{price}}"},
+    {"target_field": "total", "expression": "{{qty}} * {{price}} + 1"},
+    {"target_field": "ratio", "expression": "{{qty}} / {{price}}"},
+    {"target_field": "neg", "expression": "-{{qty}} - {{price}}"},
+    {"target_field": "larger", "expression": "max({{qty}}, {{price}})"},
+    {"target_field": "over", "expression": "{{qty}} > {{price}}"},
+    {"target_field": "rounded", "expression": "round({{price}} / 3, 2)"},
+    {"target_field": "squared", "expression": "{{total}} ** 2"},
+]
+
+@pytest.mark.parametrize("formula", FORMULAS, ids=lambda f: f["target_field"])
+def test_vectorized_matches_scalar(formula):
+    formulas = [FORMULAS[3], formula] if formula["target_field"] == "squared" else [formula]
+    program = compile_formulas(formulas)
+    vectorized = VectorizedProgram(program).evaluate(ROWS)
+
+    for row, batch_result in zip(ROWS, vectorized):
+        expected = program.evaluate(row)
+        assert batch_result == pytest.approx(expected), row
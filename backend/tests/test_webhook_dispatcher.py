@@ -0,0 +1,153 @@
+import asyncio
+import functools
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import outbox, webhook_dispatcher
+from app.core.config import settings
+from app.core.db import Base
+from app.core.webhook_dispatcher import WebhookDispatcher
+from app.models.outbox import OutboxJob
+from app.models.webhook import WebhookDeadLetter
+
+@pytest.fixture
+def engine(tmp_path):
+    # Deliveries finish jobs from worker threads: one connection per thread
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(autouse=True)
+def session_local(engine, monkeypatch):
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(outbox, "SessionLocal", session_local)
+    monkeypatch.setattr(webhook_dispatcher, "SessionLocal", session_local)
+
+class Receiver:
+    """
+    MockTransport handler: records the posted bodies and how many requests
+    were in flight at once per host.
+    """
+    def __init__(self, respond=None, delay=0.0):
+        self.respond = respond or (lambda body: httpx.Response(200))
+        self.delay = delay
+        self.bodies = []
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    async def __call__(self, request):
+        host = request.url.host
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        try:
+            await asyncio.sleep(self.delay)
+            body = httpx.Response(200, content=request.content).json()
+            self.bodies.append(body)
+            return self.respond(body)
+        finally:
+            self.in_flight[host] -= 1
+
+class StopAfterFirstClaim:
+    # Claims once, then run() drains what it claimed (queues, batches) and returns
+    def __init__(self):
+        self.checks = 0
+
+    def is_set(self):
+        self.checks += 1
+        return self.checks > 1
+
+def dispatch(monkeypatch, receiver, per_host=10):
+    monkeypatch.setattr(webhook_dispatcher.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(receiver)))
+    dispatcher = WebhookDispatcher(max_connections=10, per_host=per_host, per_destination=4, timeout_seconds=5, http2=False)
+    asyncio.run(dispatcher.run(StopAfterFirstClaim()))
+    return dispatcher
+
+def add_webhook(db, submission, url, batch=None, **values):
+    payload = {"url": url}
+    if batch:
+        payload["batch"] = batch
+    job = OutboxJob(**{**outbox.job_row("webhook", submission.id, payload), **values})
+    db.add(job)
+    db.commit()
+    return job
+
+def test_requests_per_host_are_limited(db, submission, monkeypatch):
+    for path in ("a", "b", "c"):
+        add_webhook(db, submission, f"http://one.test/{path}")
+        add_webhook(db, submission, f"http://two.test/{path}")
+
+    receiver = Receiver(delay=0.05)
+    dispatcher = dispatch(monkeypatch, receiver, per_host=1)
+
+    assert len(receiver.bodies) == 6
+    assert receiver.max_in_flight == {"one.test": 1, "two.test": 1}
+    assert dispatcher.stats()["delivered"] == 6
+    assert {job.status for job in db.query(OutboxJob)} == {"done"}
+
+def test_batches_events_per_url(db, submission, monkeypatch):
+    batch = {"max_size": 2, "window_seconds": 60}
+    jobs = [add_webhook(db, submission, "http://hook.test/batch", batch) for _ in range(3)]
+
+    receiver = Receiver()
+    dispatch(monkeypatch, receiver)
+
+    # A full batch of two, then the remainder flushed on shutdown. Jobs are
+    # prepared concurrently, so which two share a batch varies; each batch is in job order
+    batches = [[event["event_id"] for event in body["events"]] for body in receiver.bodies]
+    assert [len(ids) for ids in batches] == [2, 1]
+    assert batches[0] == sorted(batches[0])
+    assert sorted(batches[0] + batches[1]) == [job.id for job in jobs]
+    assert receiver.bodies[0]["events"][0]["submission_id"] == submission.id
+    db.expire_all()
+    assert {job.status for job in jobs} == {"done"}
+
+def test_partial_ack_retries_only_failed_events(db, submission, monkeypatch):
+    batch = {"max_size": 2, "window_seconds": 60}
+    accepted = add_webhook(db, submission, "http://hook.test/batch", batch)
+    rejected = add_webhook(db, submission, "http://hook.test/batch", batch)
+
+    receiver = Receiver(respond=lambda body: httpx.Response(200, json={"failed": [rejected.id]}))
+    dispatch(monkeypatch, receiver)
+
+    db.expire_all()
+    assert accepted.status == "done"
+    assert rejected.status == "pending" and rejected.attempts == 1
+    assert rejected.last_error == "Rejected by receiver (partial batch ack)"
+
+def test_exhausted_delivery_is_dead_lettered(db, submission, monkeypatch):
+    job = add_webhook(db, submission, "http://hook.test/down", attempts=settings.OUTBOX_MAX_ATTEMPTS - 1)
+
+    receiver = Receiver(respond=lambda body: httpx.Response(503))
+    dispatcher = dispatch(monkeypatch, receiver)
+
+    db.expire_all()
+    assert job.status == "failed"
+    dead = db.query(WebhookDeadLetter).one()
+    assert dead.outbox_job_id == job.id and dead.url == "http://hook.test/down"
+    assert dead.payload["submission_id"] == submission.id
+    assert "503" in dead.last_error
+    assert dispatcher.stats()["failed_attempts"] == 1
+
+def test_buffered_jobs_keep_their_lease(db, submission, monkeypatch):
+    expiring = datetime.utcnow() - timedelta(seconds=1)
+    buffered = add_webhook(db, submission, "http://hook.test/batch", status="processing", attempts=1, locked_until=expiring)
+    other = add_webhook(db, submission, "http://hook.test/batch", status="processing", attempts=1, locked_until=expiring)
+    monkeypatch.setattr(settings, "OUTBOX_LEASE_SECONDS", 0.15)
+
+    dispatcher = WebhookDispatcher(max_connections=1, per_host=1, per_destination=1, timeout_seconds=5, http2=False)
+    dispatcher._buffered.add(buffered.id)
+
+    async def renew_once():
+        task = asyncio.create_task(dispatcher._renew_leases())
+        await asyncio.sleep(0.1)
+        task.cancel()
+    asyncio.run(renew_once())
+
+    db.expire_all()
+    assert buffered.locked_until > expiring + timedelta(seconds=1)
+    assert other.locked_until == expiring